@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from registry import get_requirements
+
+COMPACT_FACTOR = 2
+
+r""" Result cache for `llm_execute_batch`.
+
+Decoding is greedy (`do_sample=False`), so the response to an expression only depends on
+the model, the adapters and the task. Results are cached under a content-addressed key:
+sha256 of (fingerprint, task, alignment, normalized expression), where the fingerprint
+covers the model version, the base model path and the files of every adapter the task uses.
+Changing any adapter changes the fingerprint, so stale entries are never hit.
+
+The cache keeps `capacity` entries in LRU order. With a `path`, every new entry is appended
+to a JSONL file and the file is loaded again on start, the last line of a key wins.
+The file is rewritten from the kept entries when it is loaded with evicted or duplicate
+lines, and when it grows past `COMPACT_FACTOR` times the capacity, so it stays bounded.
+"""
+
+def _hash_path(hasher, path):
+    # hash every file of an adapter directory, a missing path only contributes its name
+    hasher.update(path.encode())
+    if not path or not os.path.exists(path):
+        return
+    if os.path.isfile(path):
+        files = [path]
+    else:
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    for file in files:
+        hasher.update(os.path.relpath(file, path).encode())
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(chunk)
+
+def _expand_tasks(tasks):
+    expanded = []
+    for task in tasks:
+        if task in expanded:
+            continue
+        expanded.append(task)
+        requirements = get_requirements(task)
+        if requirements:
+            expanded.extend(t for t in _expand_tasks(requirements) if t not in expanded)
+    return expanded
+
+def adapter_fingerprint(model_version, path_provider, tasks, no_prompt):
+    hasher = hashlib.sha256()
+    hasher.update(model_version.encode())
+    hasher.update(path_provider.get_base_model_path().encode())
+    for task in sorted(_expand_tasks(tasks)):
+        path = path_provider.get_path(task)
+        hasher.update(task.encode())
+        _hash_path(hasher, path.lora_path_no_prompt if no_prompt else path.lora_path)
+        _hash_path(hasher, path.aligner_path)
+    return hasher.hexdigest()
+
+def normalize_expression(expression, alignment):
+    # raw expressions ignore whitespace, e.g. '123 + 456 =' and '123+456=', TM inputs only strip
+    if alignment:
+        return re.sub(r'\s+', '', expression)
+    return expression.strip()
+
+
+class ResultCache:
+    def __init__(self, fingerprint, capacity=100000, path=None):
+        self.fingerprint = fingerprint
+        self.capacity = capacity
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # lines of the file, kept entries and the evicted or overwritten ones
+        self.lines = 0
+        if path and os.path.exists(path):
+            self._load()
+            if self.lines > len(self.entries):
+                self._compact()
+
+    def key(self, task, expression, alignment):
+        content = json.dumps([self.fingerprint, task, alignment, normalize_expression(expression, alignment)])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                self.lines += 1
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # a line cut by an interrupted write
+                    continue
+                self._insert(entry['key'], entry['response'])
+
+    def _compact(self):
+        # rewrite the file from the kept entries, in LRU order, the rename keeps it whole if interrupted
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for key, response in self.entries.items():
+                f.write(json.dumps(dict(key=key, response=response)) + '\n')
+        os.replace(tmp_path, self.path)
+        self.lines = len(self.entries)
+
+    def _insert(self, key, response):
+        self.entries[key] = response
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+    def put(self, key, response):
+        with self.lock:
+            new = key not in self.entries
+            self._insert(key, response)
+            if new and self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(dict(key=key, response=response)) + '\n')
+                self.lines += 1
+                if self.lines > COMPACT_FACTOR * self.capacity:
+                    self._compact()
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,45 +1,276 @@
 import re
+import threading
+import multiprocessing
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+
 from eval.evaluation import extract_answer
-from turing_machine.addition.addition_tm import AdditionTMChecker
-from turing_machine.reflection.reflection_tm import ReflectionTMChecker
-from turing_machine.left_mask.left_mask_tm import LeftMaskTMChecker
-from turing_machine.subtraction.sub_tm import SubtractionTMChecker
-from turing_machine.equal.equal_tm import EqualTMChecker
-from turing_machine.greater_than.greater_than_tm import GreaterThanTMChecker
-from turing_machine.less_than.less_than_tm import LessThanTMChecker
-from turing_machine.multiplication.mul_tm import MultiplicationTMChecker
-from turing_machine.division.div_tm import DivisionTMChecker
 from turing_machine.alignment.aligner import TMAligner
+from arithmetic.profiler import span, call_span, span_context, current_depth, run_at_depth
+from registry import get_entry
 
 HALT_OUTPUT = """No command to execute. Halt state."""
+BUDGET_OUTPUT = """Budget exceeded. Execution stopped."""
 CALL_PATTERN = r'\bCMD\s\[CALL\]\s(.+),\s(.+)\b'
-SUB_FINISH_PATTERN = r'SUB, qH,'
-MUL_FINISH_PATTERN = r'MUL, qH,'
-DIV_FINISH_PATTERN = r'DIV, qH,'
+SUB_FINISH_PATTERN = r'\bSUB, qH,'
+MUL_FINISH_PATTERN = r'\bMUL, qH,'
+DIV_FINISH_PATTERN = r'\bDIV, qH,'
+LONG_MUL_FINISH_PATTERN = r'LONG_MUL, qH,'
+LONG_DIV_FINISH_PATTERN = r'LONG_DIV, qH,'
+
+executor_config = dict(
+    num_workers=0,          # worker threads validating model outputs, 0 validates inline
+    process_pool=False,     # construct checkers in worker processes instead of threads
+    micro_batches=1,        # micro-batches in flight, >1 overlaps generation of one with checking of another
+    bucket_size=0,          # rows per generate call after sorting the step's prompts by length, 0 generates all at once
+    early_exit=False,       # stop decoding a row as soon as it diverges from the transition expected by its checker
+    reorder=False,          # swap the operands of commutative tasks when the swapped order runs fewer steps
+    cache=None,             # ResultCache consulted before a sample enters the batch, None disables caching
+    max_steps=0,            # generate calls a row may spend, called machines and alignment included, 0 is unlimited
+    max_tokens=0,           # generated tokens a row may spend, 0 is unlimited
+    prefix_cache=None,      # PrefixCache reusing the KV cache of the prompt shared by the rows, None prefills every row
+)
+executor_stats = dict(
+    reordered=0,                # rows whose operands were swapped by the alignment stage
+    cache_hits=0,               # rows answered by the result cache
+    cache_misses=0,             # rows executed and offered to the result cache
+    budget_exceeded=0,          # rows stopped by `max_steps` or `max_tokens`
+    early_exits=0,              # rows stopped on divergence
+    divergence_positions={},    # number of generated tokens when a row diverged -> count
+    row_steps={},               # generate steps spent by a row, called machines and alignment included -> count
+    token_usage={},             # adapter -> step -> tokens of its generate calls, see `_record_tokens`, aligners run at step 0
+)
+_check_pool = None
+_build_pool = None
+# the active adapter is global to the model, it is switched and used under the same lock
+_generate_lock = threading.Lock()
+# steps and tokens spent by each row of the batch executed by this thread,
+# called machines run on compact batches of the calling rows and see them through `_enter_call_rows`
+_budget = threading.local()
+# micro-batches record their rows from different threads
+_stats_lock = threading.Lock()
+
+def configure_executor(**kwargs):
+    global _check_pool, _build_pool
+    for key, value in kwargs.items():
+        if key not in executor_config:
+            raise ValueError(f'Invalid executor option: {key}')
+        executor_config[key] = value
+    for pool in [_check_pool, _build_pool]:
+        if pool is not None:
+            pool.shutdown()
+    _check_pool = _build_pool = None
+    num_workers = executor_config['num_workers']
+    if num_workers > 0:
+        _check_pool = ThreadPoolExecutor(max_workers=num_workers)
+        if executor_config['process_pool']:
+            # checkers hold no CUDA state, spawn keeps the workers away from the parent's CUDA context
+            _build_pool = ProcessPoolExecutor(max_workers=num_workers, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            _build_pool = _check_pool
+
+class DivergenceCriteria(StoppingCriteria):
+    # stop a row once its generated text can match neither a prefix nor an extension of the expected output
+    def __init__(self, tokenizer, prompt_length, expected):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.expected = expected
+        self.matched = [False] * len(expected)
+        self.positions = [-1] * len(expected)
+        # per row, the generated tokens decoded so far and the length of the expected output they matched,
+        # every call only decodes and compares the new tokens
+        self.decoded = [0] * len(expected)
+        self.offsets = [0] * len(expected)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        stops = [position != -1 for position in self.positions]
+        generated = input_ids[:, self.prompt_length:]
+        for i, expected in enumerate(self.expected):
+            if expected is None or stops[i] or self.matched[i]:
+                continue
+            text = self.tokenizer.decode(generated[i, self.decoded[i]:], skip_special_tokens=True)
+            if '\ufffd' in text:
+                # a character split across tokens, wait for the rest of it
+                continue
+            self.decoded[i] = generated.shape[1]
+            offset = self.offsets[i]
+            if offset == 0:
+                text = text.lstrip()
+            n = min(len(text), len(expected) - offset)
+            if text[:n] != expected[offset:offset + n]:
+                self.positions[i] = generated.shape[1]
+                stops[i] = True
+            elif offset + len(text) >= len(expected):
+                # the rest is left to the checker
+                self.matched[i] = True
+            else:
+                self.offsets[i] = offset + len(text)
+        return torch.tensor(stops, dtype=torch.bool, device=input_ids.device)
+
+def _record_divergences(positions):
+    positions = [position for position in positions if position != -1]
+    executor_stats['early_exits'] += len(positions)
+    for position in positions:
+        executor_stats['divergence_positions'][position] = executor_stats['divergence_positions'].get(position, 0) + 1
+
+def _record_tokens(adapter, step, inputs, outputs, pad_token_id):
+    # prompt: prompt tokens of the rows, padding: pad tokens of the prompts,
+    # generated: tokens generated before the eos of each row,
+    # finished: decoding slots from the eos of each row to the end of the call, spent waiting for the longest row
+    prompt_length = inputs['input_ids'].shape[1]
+    rows = outputs.shape[0]
+    prompt = int(inputs['attention_mask'].sum())
+    generated = int((outputs[:, prompt_length:] != pad_token_id).sum())
+    usage = executor_stats['token_usage'].setdefault(adapter, {}).setdefault(step, dict(
+        calls=0, rows=0, prompt=0, padding=0, generated=0, finished=0,
+    ))
+    usage['calls'] += 1
+    usage['rows'] += rows
+    usage['prompt'] += prompt
+    usage['padding'] += rows * prompt_length - prompt
+    usage['generated'] += generated
+    usage['finished'] += rows * (outputs.shape[1] - prompt_length) - generated
+
+def record_token_usage(adapter, step, inputs, outputs, pad_token_id):
+    # token usage of a generate call made outside the executor, e.g. by the one-step evaluation
+    with _stats_lock:
+        _record_tokens(adapter, step, inputs, outputs, pad_token_id)
+
+def token_usage_totals():
+    # token usage of each adapter summed over its steps
+    totals = {}
+    for adapter, steps in executor_stats['token_usage'].items():
+        total = totals[adapter] = dict(steps=len(steps))
+        for usage in steps.values():
+            for key, value in usage.items():
+                total[key] = total.get(key, 0) + value
+    return totals
+
+def tokenize_batch(tokenizer, batch):
+    # left padded like `tokenizer(batch, return_tensors='pt', padding=True)`, padded here: switching the padding
+    # of the fast tokenizer mutates it, and it raises 'Already borrowed' if threads share it meanwhile
+    rows = tokenizer(batch, padding=False)['input_ids']
+    width = max(len(row) for row in rows)
+    pad = tokenizer.pad_token_id
+    return dict(
+        input_ids=torch.tensor([[pad] * (width - len(row)) + list(row) for row in rows], dtype=torch.long),
+        attention_mask=torch.tensor([[0] * (width - len(row)) + [1] * len(row) for row in rows], dtype=torch.long),
+    )
 
-def _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished):
+def _wrapper_generate(model, tokenizer, adapter, gen_kwargs, batch, corrects, finished, expected=None, step=0):
     assert len(batch) == len(corrects) == len(finished)
     # skip error or finished
     skips = [not correct or finish for correct, finish in zip(corrects, finished)]
     # filter out correct answers
     skip_indices = [i for i, skip in enumerate(skips) if skip]
     reserve_indices = [i for i, skip in enumerate(skips) if not skip]
-    filtered_batch = [batch[i] for i in reserve_indices]
-    assert len(filtered_batch) != 0
-    # generate
-    inputs = tokenizer(filtered_batch, return_tensors="pt", padding=True).to("cuda")
-    outputs = model.generate(
-        **inputs,
-        **gen_kwargs,
-    )
-    # restore batch
+    # a micro-batch whose rows all failed or finished has nothing to generate
+    if len(reserve_indices) == 0:
+        return list(batch)
+    # rows of the same step drift apart in length, regroup them so that short prompts are not padded to long ones
+    bucket_size = executor_config['bucket_size']
+    if bucket_size > 0:
+        reserve_indices = sorted(reserve_indices, key=lambda i: len(batch[i]))
+        buckets = [reserve_indices[i:i + bucket_size] for i in range(0, len(reserve_indices), bucket_size)]
+    else:
+        buckets = [reserve_indices]
     results = [None] * len(batch)
-    for i, idx in enumerate(reserve_indices):
-        results[idx] = outputs[i]
+    prefix_cache = executor_config['prefix_cache']
+    for bucket in buckets:
+        filtered_batch = [batch[i] for i in bucket]
+        # generate
+        prefix = None
+        with span('tokenize', op=adapter, step=step, rows=len(bucket)):
+            if prefix_cache is not None:
+                inputs, prefix = prefix_cache.build_inputs(tokenizer, adapter, filtered_batch)
+            if prefix is None:
+                inputs = tokenize_batch(tokenizer, filtered_batch)
+            inputs = {key: value.to(model.device) for key, value in inputs.items()}
+        bucket_kwargs = gen_kwargs
+        criteria = None
+        if expected is not None:
+            criteria = DivergenceCriteria(tokenizer, inputs['input_ids'].shape[1], [expected[i] for i in bucket])
+            bucket_kwargs = dict(gen_kwargs, stopping_criteria=StoppingCriteriaList([criteria]))
+        # tokenizing above and decoding by the caller run outside the lock, overlapping other micro-batches
+        with span('lock_wait', op=adapter, step=step):
+            _generate_lock.acquire()
+        try:
+            with span('adapter_switch', op=adapter, step=step):
+                model.set_adapter(adapter)
+            if prefix is not None:
+                with span('prefix_cache', op=adapter, step=step):
+                    past_key_values = prefix_cache.past_key_values(model, adapter, prefix, len(bucket))
+                bucket_kwargs = dict(bucket_kwargs, past_key_values=past_key_values)
+            with span('generate', op=adapter, step=step, rows=len(bucket), prompt_length=inputs['input_ids'].shape[1]):
+                outputs = model.generate(
+                    **inputs,
+                    **bucket_kwargs,
+                )
+            if criteria is not None:
+                _record_divergences(criteria.positions)
+            _record_tokens(adapter, step, inputs, outputs, gen_kwargs['pad_token_id'])
+        finally:
+            _generate_lock.release()
+        _charge_budget(bucket, outputs, inputs['input_ids'].shape[1], gen_kwargs['pad_token_id'])
+        # restore batch
+        for i, idx in enumerate(bucket):
+            results[idx] = outputs[i]
     for idx in skip_indices:
         results[idx] = batch[idx] # copy original input
     return results
 
+def _charge_budget(bucket, outputs, prompt_length, pad_token_id):
+    usage = getattr(_budget, 'usage', None)
+    if usage is None:
+        return
+    steps, tokens = usage
+    generated = (outputs[:, prompt_length:] != pad_token_id).sum(dim=1).tolist()
+    for idx, n in zip(bucket, generated):
+        steps[idx] += 1
+        tokens[idx] += n
+
+def _enter_call_rows(rows):
+    # the budgets of a compact batch of `rows`, indexed like the batch, the caller's are returned
+    usage = getattr(_budget, 'usage', None)
+    if usage is not None:
+        _budget.usage = tuple([counts[i] for i in rows] for counts in usage)
+    return usage
+
+def _leave_call_rows(rows, usage):
+    # charge the caller's rows with what the called machine spent
+    if usage is None:
+        return
+    for counts, call_counts in zip(usage, _budget.usage):
+        for i, n in zip(rows, call_counts):
+            counts[i] = n
+    _budget.usage = usage
+
+def _check_budget(batch, results, corrects, finished):
+    # stop the rows that spent their budget, as if they had failed
+    usage = getattr(_budget, 'usage', None)
+    if usage is None:
+        return
+    steps, tokens = usage
+    max_steps = executor_config['max_steps']
+    max_tokens = executor_config['max_tokens']
+    if max_steps <= 0 and max_tokens <= 0:
+        return
+    for i in _active_indices(corrects, finished):
+        if (max_steps > 0 and steps[i] >= max_steps) or (max_tokens > 0 and tokens[i] >= max_tokens):
+            results[i] = batch[i] + '\n' + BUDGET_OUTPUT
+            corrects[i] = False
+            finished[i] = True
+            with _stats_lock:
+                executor_stats['budget_exceeded'] += 1
+
+def _record_row_steps(steps):
+    with _stats_lock:
+        row_steps = executor_stats['row_steps']
+        for n in steps:
+            row_steps[n] = row_steps.get(n, 0) + 1
+
 def _check_finished(batch, corrects, finished):
     # any correct answer is halt state, set True in `finished`
     for i in range(len(batch)): 
@@ -57,7 +288,7 @@ def _check_stop(batch, corrects, finished):
     return False
 
 def _pre_align_batch(model, tokenizer, task, batch, corrects=None):
-    model.set_adapter(f'{task}_aligner')
+    adapter = f'{task}_aligner'
     gen_kwargs = dict(
         max_length=4096,
         pad_token_id=tokenizer.eos_token_id,
@@ -67,24 +298,33 @@ def _pre_align_batch(model, tokenizer, task, batch, corrects=None):
     if not corrects:
         corrects = [True] * len(batch)
     finished = [not correct for correct in corrects]
-    outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-    adapter = TMAligner()
+    aligner = TMAligner()
+    ground_truths = [aligner.input_to_tm(batch[i], task).strip() if corrects[i] else None for i in range(len(batch))]
+    expected = ground_truths if executor_config['early_exit'] else None
+    outputs = _wrapper_generate(model, tokenizer, adapter, gen_kwargs, batch, corrects, finished, expected)
     for i, output in enumerate(outputs):
         if not corrects[i] or finished[i]:
             continue
         model_response = extract_answer(batch[i],
                                             tokenizer.decode(output, skip_special_tokens=True))
-        ground_truth = adapter.input_to_tm(batch[i])
+        ground_truth = ground_truths[i]
         if model_response.strip() != ground_truth.strip():
             corrects[i] = False
             results[i] = batch[i] + '\n\n' + model_response
         else:
             results[i] = model_response
+            if executor_config['reorder']:
+                # the aligner is trained on the user's order, swap the operands of its verified output
+                reordered = aligner.input_to_tm(batch[i], task, reorder=True).strip()
+                if reordered != ground_truth:
+                    results[i] = model_response.replace(ground_truth, reordered)
+                    with _stats_lock:
+                        executor_stats['reordered'] += 1
 
     return results, corrects
 
 def _post_align_batch(model, tokenizer, task, batch, corrects=None, finished=None):
-    model.set_adapter(f'{task}_aligner')
+    adapter = f'{task}_aligner'
     gen_kwargs = dict(
         max_length=4096,
         pad_token_id=tokenizer.eos_token_id,
@@ -94,7 +334,9 @@ def _post_align_batch(model, tokenizer, task, batch, corrects=None, finished=Non
     if not corrects:
         corrects = [True] * len(batch)
     finished = [not correct for correct in corrects]
-    outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
+    if all(finished):
+        return results, corrects
+    outputs = _wrapper_generate(model, tokenizer, adapter, gen_kwargs, batch, corrects, finished)
     for i, output in enumerate(outputs):
         if not corrects[i] or finished[i]:
             continue
@@ -104,360 +346,159 @@ def _post_align_batch(model, tokenizer, task, batch, corrects=None, finished=Non
             
     return results, corrects
 
-def llm_add_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('add')
-    gen_kwargs = dict(
-        max_length=4096,
-        pad_token_id=tokenizer.eos_token_id,
-        do_sample=False,
-    )
-    accumulate_outputs = [''] * len(batch)
-    results = [''] * len(batch) # status where the machine halts or error occurs
-    corrects = [True] * len(batch) if corrects is None else corrects
+def _map(pool, func, *iterables):
+    # run `func` over the iterables on the worker pool if configured, inline otherwise
+    if pool is None:
+        return list(map(func, *iterables))
+    return list(pool.map(func, *iterables))
+
+def _active_indices(corrects, finished):
+    return [i for i in range(len(corrects)) if corrects[i] and not finished[i]]
+
+def _merge_finished(corrects, finished):
+    # rows that are wrong or already finished by the caller are skipped
     new_finished = [not correct for correct in corrects]
     if finished:
         for i in range(len(finished)):
             if finished[i]:
                 new_finished[i] = True
-    finished = new_finished
-    checkers = [AdditionTMChecker(input) if (corrects[i] and not finished[i]) else None for i, input in enumerate(batch)]
-    step = 0
-
-    while not _check_stop(batch, corrects, finished):
-        step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += model_response
-            results[i] = model_response
-            # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
-                results[i] = batch[i] + '\n' + model_response
-                corrects[i] = False
-                finished[i] = True
-            else:
-                checker.one_step()
-            batch[i] = model_response
-
-        finished = _check_finished(batch, corrects, finished)
-
-    return results, corrects
+    return new_finished
+
+def _build_checkers(checker_cls, batch, corrects, finished):
+    checkers = [None] * len(batch)
+    indices = _active_indices(corrects, finished)
+    built = _map(_build_pool, checker_cls, [batch[i] for i in indices])
+    for i, checker in zip(indices, built):
+        checkers[i] = checker
+    return checkers
+
+def _expected_outputs(checkers, corrects, finished):
+    if not executor_config['early_exit']:
+        return None
+    return [checkers[i].expected_output() if corrects[i] and not finished[i] else None for i in range(len(checkers))]
+
+def _decode_outputs(tokenizer, outputs, indices):
+    # decode all active rows in one call, the fast tokenizer decodes the batch outside python
+    if len(indices) == 0:
+        return []
+    return tokenizer.batch_decode([outputs[i] for i in indices], skip_special_tokens=True)
+
+def _validate(checker, prompt, output, context=None):
+    # runs on the worker pool: strip the prompt, check the transition and advance the checker,
+    # `context` is the operator, step and depth of the loop the spans belong to
+    context = context or {}
+    with span('extract_answer', **context):
+        model_response = extract_answer(prompt, output)
+    with span('check', **context):
+        correct = checker.check(model_response)
+        if correct:
+            checker.one_step()
+    return model_response, correct
+
+def _validate_call(checker, prompt, output, context=None):
+    # like `_validate`, and also split out the next prompt and the init of a called machine
+    model_response, correct = _validate(checker, prompt, output, context)
+    call = None
+    if correct:
+        with span('call_parse', **(context or {})):
+            matches = re.findall(CALL_PATTERN, model_response)
+        if matches:
+            call_op, _ = matches[0]
+            splits = model_response.split('\n')
+            call = (call_op.lower(), splits[0] + '\n' + splits[1] + '\n', splits[2] + '\n' + splits[3] + '\n')
+    return model_response, correct, call
 
+def _llm_basic_batch(model, tokenizer, adapter, checker_cls, batch, corrects=None, finished=None):
+    with span('execute', cat='machine', op=adapter):
+        return _llm_basic_loop(model, tokenizer, adapter, checker_cls, batch, corrects, finished)
 
-def llm_reflection_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('reflection')
+def _llm_basic_loop(model, tokenizer, adapter, checker_cls, batch, corrects=None, finished=None):
     gen_kwargs = dict(
         max_length=4096,
         pad_token_id=tokenizer.eos_token_id,
         do_sample=False,
     )
-    accumulate_outputs = [''] * len(batch)
     results = [''] * len(batch) # status where the machine halts or error occurs
     corrects = [True] * len(batch) if corrects is None else corrects
-    checkers = [ReflectionTMChecker(input) if corrects[i] else None for i, input in enumerate(batch)]
-    finished = [not correct for correct in corrects]
+    finished = _merge_finished(corrects, finished)
+    with span('build_checkers', op=adapter):
+        checkers = _build_checkers(checker_cls, batch, corrects, finished)
     step = 0
 
     while not _check_stop(batch, corrects, finished):
         step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += model_response
+        expected = _expected_outputs(checkers, corrects, finished)
+        outputs = _wrapper_generate(model, tokenizer, adapter, gen_kwargs, batch, corrects, finished, expected, step)
+
+        # skip if error has occurred or finished
+        active = _active_indices(corrects, finished)
+        with span('decode', op=adapter, step=step):
+            decoded = _decode_outputs(tokenizer, outputs, active)
+        with span('validate', op=adapter, step=step):
+            validate = partial(_validate, context=span_context(op=adapter, step=step))
+            validated = _map(_check_pool, validate, [checkers[i] for i in active], [batch[i] for i in active], decoded)
+        for i, (model_response, correct) in zip(active, validated):
             results[i] = model_response
             # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
+            if not correct:
                 results[i] = batch[i] + '\n' + model_response
                 corrects[i] = False
                 finished[i] = True
-            else:
-                checker.one_step()
             batch[i] = model_response
 
         finished = _check_finished(batch, corrects, finished)
+        _check_budget(batch, results, corrects, finished)
 
     return results, corrects
 
+def llm_add_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_basic_batch(model, tokenizer, 'add', get_entry('add', 'checker'), batch, corrects, finished)
 
-def llm_left_mask_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('left_mask')
-    gen_kwargs = dict(
-        max_length=4096,
-        pad_token_id=tokenizer.eos_token_id,
-        do_sample=False,
-    )
-    accumulate_outputs = [''] * len(batch)
-    results = [''] * len(batch) # status where the machine halts or error occurs
-    corrects = [True] * len(batch) if corrects is None else corrects
-    checkers = [LeftMaskTMChecker(input) if corrects[i] else None for i, input in enumerate(batch)]
-    finished = [not correct for correct in corrects]
-    step = 0
-
-    while not _check_stop(batch, corrects, finished):
-        step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += model_response
-            results[i] = model_response
-            # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
-                results[i] = batch[i] + '\n' + model_response
-                corrects[i] = False
-                finished[i] = True
-            else:
-                checker.one_step()
-            batch[i] = model_response
-
-        finished = _check_finished(batch, corrects, finished)
+def llm_reflection_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_basic_batch(model, tokenizer, 'reflection', get_entry('reflection', 'checker'), batch, corrects, finished)
 
-    return results, corrects
+def llm_left_mask_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_basic_batch(model, tokenizer, 'left_mask', get_entry('left_mask', 'checker'), batch, corrects, finished)
 
 def llm_equal_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('equal')
-    gen_kwargs = dict(
-        max_length=4096,
-        pad_token_id=tokenizer.eos_token_id,
-        do_sample=False,
-    )
-    accumulate_outputs = [''] * len(batch)
-    results = [''] * len(batch) # status where the machine halts or error occurs
-    corrects = [True] * len(batch) if corrects is None else corrects
-    checkers = [EqualTMChecker(input) if corrects[i] else None for i, input in enumerate(batch)]
-    finished = [not correct for correct in corrects]
-    step = 0
-
-    while not _check_stop(batch, corrects, finished):
-        step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += model_response
-            results[i] = model_response
-            # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
-                results[i] = batch[i] + '\n' + model_response
-                corrects[i] = False
-                finished[i] = True
-            else:
-                checker.one_step()
-            batch[i] = model_response
-
-        finished = _check_finished(batch, corrects, finished)
-
-    return results, corrects
+    return _llm_basic_batch(model, tokenizer, 'equal', get_entry('equal', 'checker'), batch, corrects, finished)
 
 def llm_greater_than_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('greater_than')
-    gen_kwargs = dict(
-        max_length=4096,
-        pad_token_id=tokenizer.eos_token_id,
-        do_sample=False,
-    )
-    accumulate_outputs = [''] * len(batch)
-    results = [''] * len(batch) # status where the machine halts or error occurs
-    corrects = [True] * len(batch) if corrects is None else corrects
-    new_finished = [not correct for correct in corrects]
-    if finished:
-        for i in range(len(finished)):
-            if finished[i]:
-                new_finished[i] = True
-    finished = new_finished
-    checkers = [GreaterThanTMChecker(input) if (corrects[i] and not finished[i]) else None for i, input in enumerate(batch)]
-    step = 0
-
-    while not _check_stop(batch, corrects, finished):
-        step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += model_response
-            results[i] = model_response
-            # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
-                results[i] = batch[i] + '\n' + model_response
-                corrects[i] = False
-                finished[i] = True
-            else:
-                checker.one_step()
-            batch[i] = model_response
-
-        finished = _check_finished(batch, corrects, finished)
-
-    return results, corrects
+    return _llm_basic_batch(model, tokenizer, 'greater_than', get_entry('greater_than', 'checker'), batch, corrects, finished)
 
 def llm_less_than_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('less_than')
-    gen_kwargs = dict(
-        max_length=4096,
-        pad_token_id=tokenizer.eos_token_id,
-        do_sample=False,
-    )
-    accumulate_outputs = [''] * len(batch)
-    results = [''] * len(batch) # status where the machine halts or error occurs
-    corrects = [True] * len(batch) if corrects is None else corrects
-    # checkers = [LessThanTMChecker(input) if corrects[i] else None for i, input in enumerate(batch)]
-    # finished = [not correct for correct in corrects]
-    new_finished = [not correct for correct in corrects]
-    if finished:
-        for i in range(len(finished)):
-            if finished[i]:
-                new_finished[i] = True
-    finished = new_finished
-    checkers = [LessThanTMChecker(input) if (corrects[i] and not finished[i]) else None for i, input in enumerate(batch)]
-    step = 0
-
-    while not _check_stop(batch, corrects, finished):
-        step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += model_response
-            results[i] = model_response
-            # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
-                results[i] = batch[i] + '\n' + model_response
-                corrects[i] = False
-                finished[i] = True
-            else:
-                checker.one_step()
-            batch[i] = model_response
-
-        finished = _check_finished(batch, corrects, finished)
-
-    return results, corrects
+    return _llm_basic_batch(model, tokenizer, 'less_than', get_entry('less_than', 'checker'), batch, corrects, finished)
 
-op_2_func = {
-    'add': llm_add_batch,
-    'reflection': llm_reflection_batch,
-    'left_mask': llm_left_mask_batch,
-    'less_than': llm_less_than_batch,
-    'greater_than': llm_greater_than_batch,
-}
+def llm_borrow_sub_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_basic_batch(model, tokenizer, 'borrow_sub', get_entry('borrow_sub', 'checker'), batch, corrects, finished)
 
-def _check_finished_sub(batch, corrects, finished):
+def _check_finished_pattern(pattern, batch, corrects, finished):
     # any correct answer is halt state, set True in `finished`
     for i in range(len(batch)): 
-        if corrects[i] and re.findall(SUB_FINISH_PATTERN, batch[i]):
+        if corrects[i] and re.findall(pattern, batch[i]):
             finished[i] = True
     return finished
 
-def llm_sub_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('sub')
-    gen_kwargs = dict(
-        max_length=4096,
-        pad_token_id=tokenizer.eos_token_id,
-        do_sample=False,
-    )
-    accumulate_outputs = [''] * len(batch)
-    results = [''] * len(batch) # status where the machine halts or error occurs
-    corrects = [True] * len(batch) if corrects is None else corrects
-    checkers = [SubtractionTMChecker(input) if corrects[i] else None for i, input in enumerate(batch)]
-    finished = [not correct for correct in corrects]
-    step = 0
-
-    while not _check_stop(batch, corrects, finished):
-        step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        # process model outputs
-        inits = [''] * len(batch)
-        func = None
-        call_flag = False
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            # call_flag = False
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += '\n' + model_response
-            # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
-                results[i] = batch[i] + '\n' + model_response
-                corrects[i] = False
-                finished[i] = True
-                continue
-            else:
-                checker.one_step()
-            # check function call
-            matches = re.findall(CALL_PATTERN, model_response)
-            if matches:
-                # prepare call
-                call_op, _ = matches[0]
-                call_op = call_op.lower()
-                splits = model_response.split('\n')
-                inits[i] = splits[2] + '\n' + splits[3] + '\n'
-                func = op_2_func[call_op]
-                call_flag = True
-                batch[i] = splits[0] + '\n' + splits[1] + '\n'
-            else:
-                batch[i] = model_response
+def _check_finished_sub(batch, corrects, finished):
+    return _check_finished_pattern(SUB_FINISH_PATTERN, batch, corrects, finished)
 
-        finished = _check_finished_sub(batch, corrects, finished)
+def _check_finished_mul(batch, corrects, finished):
+    return _check_finished_pattern(MUL_FINISH_PATTERN, batch, corrects, finished)
 
-        if call_flag:
-            call_responses, corrects = func(model, tokenizer, inits, corrects)
-            model.set_adapter('sub')
-            for i in range(len(batch)):
-                batch[i] += call_responses[i]
-                if not corrects[i]:
-                    finished[i] = True
-                    if len(call_responses[i]) > 0:
-                        results[i] = call_responses[i]  
+def _check_finished_div(batch, corrects, finished):
+    return _check_finished_pattern(DIV_FINISH_PATTERN, batch, corrects, finished)
 
-    for i, accumulate_output in enumerate(accumulate_outputs):
-        if corrects[i]:
-            results[i] = accumulate_output.split('\n')[-2]
+def _check_finished_long_mul(batch, corrects, finished):
+    return _check_finished_pattern(LONG_MUL_FINISH_PATTERN, batch, corrects, finished)
 
-    return results, corrects
+def _check_finished_long_div(batch, corrects, finished):
+    return _check_finished_pattern(LONG_DIV_FINISH_PATTERN, batch, corrects, finished)
 
-def _check_finished_mul(batch, corrects, finished):
-    # any correct answer is halt state, set True in `finished`
-    for i in range(len(batch)): 
-        if corrects[i] and re.findall(MUL_FINISH_PATTERN, batch[i]):
-            finished[i] = True
-    return finished
+def _llm_call_batch(model, tokenizer, adapter, checker_cls, finish_pattern, batch, corrects=None, finished=None):
+    with span('execute', cat='machine', op=adapter):
+        return _llm_call_loop(model, tokenizer, adapter, checker_cls, finish_pattern, batch, corrects, finished)
 
-def llm_mul_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('mul')
+def _llm_call_loop(model, tokenizer, adapter, checker_cls, finish_pattern, batch, corrects=None, finished=None):
     gen_kwargs = dict(
         max_length=4096,
         pad_token_id=tokenizer.eos_token_id,
@@ -466,176 +507,174 @@ def llm_mul_batch(model, tokenizer, batch, corrects=None, finished=None):
     accumulate_outputs = [''] * len(batch)
     results = [''] * len(batch) # status where the machine halts or error occurs
     corrects = [True] * len(batch) if corrects is None else corrects
-    checkers = [MultiplicationTMChecker(input) if corrects[i] else None for i, input in enumerate(batch)]
-    finished = [not correct for correct in corrects]
+    finished = _merge_finished(corrects, finished)
+    with span('build_checkers', op=adapter):
+        checkers = _build_checkers(checker_cls, batch, corrects, finished)
     step = 0
 
     while not _check_stop(batch, corrects, finished):
         step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        # prepare for function call
-        inits = [''] * len(batch)
-        func = None
-        call_flag = False
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            # call_flag = False
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
+        expected = _expected_outputs(checkers, corrects, finished)
+        outputs = _wrapper_generate(model, tokenizer, adapter, gen_kwargs, batch, corrects, finished, expected, step)
+
+        # process model outputs and prepare for function call, rows may call different machines
+        calls = dict()
+        active = _active_indices(corrects, finished)
+        with span('decode', op=adapter, step=step):
+            decoded = _decode_outputs(tokenizer, outputs, active)
+        with span('validate', op=adapter, step=step):
+            validate = partial(_validate_call, context=span_context(op=adapter, step=step))
+            validated = _map(_check_pool, validate, [checkers[i] for i in active], [batch[i] for i in active], decoded)
+        for i, (model_response, correct, call) in zip(active, validated):
             accumulate_outputs[i] += '\n' + model_response
             # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
+            if not correct:
                 results[i] = batch[i] + '\n' + model_response
                 corrects[i] = False
                 finished[i] = True
                 continue
-            else:
-                checker.one_step()
-            # check function call
-            matches = re.findall(CALL_PATTERN, model_response)
-            if matches:
-                # prepare call
-                call_op, _ = matches[0]
-                call_op = call_op.lower()
-                splits = model_response.split('\n')
-                inits[i] = splits[2] + '\n' + splits[3] + '\n'
-                func = op_2_func[call_op]
-                call_flag = True
-                batch[i] = splits[0] + '\n' + splits[1] + '\n'
+            if call:
+                call_op, batch[i], init = call
+                if call_op not in calls:
+                    calls[call_op] = []
+                calls[call_op].append((i, init))
             else:
                 batch[i] = model_response
 
-        finished = _check_finished_mul(batch, corrects, finished)
-
-        if call_flag:
-            call_responses, corrects = func(model, tokenizer, inits, corrects, finished)
-            model.set_adapter('mul')
-            for i in range(len(batch)):
-                batch[i] += call_responses[i]
-                if not corrects[i]:
+        finished = _check_finished_pattern(finish_pattern, batch, corrects, finished)
+
+        for call_op, call_rows in calls.items():
+            func = get_entry(call_op, 'executor')
+            # the called machine runs on a compact batch of the rows calling it, `rows` maps it back to this batch
+            rows = [i for i, _ in call_rows]
+            inits = [init for _, init in call_rows]
+            call_corrects = [corrects[i] for i in rows]
+            call_finished = [finished[i] for i in rows]
+            usage = _enter_call_rows(rows)
+            try:
+                with call_span(call_op, caller=adapter, step=step, rows=len(rows)):
+                    call_responses, call_corrects = func(model, tokenizer, inits, call_corrects, call_finished)
+            finally:
+                _leave_call_rows(rows, usage)
+            for i, call_response, correct in zip(rows, call_responses, call_corrects):
+                corrects[i] = correct
+                response = call_response
+                # composite machines only return the halt state
+                if correct and HALT_OUTPUT not in response:
+                    response += '\n' + HALT_OUTPUT
+                batch[i] += response
+                if not correct:
                     finished[i] = True
-                    if len(call_responses[i]) > 0:
-                        results[i] = call_responses[i]
+                    if len(call_response) > 0:
+                        results[i] = call_response
+
+        _check_budget(batch, results, corrects, finished)
 
     for i, accumulate_output in enumerate(accumulate_outputs):
-        if corrects[i]:
+        # rows finished by the caller have no output
+        if corrects[i] and accumulate_output:
             results[i] = accumulate_output.split('\n')[-2]
 
     return results, corrects
 
-def _check_finished_div(batch, corrects, finished):
-    # any correct answer is halt state, set True in `finished`
-    for i in range(len(batch)): 
-        if corrects[i] and re.findall(DIV_FINISH_PATTERN, batch[i]):
-            finished[i] = True
-    return finished
+def llm_sub_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_call_batch(model, tokenizer, 'sub', get_entry('sub', 'checker'), SUB_FINISH_PATTERN, batch, corrects, finished)
+
+def llm_mul_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_call_batch(model, tokenizer, 'mul', get_entry('mul', 'checker'), MUL_FINISH_PATTERN, batch, corrects, finished)
 
 def llm_div_batch(model, tokenizer, batch, corrects=None, finished=None):
-    model.set_adapter('div')
-    gen_kwargs = dict(
-        max_length=4096,
-        pad_token_id=tokenizer.eos_token_id,
-        do_sample=False,
-    )
-    accumulate_outputs = [''] * len(batch)
-    results = [''] * len(batch) # status where the machine halts or error occurs
-    corrects = [True] * len(batch) if corrects is None else corrects
-    checkers = [DivisionTMChecker(input) if corrects[i] else None for i, input in enumerate(batch)]
-    finished = [not correct for correct in corrects]
-    step = 0
+    return _llm_call_batch(model, tokenizer, 'div', get_entry('div', 'checker'), DIV_FINISH_PATTERN, batch, corrects, finished)
 
-    while not _check_stop(batch, corrects, finished):
-        step += 1
-        outputs = _wrapper_generate(model, tokenizer, gen_kwargs, batch, corrects, finished)
-
-        # prepare for function call
-        inits = [''] * len(batch)
-        func = None
-        call_flag = False
-        for i, output in enumerate(outputs):
-            # skip if error has occurred or finished
-            if not corrects[i] or finished[i]:
-                continue
-            # call_flag = False
-            model_response = extract_answer(batch[i],
-                                                tokenizer.decode(output, skip_special_tokens=True))
-            accumulate_outputs[i] += '\n' + model_response
-            # remove from batch if error occurs
-            checker = checkers[i]
-            if not checker.check(model_response):
-                results[i] = batch[i] + '\n' + model_response
-                corrects[i] = False
-                finished[i] = True
-                continue
-            else:
-                checker.one_step()
-            # check function call
-            matches = re.findall(CALL_PATTERN, model_response)
-            if matches:
-                # prepare call
-                call_op, _ = matches[0]
-                call_op = call_op.lower()
-                splits = model_response.split('\n')
-                inits[i] = splits[2] + '\n' + splits[3] + '\n'
-                func = op_2_func[call_op]
-                call_flag = True
-                batch[i] = splits[0] + '\n' + splits[1] + '\n'
-            else:
-                batch[i] = model_response
+def llm_long_mul_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_call_batch(model, tokenizer, 'long_mul', get_entry('long_mul', 'checker'), LONG_MUL_FINISH_PATTERN, batch, corrects, finished)
 
-        finished = _check_finished_div(batch, corrects, finished)
+def llm_long_div_batch(model, tokenizer, batch, corrects=None, finished=None):
+    return _llm_call_batch(model, tokenizer, 'long_div', get_entry('long_div', 'checker'), LONG_DIV_FINISH_PATTERN, batch, corrects, finished)
 
-        if call_flag:
-            call_responses, corrects = func(model, tokenizer, inits, corrects, finished)
-            model.set_adapter('div')
-            for i in range(len(batch)):
-                batch[i] += call_responses[i]
-                if not corrects[i]:
-                    finished[i] = True
-                    if len(call_responses[i]) > 0:
-                        results[i] = call_responses[i]      
+def _split_micro_batches(batch, num):
+    size = (len(batch) + num - 1) // num
+    return [batch[i:i + size] for i in range(0, len(batch), size)]
 
-    for i, accumulate_output in enumerate(accumulate_outputs):
-        if corrects[i]:
-            results[i] = accumulate_output.split('\n')[-2]
+def llm_execute_batch(model, tokenizer, batch, task, alignment):
+    cache = executor_config['cache']
+    if cache is None:
+        return _llm_execute_micro_batches(model, tokenizer, batch, task, alignment)
+    keys = [cache.key(task, expression, alignment) for expression in batch]
+    cached = [cache.get(key) for key in keys]
+    # identical expressions of the batch are executed once
+    misses = {}
+    for i, key in enumerate(keys):
+        if cached[i] is None and key not in misses:
+            misses[key] = i
+    executor_stats['cache_hits'] += len(batch) - len(misses)
+    executor_stats['cache_misses'] += len(misses)
+    computed = {}
+    if misses:
+        miss_batch = [batch[i] for i in misses.values()]
+        responses, corrects = _llm_execute_micro_batches(model, tokenizer, miss_batch, task, alignment)
+        for key, response, correct in zip(misses, responses, corrects):
+            computed[key] = (response, correct)
+            # failed rows depend on executor options such as early exit, only verified results are kept
+            if correct:
+                cache.put(key, response)
+    results, corrects = [], []
+    for i, key in enumerate(keys):
+        response, correct = (cached[i], True) if cached[i] is not None else computed[key]
+        results.append(response)
+        corrects.append(correct)
+    return results, corrects
 
+def _llm_execute_micro_batches(model, tokenizer, batch, task, alignment):
+    micro_batches = executor_config['micro_batches']
+    if micro_batches <= 1 or len(batch) < 2:
+        return _llm_execute_batch(model, tokenizer, batch, task, alignment)
+    # double buffering: while one micro-batch holds the model, the others decode, check and re-tokenize
+    chunks = _split_micro_batches(batch, micro_batches)
+    depth = current_depth()
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = [pool.submit(run_at_depth, depth, _llm_execute_batch, model, tokenizer, chunk, task, alignment)
+                   for chunk in chunks]
+        chunk_results = [future.result() for future in futures]
+    results, corrects = [], []
+    for chunk_responses, chunk_corrects in chunk_results:
+        results.extend(chunk_responses)
+        corrects.extend(chunk_corrects)
     return results, corrects
 
-def llm_execute_batch(model, tokenizer, batch, task, alignment):
-    task_func_mapping = dict(
-        add=llm_add_batch,
-        reflection=llm_reflection_batch,
-        left_mask=llm_left_mask_batch,
-        sub=llm_sub_batch,
-        equal=llm_equal_batch,
-        greater_than=llm_greater_than_batch,
-        less_than=llm_less_than_batch,
-        mul=llm_mul_batch,
-        div=llm_div_batch,
-    )
+def _llm_execute_batch(model, tokenizer, batch, task, alignment):
+    # every row is charged, the budgets only stop rows when `max_steps` or `max_tokens` is set
+    _budget.usage = ([0] * len(batch), [0] * len(batch))
     try:
         if alignment:
-            pre_align_batch, corrects = _pre_align_batch(model, tokenizer, task, batch)
-            func = task_func_mapping[task]
+            with span('pre_align', cat='align', op=task):
+                pre_align_batch, corrects = _pre_align_batch(model, tokenizer, task, batch)
+            func = get_entry(task, 'executor')
             executor_responses, corrects = func(model, tokenizer, pre_align_batch, corrects)
             # append halt output
             for i in range(len(executor_responses)):
                 if corrects[i] and HALT_OUTPUT not in executor_responses[i]:
                     executor_responses[i] += '\n' + HALT_OUTPUT
-            post_align_batch, corrects = _post_align_batch(model, tokenizer, task, executor_responses, corrects)
+            with span('post_align', cat='align', op=task):
+                post_align_batch, corrects = _post_align_batch(model, tokenizer, task, executor_responses, corrects)
             # record error
             for i in range(len(batch)):
                 post_align_batch[i] = executor_responses[i] if not post_align_batch[i] else post_align_batch[i]
                 post_align_batch[i] = pre_align_batch[i] if not post_align_batch[i] else post_align_batch[i]
+            if executor_config['reorder']:
+                # write the expression back in the user's operand order
+                aligner = TMAligner()
+                for i in range(len(batch)):
+                    if corrects[i]:
+                        post_align_batch[i] = aligner.restore_expression(batch[i], post_align_batch[i])
             return post_align_batch, corrects
         else:
-            func = task_func_mapping[task]
+            func = get_entry(task, 'executor')
             executor_responses, corrects = func(model, tokenizer, batch)
             return executor_responses, corrects
     except KeyError:
         raise ValueError(f'Invalid task: {task}')
+    finally:
+        _record_row_steps(_budget.usage[0])
+        _budget.usage = None
 
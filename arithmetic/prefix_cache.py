@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict
+import torch
+from transformers import DynamicCache
+
+r""" Shared-prompt prefix caching for `model.generate`.
+
+In prompted mode every sample starts with the same instruction text of its task,
+e.g. `MULTIPLICATION_PROMPT` or `ALIGNMENT_PROMPT` in `synthetic/*_generate.py`.
+The KV cache of that prefix is computed once per adapter and reused by every batch,
+only the tokens after it are prefilled.
+
+The rows are tokenized apart and laid out as [prefix][padding][suffix] instead of
+left padding. The padding is masked, and the position ids of the suffix are derived
+from the attention mask, so they continue right after the prefix as if there was no padding.
+
+The prefix of a batch is a cached prefix shared by all its rows, otherwise the longest
+common token prefix of the rows, cut after its last newline so that it stays the same
+from one batch to the next. Prefixes shorter than `min_length` tokens are not worth caching.
+"""
+
+def _common_prefix_length(rows):
+    n = min(len(row) for row in rows)
+    first = rows[0]
+    for row in rows[1:]:
+        i = 0
+        while i < n and row[i] == first[i]:
+            i += 1
+        n = i
+    return n
+
+
+class PrefixCache:
+    def __init__(self, min_length=64, capacity=16):
+        self.min_length = min_length
+        self.capacity = capacity
+        # (adapter, prefix token ids) -> legacy cache of the prefix, for batch size 1
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached_prefix(self, adapter, rows):
+        # the longest cached prefix of the adapter shared by all rows
+        with self.lock:
+            prefixes = [prefix for (a, prefix) in self.entries if a == adapter]
+        best = None
+        for prefix in prefixes:
+            n = len(prefix)
+            if best is not None and n <= len(best):
+                continue
+            if all(len(row) > n and tuple(row[:n]) == prefix for row in rows):
+                best = prefix
+        return best
+
+    def _new_prefix(self, tokenizer, rows):
+        if len(rows) < 2:
+            # the common prefix of a single row is the row itself
+            return None
+        # keep at least one token of every row after the prefix
+        n = min(_common_prefix_length(rows), min(len(row) for row in rows) - 1)
+        while n > 0 and '\n' not in tokenizer.decode([rows[0][n - 1]]):
+            n -= 1
+        return tuple(rows[0][:n])
+
+    def build_inputs(self, tokenizer, adapter, batch):
+        # returns the inputs laid out around the shared prefix and the prefix, or None to generate as usual
+        # without padding, like `tokenize_batch`, the padding of the shared tokenizer is never switched
+        rows = tokenizer(batch, padding=False)['input_ids']
+        prefix = self._cached_prefix(adapter, rows)
+        if prefix is None:
+            prefix = self._new_prefix(tokenizer, rows)
+        if prefix is None or len(prefix) < self.min_length:
+            return None, None
+        n = len(prefix)
+        suffixes = [row[n:] for row in rows]
+        width = max(len(suffix) for suffix in suffixes)
+        pad = tokenizer.pad_token_id
+        input_ids = [list(prefix) + [pad] * (width - len(suffix)) + suffix for suffix in suffixes]
+        attention_mask = [[1] * n + [0] * (width - len(suffix)) + [1] * len(suffix) for suffix in suffixes]
+        inputs = dict(
+            input_ids=torch.tensor(input_ids),
+            attention_mask=torch.tensor(attention_mask),
+        )
+        return inputs, prefix
+
+    def past_key_values(self, model, adapter, prefix, batch_size):
+        # must be called with `adapter` active, the keys and values depend on the adapter
+        key = (adapter, prefix)
+        with self.lock:
+            legacy = self.entries.get(key)
+            if legacy is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if legacy is None:
+            with torch.no_grad():
+                outputs = model(input_ids=torch.tensor([list(prefix)], device=model.device),
+                                past_key_values=DynamicCache(), use_cache=True)
+            legacy = outputs.past_key_values
+            if isinstance(legacy, DynamicCache):
+                legacy = legacy.to_legacy_cache()
+            with self.lock:
+                self.misses += 1
+                self.entries[key] = legacy
+                while len(self.entries) > self.capacity:
+                    self.entries.popitem(last=False)
+        # generate appends to the cache, every call gets its own copy
+        expanded = tuple(
+            (k.expand(batch_size, -1, -1, -1).contiguous(), v.expand(batch_size, -1, -1, -1).contiguous())
+            for k, v in legacy
+        )
+        return DynamicCache.from_legacy_cache(expanded)
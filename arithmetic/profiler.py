@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+
+r""" Profiling hooks for the executor loop.
+
+Every phase of a step runs in a span: tokenize, adapter switch, generate, decode,
+extract_answer, check, CALL parsing, ... Spans record the operator (adapter), the step
+of its loop and the depth of nested CALLs, e.g. ADD called by MUL runs at depth 1.
+The depth is kept per thread: work handed to another thread carries the depth of its caller,
+`span_context` for the spans of pool tasks, `run_at_depth` for threads running a whole batch.
+
+Profiling is off by default, `span` then returns a shared no-op object, so the hooks
+cost one function call. When enabled, spans are exported as Chrome trace JSON
+(chrome://tracing or https://ui.perfetto.dev) and summarized in a table.
+
+Example:
+enable_profiler()
+... llm_execute_batch(...) ...
+profiler = get_profiler()
+profiler.export_chrome_trace('log/trace.json')
+print(profiler.summary())
+"""
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, profiler, name, cat, args):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.profiler.record(self.name, self.cat, self.start, end, self.args)
+        return False
+
+
+class _CallSpan(_Span):
+    # a span of the caller that moves the thread one CALL deeper while it is open
+    def __enter__(self):
+        super().__enter__()
+        self.profiler.local.depth = self.profiler.depth() + 1
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.local.depth = self.profiler.depth() - 1
+        return super().__exit__(*exc)
+
+
+class Profiler:
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.origin = time.perf_counter_ns()
+        self.pid = os.getpid()
+
+    def depth(self):
+        return getattr(self.local, 'depth', 0)
+
+    def record(self, name, cat, start, end, args):
+        # spans recorded on behalf of another thread carry its depth
+        args = dict(args)
+        args.setdefault('depth', self.depth())
+        event = dict(
+            name=name,
+            cat=cat,
+            ph='X',
+            ts=(start - self.origin) / 1000,
+            dur=(end - start) / 1000,
+            pid=self.pid,
+            tid=threading.get_ident(),
+            args=args,
+        )
+        with self.lock:
+            self.events.append(event)
+
+    def export_chrome_trace(self, path):
+        with self.lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+
+    def summary(self):
+        # aggregate spans by phase and operator
+        with self.lock:
+            events = list(self.events)
+        rows = {}
+        for event in events:
+            op = event['args'].get('op')
+            key = (event['cat'], event['name'] if op is None else f"{event['name']}[{op}]")
+            count, total, longest = rows.get(key, (0, 0.0, 0.0))
+            rows[key] = (count + 1, total + event['dur'], max(longest, event['dur']))
+        lines = [f"{'category':<10} {'span':<32} {'count':>8} {'total ms':>12} {'mean ms':>10} {'max ms':>10}"]
+        for (cat, name), (count, total, longest) in sorted(rows.items(), key=lambda item: -item[1][1]):
+            lines.append(f'{cat:<10} {name:<32} {count:>8} {total / 1000:>12.2f} {total / count / 1000:>10.3f} {longest / 1000:>10.3f}')
+        return '\n'.join(lines)
+
+
+_profiler = None
+
+def enable_profiler():
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+def disable_profiler():
+    global _profiler
+    _profiler = None
+
+def get_profiler():
+    return _profiler
+
+def span(name, cat='phase', **args):
+    if _profiler is None:
+        return _NULL_SPAN
+    return _Span(_profiler, name, cat, args)
+
+def call_span(callee, **args):
+    # wraps the execution of a called machine, spans inside it are one CALL deeper
+    if _profiler is None:
+        return _NULL_SPAN
+    return _CallSpan(_profiler, 'call', 'call', dict(args, op=callee))
+
+def span_context(**args):
+    # the attributes of the spans a pool task records for this thread, its depth included
+    if _profiler is None:
+        return args
+    return dict(args, depth=_profiler.depth())
+
+def current_depth():
+    if _profiler is None:
+        return 0
+    return _profiler.depth()
+
+def run_at_depth(depth, func, *args):
+    # run `func` on this thread at the CALL depth of the thread it works for
+    if _profiler is None:
+        return func(*args)
+    previous = _profiler.depth()
+    _profiler.local.depth = depth
+    try:
+        return func(*args)
+    finally:
+        _profiler.local.depth = previous
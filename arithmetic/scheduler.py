@@ -0,0 +1,36 @@
+from turing_machine.alignment.cost import expected_steps
+
+r""" Cost-based admission control for the executor.
+
+The cost of an expression is estimated from its operands before it is executed
+(see `turing_machine/alignment/cost.py`), e.g. MUL loops `op2` times and DIV loops `op1 // op2` times.
+With the estimate, an expression is:
+- admitted: it runs in the default queue with the other cheap expressions;
+- deferred: it runs in a dedicated queue, served when the default queue is empty,
+  so a single expensive expression does not hold a batch of cheap ones;
+- rejected: it is not executed at all.
+
+`max_cost` and `defer_cost` are in generation steps, 0 disables the corresponding decision.
+"""
+
+ADMIT = 'admit'
+DEFER = 'defer'
+REJECT = 'reject'
+
+class CostScheduler:
+    def __init__(self, max_cost=0, defer_cost=0, reorder=False):
+        self.max_cost = max_cost
+        self.defer_cost = defer_cost
+        # with operand reordering, commutative tasks run the cheaper order
+        self.reorder = reorder
+
+    def estimate(self, task, op1, op2):
+        return expected_steps(task, op1, op2, self.reorder)
+
+    def admit(self, task, op1, op2):
+        cost = self.estimate(task, op1, op2)
+        if self.max_cost > 0 and cost > self.max_cost:
+            return REJECT, cost
+        if self.defer_cost > 0 and cost > self.defer_cost:
+            return DEFER, cost
+        return ADMIT, cost
@@ -0,0 +1,278 @@
+import re
+import json
+import time
+import random
+import argparse
+import torch
+
+from arithmetic.llm_arithmetic_batch import llm_execute_batch, configure_executor, executor_stats
+from turing_machine.alignment.aligner import TMAligner
+from turing_machine.alignment.cost import parse_operands
+from benchmarks.bench_tm import legal_tasks, task_machine_mapping, call_tasks, make_ops, checker_io
+
+r""" End-to-end throughput benchmark of the executor orchestration with a simulated model.
+
+`llm_execute_batch` runs every task, with and without alignment, against a simulated model instead
+of the 8B model with its adapters. The simulated model answers every prompt from the reference machines,
+so everything but the forward passes is measured: batching, adapter switches, checkers, CALLs, alignment.
+
+The simulated model:
+- tokenizes one character per token, token 0 is both the padding and the eos;
+- answers the prompts of a machine with its next transition, the transitions of a machine are
+  registered when its initial state is seen, aligners translate between expressions and states;
+- decodes the rows of a generate call in lockstep, sleeping `--call_latency_ms` per call and
+  `--token_latency_ms` per decoding step, and honours the stopping criteria (early exit);
+- corrupts a response with probability `--error_rate`.
+
+Every task runs once to warm the simulated model up, then it is timed on the same samples.
+Reported per task: samples/sec, generate calls and rows per call, adapter switches,
+and the mean and p99 generate steps per sample, called machines and alignment included.
+
+Example:
+python -m benchmarks.bench_executor --tasks add mul --num_samples 256 --batch_size 32 --token_latency_ms 0.05
+python -m benchmarks.bench_executor --micro_batches 2 --num_workers 4 --early_exit --error_rate 0.01
+# micro-batches in which every row fails before the output aligner
+python -m benchmarks.bench_executor --micro_batches 2 --error_rate 0.02
+python -m benchmarks.bench_executor --micro_batches 2 --error_rate 1 --tasks add mul
+"""
+
+UNKNOWN_OUTPUT = """Unknown state."""
+
+def _state_key(text):
+    # the state and the command of a machine select its transition, the halt lines of a called machine do not
+    return '\n'.join(text.strip().split('\n')[:2])
+
+
+class _Encoding(dict):
+    # the executor moves its inputs to the GPU, the simulated model runs where the tensors are
+    def to(self, device):
+        return self
+
+
+class SimulatedTokenizer:
+    eos_token_id = 0
+    pad_token_id = 0
+    padding_side = 'left'
+
+    def encode(self, text):
+        return [ord(c) + 1 for c in text]
+
+    def __call__(self, batch, return_tensors=None, padding=False):
+        if isinstance(batch, str):
+            return _Encoding(input_ids=self.encode(batch))
+        rows = [self.encode(text) for text in batch]
+        if return_tensors is None:
+            return _Encoding(input_ids=rows)
+        width = max(len(row) for row in rows)
+        input_ids = [[self.pad_token_id] * (width - len(row)) + row for row in rows]
+        attention_mask = [[0] * (width - len(row)) + [1] * len(row) for row in rows]
+        return _Encoding(input_ids=torch.tensor(input_ids), attention_mask=torch.tensor(attention_mask))
+
+    def decode(self, ids, skip_special_tokens=True):
+        if isinstance(ids, torch.Tensor):
+            ids = ids.tolist()
+        return ''.join(chr(i - 1) for i in ids if i > 0)
+
+    def batch_decode(self, sequences, skip_special_tokens=True):
+        return [self.decode(ids, skip_special_tokens) for ids in sequences]
+
+
+class ReferenceOracle:
+    def __init__(self):
+        self.aligner = TMAligner()
+        # state and command of a machine -> its next transition
+        self.transitions = {}
+
+    def _register(self, state):
+        # the initial state of a machine registers all its transitions
+        match = re.match(r'([A-Z_]+), q0, ', state)
+        if not match or match.group(1).lower() not in task_machine_mapping:
+            return
+        task = match.group(1).lower()
+        ops = parse_operands(state)
+        ops = ops[:1] if task == 'left_mask' else ops[:2]
+        tm_cls, _ = task_machine_mapping[task]
+        seq = tm_cls(*ops).get_transition_seq()
+        if task in call_tasks:
+            for input, output in seq:
+                self.transitions[_state_key(input)] = output
+        else:
+            for (state, cmd), (next_state, next_cmd) in zip(seq, seq[1:]):
+                self.transitions[_state_key(state + '\n' + cmd)] = next_state + '\n' + next_cmd + '\n'
+
+    def _align(self, task, prompt):
+        prompt = prompt.strip()
+        if re.match(r'\d+\s*\D+\s*\d+\s*=$', prompt):
+            # input aligner: expression -> initial state
+            return self.aligner.input_to_tm(prompt, task)
+        # output aligner: halt state -> expression with its result
+        state = prompt.split('\n')[0]
+        op1, op2 = parse_operands(state)[:2]
+        return self.aligner.tm_to_output(state, op1, op2, task)
+
+    def respond(self, adapter, prompt):
+        if adapter.endswith('_aligner'):
+            return self._align(adapter[:-len('_aligner')], prompt)
+        key = _state_key(prompt)
+        if key not in self.transitions:
+            self._register(prompt.strip().split('\n')[0])
+        return self.transitions.get(key, UNKNOWN_OUTPUT)
+
+
+class SimulatedModel:
+    def __init__(self, tokenizer, token_latency=0.0, call_latency=0.0, error_rate=0.0, seed=42):
+        self.tokenizer = tokenizer
+        self.oracle = ReferenceOracle()
+        self.token_latency = token_latency
+        self.call_latency = call_latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.device = torch.device('cpu')
+        self.reset()
+
+    def reset(self):
+        # a pass starts with no adapter loaded, so its first switch is counted like the warm-up's
+        self.active_adapter = None
+        self.random = random.Random(self.seed)
+        self.calls = 0
+        self.rows = 0
+        self.switches = 0
+        self.decode_steps = 0
+
+    def set_adapter(self, adapter):
+        if adapter != self.active_adapter:
+            self.switches += 1
+        self.active_adapter = adapter
+
+    def _respond(self, prompt):
+        response = self.oracle.respond(self.active_adapter, prompt)
+        if self.error_rate > 0 and self.random.random() < self.error_rate:
+            response = response[:1] + '#' + response[1:]
+        return response
+
+    def generate(self, input_ids, attention_mask, max_length=4096, pad_token_id=0, stopping_criteria=None, **kwargs):
+        self.calls += 1
+        self.rows += input_ids.shape[0]
+        prompt_length = input_ids.shape[1]
+        responses = []
+        for row, mask in zip(input_ids.tolist(), attention_mask.tolist()):
+            prompt = self.tokenizer.decode([token for token, m in zip(row, mask) if m])
+            responses.append(self.tokenizer.encode(self._respond(prompt)) + [self.tokenizer.eos_token_id])
+        width = min(max(len(response) for response in responses), max_length - prompt_length)
+        generated = torch.tensor([response[:width] + [pad_token_id] * (width - len(response)) for response in responses],
+                                 dtype=input_ids.dtype).reshape(len(responses), width)
+        outputs = torch.cat([input_ids, generated], dim=1)
+        # rows stop after their eos, or when the stopping criteria stop them
+        lengths = [min(len(response), width) for response in responses]
+        steps = max(lengths)
+        if stopping_criteria is not None:
+            for t in range(width):
+                if all(length <= t for length in lengths):
+                    break
+                stops = stopping_criteria[0](outputs[:, :prompt_length + t + 1], None).tolist()
+                lengths = [t + 1 if stop and length > t else length for length, stop in zip(lengths, stops)]
+            steps = max(lengths)
+            for i, length in enumerate(lengths):
+                outputs[i, prompt_length + length:] = pad_token_id
+        outputs = outputs[:, :prompt_length + steps]
+        self.decode_steps += steps
+        time.sleep(self.call_latency + self.token_latency * steps)
+        return outputs
+
+
+def build_workload(task, alignment, num_samples, min_digits, max_digits, seed=42):
+    rng = random.Random(seed)
+    aligner = TMAligner()
+    batch = []
+    for i in range(num_samples):
+        n = rng.randint(min_digits, max_digits)
+        ops = make_ops(task, n, seed=seed + i)
+        if alignment:
+            batch.append(f'{ops[0]}{aligner.task_2_op[task]}{ops[1]}=')
+        else:
+            tm_cls, _ = task_machine_mapping[task]
+            prompt, _ = checker_io(task, tm_cls(*ops).get_transition_seq())
+            batch.append(prompt)
+    return batch
+
+def _percentile(histogram, q):
+    total = sum(histogram.values())
+    seen = 0
+    for steps in sorted(histogram):
+        seen += histogram[steps]
+        if seen >= q * total:
+            return steps
+    return 0
+
+def run_task(model, tokenizer, task, alignment, workload, batch_size):
+    # the first pass registers the transitions in the simulated model, the second is timed
+    for warmup in [True, False]:
+        model.reset()
+        executor_stats['row_steps'] = {}
+        corrects = []
+        start = time.perf_counter()
+        for i in range(0, len(workload), batch_size):
+            _, batch_corrects = llm_execute_batch(model, tokenizer, workload[i:i + batch_size], task, alignment)
+            corrects.extend(batch_corrects)
+        elapsed = time.perf_counter() - start
+    row_steps = executor_stats['row_steps']
+    samples = len(workload)
+    return dict(
+        task=task,
+        alignment=alignment,
+        samples=samples,
+        accuracy=sum(corrects) / samples,
+        seconds=elapsed,
+        samples_per_sec=samples / elapsed,
+        calls_per_sample=model.calls / samples,
+        rows_per_call=model.rows / max(model.calls, 1),
+        adapter_switches=model.switches,
+        mean_steps=sum(steps * count for steps, count in row_steps.items()) / max(sum(row_steps.values()), 1),
+        p99_steps=_percentile(row_steps, 0.99),
+    )
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--tasks', type=str, nargs='+', choices=legal_tasks, default=legal_tasks, required=False)
+    argparser.add_argument('--alignment', type=str, choices=['none', 'align', 'both'], default='both', required=False)
+    argparser.add_argument('--num_samples', default=128, type=int, required=False)
+    argparser.add_argument('--batch_size', default=32, type=int, required=False)
+    argparser.add_argument('--min_digits', default=1, type=int, required=False)
+    argparser.add_argument('--max_digits', default=10, type=int, required=False)
+    argparser.add_argument('--token_latency_ms', default=0.0, type=float, required=False)
+    argparser.add_argument('--call_latency_ms', default=0.0, type=float, required=False)
+    argparser.add_argument('--error_rate', default=0.0, type=float, required=False)
+    argparser.add_argument('--seed', default=42, type=int, required=False)
+    argparser.add_argument('--num_workers', default=0, type=int, required=False)
+    argparser.add_argument('--micro_batches', default=1, type=int, required=False)
+    argparser.add_argument('--bucket_size', default=0, type=int, required=False)
+    argparser.add_argument('--early_exit', action='store_true', required=False)
+    argparser.add_argument('--reorder', action='store_true', required=False)
+    argparser.add_argument('--max_steps', default=0, type=int, required=False)
+    argparser.add_argument('--max_tokens', default=0, type=int, required=False)
+    argparser.add_argument('--output', default='', type=str, required=False)
+    args = argparser.parse_args()
+
+    configure_executor(num_workers=args.num_workers, micro_batches=args.micro_batches, bucket_size=args.bucket_size,
+                       early_exit=args.early_exit, reorder=args.reorder, max_steps=args.max_steps, max_tokens=args.max_tokens)
+    tokenizer = SimulatedTokenizer()
+    model = SimulatedModel(tokenizer, args.token_latency_ms / 1000, args.call_latency_ms / 1000, args.error_rate, args.seed)
+    aligner = TMAligner()
+
+    modes = dict(none=[False], align=[True], both=[False, True])[args.alignment]
+    results = []
+    print(f"{'task':<14} {'align':<6} {'samples/s':>10} {'accuracy':>9} {'calls/sample':>13} {'rows/call':>10} {'switches':>9} {'mean steps':>11} {'p99 steps':>10}")
+    for task in args.tasks:
+        for alignment in modes:
+            # reflection and left_mask have no expression to align
+            if alignment and task not in aligner.task_2_op:
+                continue
+            workload = build_workload(task, alignment, args.num_samples, args.min_digits, args.max_digits, args.seed)
+            result = run_task(model, tokenizer, task, alignment, workload, args.batch_size)
+            results.append(result)
+            print(f"{task:<14} {str(alignment):<6} {result['samples_per_sec']:>10.2f} {result['accuracy']:>9.3f} "
+                  f"{result['calls_per_sample']:>13.2f} {result['rows_per_call']:>10.2f} {result['adapter_switches']:>9} "
+                  f"{result['mean_steps']:>11.1f} {result['p99_steps']:>10}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(config=vars(args), results=results), f, indent=4)
@@ -0,0 +1,274 @@
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+
+from data.generator import (
+    AddSeqGenerator, ReflectionSeqGenerator, LeftMaskSeqGenerator, SubSeqGenerator, BorrowSubSeqGenerator,
+    EqualSeqGenerator, GreaterThanSeqGenerator, LessThanSeqGenerator, MulSeqGenerator, LongMulSeqGenerator,
+    DivSeqGenerator, LongDivSeqGenerator, AlignerPairGenerator,
+)
+from turing_machine.addition.addition_tm import AdditionTM, AdditionTMChecker
+from turing_machine.reflection.reflection_tm import ReflectionTM, ReflectionTMChecker
+from turing_machine.left_mask.left_mask_tm import LeftMaskTM, LeftMaskTMChecker
+from turing_machine.subtraction.sub_tm import SubtractionTM, SubtractionTMChecker
+from turing_machine.borrow_subtraction.borrow_sub_tm import BorrowSubtractionTM, BorrowSubtractionTMChecker
+from turing_machine.equal.equal_tm import EqualTM, EqualTMChecker
+from turing_machine.greater_than.greater_than_tm import GreaterThanTM, GreaterThanTMChecker
+from turing_machine.less_than.less_than_tm import LessThanTM, LessThanTMChecker
+from turing_machine.multiplication.mul_tm import MultiplicationTM, MultiplicationTMChecker
+from turing_machine.division.div_tm import DivisionTM, DivisionTMChecker
+from turing_machine.long_multiplication.long_mul_tm import LongMultiplicationTM, LongMultiplicationTMChecker
+from turing_machine.long_division.long_div_tm import LongDivisionTM, LongDivisionTMChecker
+from turing_machine.alignment.aligner import TMAligner
+from registry import legal_tasks
+
+r""" CPU microbenchmarks for the TM simulators, checkers, aligner and sequence generators.
+
+Benchmarks:
+- transition_seq: `TM(op1, op2).get_transition_seq()` of each machine.
+- checker_init: construction of the checker of each machine from its initial state.
+- checker_check: `check()` and `one_step()` over every transition of the machine, as the executor does.
+- input_to_tm: `TMAligner.input_to_tm` of a raw expression.
+- generator: the `generate` paths of the `*SeqGenerator`s and of `AlignerPairGenerator` in `data/generator.py`.
+
+Every case runs for digit lengths of the operands given by `--lengths` (1 to 100 by default).
+MUL and DIV loop `op2` and `op1 // op2` times, so only `op1` (MUL) or `op2` (DIV) grows with the length,
+the other operand keeps the loop at 9 iterations.
+
+The time of a case is the best of `--repeat` runs, each run calls it enough times to last `--min_time` seconds.
+Results are saved as a JSON baseline with `--output`, and `--compare` flags the cases slower than a baseline by more
+than `--threshold` (exit status 1).
+
+Example:
+python -m benchmarks.bench_tm --output log/bench_tm.json
+python -m benchmarks.bench_tm --tasks add mul --lengths 10 100 --compare log/bench_tm.json
+"""
+
+legal_benchmarks = ['transition_seq', 'checker_init', 'checker_check', 'input_to_tm', 'generator']
+
+task_machine_mapping = dict(
+    add=(AdditionTM, AdditionTMChecker),
+    reflection=(ReflectionTM, ReflectionTMChecker),
+    left_mask=(LeftMaskTM, LeftMaskTMChecker),
+    sub=(SubtractionTM, SubtractionTMChecker),
+    equal=(EqualTM, EqualTMChecker),
+    greater_than=(GreaterThanTM, GreaterThanTMChecker),
+    less_than=(LessThanTM, LessThanTMChecker),
+    mul=(MultiplicationTM, MultiplicationTMChecker),
+    div=(DivisionTM, DivisionTMChecker),
+    long_mul=(LongMultiplicationTM, LongMultiplicationTMChecker),
+    long_div=(LongDivisionTM, LongDivisionTMChecker),
+    borrow_sub=(BorrowSubtractionTM, BorrowSubtractionTMChecker),
+)
+
+# machines with CALLs record (input, output) prompts, the others (state, cmd) pairs
+call_tasks = ['sub', 'mul', 'div', 'long_mul', 'long_div']
+
+# (task, generator, method, arguments for a digit length), `None` arguments skip the length
+generator_cases = [
+    ('add', AddSeqGenerator, 'generate', lambda n: (n, n)),
+    ('reflection', ReflectionSeqGenerator, 'generate', lambda n: (n, n)),
+    ('reflection', ReflectionSeqGenerator, 'generate_leading_zero', lambda n: (n, n)),
+    ('left_mask', LeftMaskSeqGenerator, 'generate', lambda n: (n, False) if n > 1 else None),
+    ('left_mask', LeftMaskSeqGenerator, 'generate', lambda n: (n, True) if n > 1 else None),
+    ('sub', SubSeqGenerator, 'generate', lambda n: (n, n)),
+    ('borrow_sub', BorrowSubSeqGenerator, 'generate', lambda n: (n, n)),
+    ('equal', EqualSeqGenerator, 'generate', lambda n: (n, n, 'equal')),
+    ('equal', EqualSeqGenerator, 'generate', lambda n: (n, n, 'random')),
+    ('greater_than', GreaterThanSeqGenerator, 'generate', lambda n: (n, n, 'equal')),
+    ('greater_than', GreaterThanSeqGenerator, 'generate', lambda n: (n, n, 'greater')),
+    ('less_than', LessThanSeqGenerator, 'generate', lambda n: (n, n, 'less')),
+    ('mul', MulSeqGenerator, 'generate', lambda n: (n, 1)),
+    ('mul', MulSeqGenerator, 'generate_with_fixed_op2', lambda n: (n, 9)),
+    ('div', DivSeqGenerator, 'generate', lambda n: (n, n)),
+    # a 1-digit `op2` may be 0, which `generate_with_fixed_result` does not handle
+    ('div', DivSeqGenerator, 'generate_with_fixed_result', lambda n: (n, 9) if n > 1 else None),
+    ('long_mul', LongMulSeqGenerator, 'generate', lambda n: (n, n)),
+    ('long_div', LongDivSeqGenerator, 'generate', lambda n: (n, n)),
+    ('add', AlignerPairGenerator, 'generate_input_pair', lambda n: (n, n, '+')),
+    ('add', AlignerPairGenerator, 'generate_output_pair', lambda n: (n, n, 'add')),
+]
+
+def _n_digit(rng, n):
+    minimal = 10 ** (n - 1) if n > 1 else 0
+    return rng.randint(minimal, 10 ** n - 1)
+
+def make_ops(task, n, seed=42):
+    # operands of `n` digits, chosen so that the machine runs its full loop
+    rng = random.Random(f'{seed}-{task}-{n}')
+    if task == 'reflection':
+        return 10 ** n - 1, _n_digit(rng, n)
+    if task == 'left_mask':
+        return (_n_digit(rng, n),)
+    if task == 'equal':
+        op = _n_digit(rng, n)
+        return op, op
+    if task in ['sub', 'borrow_sub']:
+        op1, op2 = _n_digit(rng, n), _n_digit(rng, n)
+        return max(op1, op2), min(op1, op2)
+    if task == 'mul':
+        return _n_digit(rng, n), 9
+    if task == 'div':
+        op2 = max(_n_digit(rng, n), 1)
+        return 9 * op2 + rng.randint(0, op2 - 1), op2
+    if task == 'long_div':
+        return _n_digit(rng, n), max(_n_digit(rng, n), 1)
+    return _n_digit(rng, n), _n_digit(rng, n)
+
+def checker_io(task, seq):
+    # the prompt the checker is built from, and the model outputs it checks one by one
+    if task in call_tasks:
+        return seq[0][0], [output for _, output in seq]
+    prompt = seq[0][0] + '\n' + seq[0][1] + '\n'
+    return prompt, [state + '\n' + cmd for state, cmd in seq[1:]]
+
+def _repeat(func):
+    def prepare(number):
+        def run():
+            for _ in range(number):
+                func()
+        return run
+    return prepare
+
+def _check_all(checkers, outputs):
+    def run():
+        for checker in checkers:
+            for output in outputs:
+                if not checker.check(output):
+                    raise ValueError('Invalid benchmark: checker rejected the transition sequence')
+                checker.one_step()
+    return run
+
+def build_cases(benchmarks, tasks, lengths):
+    # name -> (prepare, info), `prepare(number)` returns a function running the case `number` times
+    cases = {}
+    aligner = TMAligner()
+    for task in tasks:
+        tm_cls, checker_cls = task_machine_mapping[task]
+        for n in lengths:
+            ops = make_ops(task, n)
+            seq = tm_cls(*ops).get_transition_seq()
+            info = dict(task=task, digits=n, steps=len(seq))
+            if 'transition_seq' in benchmarks:
+                cases[f'transition_seq/{task}/{n}'] = (_repeat(lambda tm_cls=tm_cls, ops=ops: tm_cls(*ops).get_transition_seq()), info)
+            prompt, outputs = checker_io(task, seq)
+            if 'checker_init' in benchmarks:
+                cases[f'checker_init/{task}/{n}'] = (_repeat(lambda checker_cls=checker_cls, prompt=prompt: checker_cls(prompt)), info)
+            if 'checker_check' in benchmarks:
+                # checkers of CALL machines build the whole sequence and only move a step over it,
+                # shallow copies of a built one are fresh checkers
+                if task in call_tasks:
+                    checker = checker_cls(prompt)
+                    make_checker = lambda checker=checker: copy.copy(checker)
+                else:
+                    make_checker = lambda checker_cls=checker_cls, prompt=prompt: checker_cls(prompt)
+                prepare = lambda number, make_checker=make_checker, outputs=outputs: _check_all(
+                    [make_checker() for _ in range(number)], outputs)
+                cases[f'checker_check/{task}/{n}'] = (prepare, info)
+            if 'input_to_tm' in benchmarks and task in aligner.task_2_op:
+                expression = f'{ops[0]}{aligner.task_2_op[task]}{ops[1]}='
+                cases[f'input_to_tm/{task}/{n}'] = (_repeat(lambda expression=expression, task=task: aligner.input_to_tm(expression, task)), dict(task=task, digits=n))
+    if 'generator' in benchmarks:
+        for task, gen_cls, method, make_args in generator_cases:
+            if task not in tasks:
+                continue
+            for n in lengths:
+                args = make_args(n)
+                if args is None:
+                    continue
+                name = f'generator/{gen_cls.__name__}.{method}{"/" + str(args[-1]) if isinstance(args[-1], (str, bool)) else ""}/{n}'
+                def prepare(number, gen_cls=gen_cls, method=method, args=args):
+                    # a fresh generator per run, every run generates the same operands
+                    generate = getattr(gen_cls(seed=42), method)
+                    def run():
+                        for _ in range(number):
+                            generate(*args)
+                    return run
+                cases[name] = (prepare, dict(task=task, digits=n))
+    return cases
+
+def measure(prepare, repeat, min_time):
+    # calibrate the number of calls per run so that a run lasts at least `min_time`
+    number = 1
+    while True:
+        run = prepare(number)
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)) + 1)
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        run = prepare(number)
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) / number)
+    return dict(best=min(times), median=statistics.median(times), number=number, repeat=repeat)
+
+def run_benchmarks(args):
+    cases = build_cases(args.benchmarks, args.tasks, args.lengths)
+    results = {}
+    print(f"{'case':<64} {'best us':>12} {'median us':>12} {'calls':>8}")
+    for name, (prepare, info) in cases.items():
+        result = measure(prepare, args.repeat, args.min_time)
+        result.update(info)
+        results[name] = result
+        print(f"{name:<64} {result['best'] * 1e6:>12.2f} {result['median'] * 1e6:>12.2f} {result['number']:>8}")
+    return results
+
+def compare(results, baseline, threshold):
+    # the best times are compared, a case regresses when it is slower than the baseline by more than `threshold`
+    regressions = []
+    print(f"{'case':<64} {'baseline us':>12} {'current us':>12} {'ratio':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['best'] / baseline[name]['best']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = 'faster'
+        print(f"{name:<64} {baseline[name]['best'] * 1e6:>12.2f} {result['best'] * 1e6:>12.2f} {ratio:>8.2f} {flag}")
+    return regressions
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--benchmarks', type=str, nargs='+', choices=legal_benchmarks, default=legal_benchmarks, required=False)
+    argparser.add_argument('--tasks', type=str, nargs='+', choices=legal_tasks, default=legal_tasks, required=False)
+    argparser.add_argument('--lengths', type=int, nargs='+', default=[1, 2, 5, 10, 20, 50, 100], required=False)
+    argparser.add_argument('--repeat', default=5, type=int, required=False)
+    argparser.add_argument('--min_time', default=0.05, type=float, required=False)
+    argparser.add_argument('--output', default='', type=str, required=False)
+    argparser.add_argument('--compare', default='', type=str, required=False)
+    argparser.add_argument('--threshold', default=0.1, type=float, required=False)
+    args = argparser.parse_args()
+
+    # read the baseline first, it may be overwritten by `--output`
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+    results = run_benchmarks(args)
+    if args.output:
+        meta = dict(
+            python=platform.python_version(),
+            platform=platform.platform(),
+            processor=platform.processor(),
+            repeat=args.repeat,
+            min_time=args.min_time,
+        )
+        with open(args.output, 'w') as f:
+            json.dump(dict(meta=meta, results=results), f, indent=4)
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regressions over {args.threshold:.0%}: {", ".join(regressions)}')
+            sys.exit(1)
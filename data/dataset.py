@@ -0,0 +1,207 @@
+import copy
+import time
+import random
+import argparse
+import numpy as np
+import torch
+from torch.utils.data import IterableDataset, get_worker_info
+
+from registry import legal_tasks, get_entry, load
+from data.rng import CellRNG
+from turing_machine.alignment.cost import parse_operands
+
+r""" Training samples generated on the fly, without writing the datasets to disk.
+
+`TMSampleDataset` streams the samples `generate.py --split train` would write for a task
+and setting, from the same `train_samples` generators of `synthetic/*_generate.py`
+(the `*SeqGenerator` classes balanced by `Proportioner`):
+- the stream is made of passes, a pass is one balanced training set with `num` samples
+  per operand length class, so every stream is balanced;
+- a shuffle buffer of `shuffle_buffer` samples mixes the passes, keep `num` small so that
+  it spans several passes;
+- every DataLoader worker (and rank) has its own seed stream, seeded from
+  (`seed`, stream, pass): the samples are deterministic for a given number of workers and ranks;
+- with a tokenizer, samples are tokenized as prompt + response + eos and only the response
+  is learned (`labels` of the prompt are -100), `pad_collate` pads them into batches.
+
+The `*SeqGenerator` classes draw operands from their own `random.Random` instances, seeded with
+a fixed seed, and `seq_2_samples` draws from the global `random` module. Each pass runs with
+the counter-based streams of `data/rng.py`, seeded from (`seed`, stream, pass): every cell of the
+loop reseeds both, so passes and streams draw different operands. With `num_workers=0`
+the global generator of the main process is reseeded.
+
+python -m data.dataset --task mul --max_digits 2 --check checks that two streams and two passes
+draw different operands.
+
+Example:
+dataset = TMSampleDataset('mul', tokenizer, no_prompt=True, min_digits=1, max_digits=100, num=1)
+loader = DataLoader(dataset, batch_size=16, num_workers=8, collate_fn=partial(pad_collate, pad_token_id=tokenizer.eos_token_id))
+
+python -m data.dataset --task add --max_digits 10 --num_samples 10000
+"""
+
+IGNORE_INDEX = -100
+
+def stream_seed(seed, stream, epoch, kind=0):
+    # kind 0 seeds the generators of a pass, kind 1 the shuffle buffer
+    return int(np.random.SeedSequence([seed, stream, epoch, kind]).generate_state(1)[0])
+
+
+class TMSampleDataset(IterableDataset):
+    def __init__(self, task, tokenizer=None, setting='execute', no_prompt=False, init=False, min_digits=1, max_digits=10,
+                 num=1, num_samples=0, shuffle_buffer=10000, max_length=4096, seed=42, rank=0, world_size=1):
+        if task != 'alignment' and task not in legal_tasks:
+            raise ValueError(f'Invalid task: {task}')
+        if setting not in ['execute', 'alignment']:
+            raise ValueError(f'Invalid setting: {setting}')
+        self.task = task
+        self.tokenizer = tokenizer
+        # the arguments `train_samples` reads from the command line of `generate.py`
+        self.args = argparse.Namespace(min=min_digits, max=max_digits, num=num, setting=setting, no_prompt=no_prompt,
+                                       init=init, split='train')
+        # 0 streams forever
+        self.num_samples = num_samples
+        self.shuffle_buffer = shuffle_buffer
+        self.max_length = max_length
+        self.seed = seed
+        self.rank = rank
+        self.world_size = world_size
+
+    def _train_samples(self):
+        if self.task == 'alignment':
+            return load('synthetic.aligner_generate:train_samples')
+        return get_entry(self.task, 'train_samples')
+
+    def _stream(self):
+        # (stream of this worker, number of streams)
+        info = get_worker_info()
+        worker, num_workers = (0, 1) if info is None else (info.id, info.num_workers)
+        return self.rank * num_workers + worker, self.world_size * num_workers
+
+    def _quota(self, stream, streams):
+        if self.num_samples <= 0:
+            return None
+        return self.num_samples // streams + (1 if stream < self.num_samples % streams else 0)
+
+    def pass_samples(self, stream, epoch):
+        # the samples of one pass of a stream, before the shuffle buffer
+        cells = CellRNG(stream_seed(self.seed, stream, epoch), ('train', self.task), counter=True)
+        args = argparse.Namespace(**vars(self.args), cells=cells)
+        random.seed(stream_seed(self.seed, stream, epoch))
+        return self._train_samples()(args)
+
+    def samples(self):
+        # (prompt, response) pairs of this worker
+        stream, streams = self._stream()
+        quota = self._quota(stream, streams)
+        if quota == 0:
+            return
+        shuffle = random.Random(stream_seed(self.seed, stream, 0, kind=1))
+        buffer = []
+        cnt = 0
+        epoch = 0
+        while True:
+            pass_samples = self.pass_samples(stream, epoch)
+            epoch += 1
+            empty = True
+            for sample in pass_samples:
+                empty = False
+                if len(buffer) < self.shuffle_buffer:
+                    buffer.append(sample)
+                    continue
+                i = shuffle.randrange(len(buffer))
+                buffer[i], sample = sample, buffer[i]
+                yield sample
+                cnt += 1
+                if quota is not None and cnt >= quota:
+                    return
+            if empty:
+                raise ValueError(f'Invalid digits: no {self.task} samples for {self.args.min} to {self.args.max} digits')
+            if quota is not None and cnt + len(buffer) >= quota:
+                break
+        # the samples left in the buffer complete the quota
+        shuffle.shuffle(buffer)
+        yield from buffer[:quota - cnt]
+
+    def tokenize(self, prompt, response):
+        prompt_ids = self.tokenizer(prompt)['input_ids']
+        response_ids = self.tokenizer(response, add_special_tokens=False)['input_ids'] + [self.tokenizer.eos_token_id]
+        input_ids = (prompt_ids + response_ids)[:self.max_length]
+        labels = ([IGNORE_INDEX] * len(prompt_ids) + response_ids)[:self.max_length]
+        return dict(
+            input_ids=torch.tensor(input_ids),
+            attention_mask=torch.ones(len(input_ids), dtype=torch.long),
+            labels=torch.tensor(labels),
+        )
+
+    def __iter__(self):
+        for prompt, response in self.samples():
+            if self.tokenizer is None:
+                yield prompt, response
+            else:
+                yield self.tokenize(prompt, response)
+
+
+def _operands(prompt):
+    # the operands of the expression or of the first registers of the state in a prompt
+    try:
+        return tuple(parse_operands(prompt)[:2])
+    except ValueError:
+        return prompt
+
+def check_streams(dataset):
+    # two streams and two passes of a stream must not draw the same operands,
+    # read without the task prompt, whose examples are states too
+    dataset = copy.copy(dataset)
+    dataset.args = argparse.Namespace(**dict(vars(dataset.args), no_prompt=True))
+    passes = {key: [_operands(prompt) for prompt, _ in dataset.pass_samples(*key)] for key in [(0, 0), (0, 1), (1, 0)]}
+    for a, b in [((0, 0), (0, 1)), ((0, 0), (1, 0))]:
+        if passes[a] == passes[b]:
+            raise ValueError(f'Invalid streams: (stream, pass) {a} and {b} draw the same operands')
+    return passes
+
+
+def pad_collate(features, pad_token_id):
+    # right padded batch of tokenized samples
+    width = max(len(feature['input_ids']) for feature in features)
+    batch = dict(
+        input_ids=torch.full((len(features), width), pad_token_id, dtype=torch.long),
+        attention_mask=torch.zeros((len(features), width), dtype=torch.long),
+        labels=torch.full((len(features), width), IGNORE_INDEX, dtype=torch.long),
+    )
+    for i, feature in enumerate(features):
+        n = len(feature['input_ids'])
+        for key in batch:
+            batch[key][i, :n] = feature[key]
+    return batch
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--task', type=str, choices=legal_tasks + ['alignment'], required=True)
+    argparser.add_argument('--setting', type=str, default='execute', choices=['execute', 'alignment'], required=False)
+    argparser.add_argument('--no_prompt', action='store_true', required=False)
+    argparser.add_argument('--min_digits', default=1, type=int, required=False)
+    argparser.add_argument('--max_digits', default=10, type=int, required=False)
+    argparser.add_argument('--num', default=1, type=int, required=False)
+    argparser.add_argument('--num_samples', default=1000, type=int, required=False)
+    argparser.add_argument('--shuffle_buffer', default=10000, type=int, required=False)
+    argparser.add_argument('--seed', default=42, type=int, required=False)
+    argparser.add_argument('--check', action='store_true', required=False)
+    args = argparser.parse_args()
+
+    # preview the stream and measure the samples generated per second
+    dataset = TMSampleDataset(args.task, setting=args.setting, no_prompt=args.no_prompt, min_digits=args.min_digits,
+                              max_digits=args.max_digits, num=args.num, num_samples=args.num_samples,
+                              shuffle_buffer=args.shuffle_buffer, seed=args.seed)
+    if args.check:
+        passes = check_streams(dataset)
+        for key, operands in passes.items():
+            print(f'(stream, pass) {key}: {len(set(operands))} distinct operands in {len(operands)} samples')
+    start = time.perf_counter()
+    cnt = 0
+    for prompt, response in dataset:
+        if cnt < 2:
+            print(f'{prompt}\n->\n{response}\n')
+        cnt += 1
+    elapsed = time.perf_counter() - start
+    print(f'{cnt} samples in {elapsed:.2f}s, {cnt / elapsed:.1f} samples/s')
@@ -1,16 +1,26 @@
 import random
 from typing import Literal, Optional
 
-from turing_machine.addition.addition_tm import AdditionTM
-from turing_machine.reflection.reflection_tm import ReflectionTM
-from turing_machine.left_mask.left_mask_tm import LeftMaskTM
-from turing_machine.subtraction.sub_tm import SubtractionTM
-from turing_machine.equal.equal_tm import EqualTM
-from turing_machine.greater_than.greater_than_tm import GreaterThanTM
-from turing_machine.less_than.less_than_tm import LessThanTM
-from turing_machine.multiplication.mul_tm import MultiplicationTM
-from turing_machine.division.div_tm import DivisionTM
 from turing_machine.alignment.aligner import TMAligner
+from registry import lazy_entry
+
+# machines are imported when a generator first runs them, a task only loads its own machines
+AdditionTM = lazy_entry('add', 'machine')
+ReflectionTM = lazy_entry('reflection', 'machine')
+LeftMaskTM = lazy_entry('left_mask', 'machine')
+SubtractionTM = lazy_entry('sub', 'machine')
+BorrowSubtractionTM = lazy_entry('borrow_sub', 'machine')
+EqualTM = lazy_entry('equal', 'machine')
+GreaterThanTM = lazy_entry('greater_than', 'machine')
+LessThanTM = lazy_entry('less_than', 'machine')
+MultiplicationTM = lazy_entry('mul', 'machine')
+DivisionTM = lazy_entry('div', 'machine')
+LongMultiplicationTM = lazy_entry('long_mul', 'machine')
+LongDivisionTM = lazy_entry('long_div', 'machine')
+
+def transitions(tm, lazy):
+    # a lazy sequence only renders the steps that are read, see `turing_machine/steps.py`
+    return tm.transition_steps() if lazy else tm.get_transition_seq()
 
 def get_9s(n_digits):
     return int('9' * n_digits)
@@ -29,8 +39,9 @@ class NDigitGenerator:
         return self.random.randint(minimal, maximal)
     
 class AddSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
     
     def generate_ops(self, a_n_digits, b_n_digits):
@@ -41,7 +52,7 @@ class AddSeqGenerator:
     def generate(self, a_n_digits, b_n_digits):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
         add_tm = AdditionTM(op1, op2)
-        seq = add_tm.get_transition_seq()
+        seq = transitions(add_tm, self.lazy)
         return seq
     
     def generate_raw(self, a_n_digits, b_n_digits):
@@ -52,19 +63,23 @@ class AddSeqGenerator:
 
     def generate_with_op(self, op1, op2):
         add_tm = AdditionTM(op1, op2)
-        seq = add_tm.get_transition_seq()
+        seq = transitions(add_tm, self.lazy)
         return seq
 
+    def initial_and_halt(self, op1, op2):
+        return AdditionTM(op1, op2).get_input_output()
+
 class ReflectionSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
     
     def generate(self, a_n_digits, b_n_digits):
         op1 = get_9s(a_n_digits)
         op2 = self.n_digit_generator.generate(b_n_digits)
         reflection_tm = ReflectionTM(op1, op2)
-        seq = reflection_tm.get_transition_seq()
+        seq = transitions(reflection_tm, self.lazy)
         return seq
 
     def generate_leading_zero(self, a_n_digits, b_n_digits):
@@ -76,19 +91,24 @@ class ReflectionSeqGenerator:
         op2 = '9' * length + op2[length:]
         op2 = int(op2)
         reflection_tm = ReflectionTM(op1, op2)
-        seq = reflection_tm.get_transition_seq()
+        seq = transitions(reflection_tm, self.lazy)
         return seq
     
     def generate_with_op(self, op1, op2):
         assert op1 == get_9s(len(str(op1)))
         reflection_tm = ReflectionTM(op1, op2)
-        seq = reflection_tm.get_transition_seq()
+        seq = transitions(reflection_tm, self.lazy)
         return seq
 
+    def initial_and_halt(self, op1, op2):
+        assert op1 == get_9s(len(str(op1)))
+        return ReflectionTM(op1, op2).get_input_output()
+
     
 class LeftMaskSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
     
     def generate(self, n_digits, leading_zero=False):
@@ -103,30 +123,38 @@ class LeftMaskSeqGenerator:
                 op += self.n_digit_generator.generate(n_digits - num_leading_zero - 1)
                 
         left_mask_tm = LeftMaskTM(op)
-        seq = left_mask_tm.get_transition_seq()
+        seq = transitions(left_mask_tm, self.lazy)
         return seq
 
     def generate_with_op(self, op):
         left_mask_tm = LeftMaskTM(op)
-        seq = left_mask_tm.get_transition_seq()
+        seq = transitions(left_mask_tm, self.lazy)
         return seq
+
+    def initial_and_halt(self, op):
+        return LeftMaskTM(op).get_input_output()
     
 class SubSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
 
     def generate(self, a_n_digits, b_n_digits):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits)        
         sub_tm = SubtractionTM(op1, op2)
-        seq = sub_tm.get_transition_seq()
+        seq = transitions(sub_tm, self.lazy)
         return seq
 
     def generate_with_op(self, op1, op2):
         assert op1 >= op2, "op1 must be greater than op2."
         sub_tm = SubtractionTM(op1, op2)
-        seq = sub_tm.get_transition_seq()
+        seq = transitions(sub_tm, self.lazy)
         return seq
+
+    def initial_and_halt(self, op1, op2):
+        assert op1 >= op2, "op1 must be greater than op2."
+        return SubtractionTM(op1, op2).get_input_output()
     
     def generate_raw(self, a_n_digits, b_n_digits):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
@@ -141,21 +169,60 @@ class SubSeqGenerator:
             op1, op2 = op2, op1
         return op1, op2
     
+class BorrowSubSeqGenerator:
+    def __init__(self, seed=42, lazy=False):
+        self.random = random.Random(seed)
+        self.lazy = lazy
+        self.n_digit_generator = NDigitGenerator(seed)
+
+    def generate(self, a_n_digits, b_n_digits):
+        op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
+        borrow_sub_tm = BorrowSubtractionTM(op1, op2)
+        seq = transitions(borrow_sub_tm, self.lazy)
+        return seq
+
+    def generate_with_op(self, op1, op2):
+        assert op1 >= op2, "op1 must be greater than op2."
+        borrow_sub_tm = BorrowSubtractionTM(op1, op2)
+        seq = transitions(borrow_sub_tm, self.lazy)
+        return seq
+
+    def initial_and_halt(self, op1, op2):
+        assert op1 >= op2, "op1 must be greater than op2."
+        return BorrowSubtractionTM(op1, op2).get_input_output()
+
+    def generate_raw(self, a_n_digits, b_n_digits):
+        op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
+        input = f'{op1}-{op2}='
+        output = str(op1 - op2)
+        return input, output
+
+    def generate_ops(self, a_n_digits, b_n_digits):
+        op1 = self.n_digit_generator.generate(a_n_digits)
+        op2 = self.n_digit_generator.generate(b_n_digits)
+        if op1 < op2:
+            op1, op2 = op2, op1
+        return op1, op2
+
 class EqualSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
     
     def generate(self, a_n_digits, b_n_digits, option: Optional[Literal['equal', 'random']]):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits, option)
         equal_tm = EqualTM(op1, op2)
-        seq = equal_tm.get_transition_seq()
+        seq = transitions(equal_tm, self.lazy)
         return seq
 
     def generate_with_op(self, op1, op2):
         equal_tm = EqualTM(op1, op2)
-        seq = equal_tm.get_transition_seq()
+        seq = transitions(equal_tm, self.lazy)
         return seq
+
+    def initial_and_halt(self, op1, op2):
+        return EqualTM(op1, op2).get_input_output()
     
     def generate_raw(self, a_n_digits, b_n_digits, option: Optional[Literal['equal', 'random']]):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits, option)
@@ -172,20 +239,24 @@ class EqualSeqGenerator:
         return op1, op2
 
 class GreaterThanSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
     
     def generate(self, a_n_digits, b_n_digits, option: Optional[Literal['equal', 'greater', 'less']]):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits, option)
         greater_than_tm = GreaterThanTM(op1, op2)
-        seq = greater_than_tm.get_transition_seq()
+        seq = transitions(greater_than_tm, self.lazy)
         return seq
 
     def generate_with_op(self, op1, op2):
         greater_than_tm = GreaterThanTM(op1, op2)
-        seq = greater_than_tm.get_transition_seq()
+        seq = transitions(greater_than_tm, self.lazy)
         return seq
+
+    def initial_and_halt(self, op1, op2):
+        return GreaterThanTM(op1, op2).get_input_output()
     
     def generate_raw(self, a_n_digits, b_n_digits, option: Optional[Literal['equal', 'greater', 'less']]):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits, option)
@@ -206,20 +277,24 @@ class GreaterThanSeqGenerator:
         return op1, op2
     
 class LessThanSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
     
     def generate(self, a_n_digits, b_n_digits, option: Optional[Literal['equal', 'greater', 'less']]):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits, option)
         greater_than_tm = LessThanTM(op1, op2)
-        seq = greater_than_tm.get_transition_seq()
+        seq = transitions(greater_than_tm, self.lazy)
         return seq
 
     def generate_with_op(self, op1, op2):
         greater_than_tm = LessThanTM(op1, op2)
-        seq = greater_than_tm.get_transition_seq()
+        seq = transitions(greater_than_tm, self.lazy)
         return seq
+
+    def initial_and_halt(self, op1, op2):
+        return LessThanTM(op1, op2).get_input_output()
     
     def generate_raw(self, a_n_digits, b_n_digits, option: Optional[Literal['equal', 'greater', 'less']]):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits, option)
@@ -240,8 +315,9 @@ class LessThanSeqGenerator:
         return op1, op2
 
 class MulSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
         self.visited = dict()
         self.cnt = 0
@@ -254,7 +330,7 @@ class MulSeqGenerator:
     def generate(self, a_n_digits, b_n_digits):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
         mul_tm = MultiplicationTM(op1, op2)
-        seq = mul_tm.get_transition_seq()
+        seq = transitions(mul_tm, self.lazy)
         return seq
 
     def generate_with_op(self, op1, op2, only_input_output=False):
@@ -262,13 +338,16 @@ class MulSeqGenerator:
         if only_input_output:
             seq = mul_tm.get_input_output()
         else:
-            seq = mul_tm.get_transition_seq()
+            seq = transitions(mul_tm, self.lazy)
         return seq
 
+    def initial_and_halt(self, op1, op2):
+        return MultiplicationTM(op1, op2).get_input_output()
+
     def generate_with_fixed_op2(self, a_n_digits, op2):
         op1 = self.n_digit_generator.generate(a_n_digits)
         mul_tm = MultiplicationTM(op1, op2)
-        seq = mul_tm.get_transition_seq()
+        seq = transitions(mul_tm, self.lazy)
         return seq
     
     def generate_raw(self, a_n_digits, b_n_digits):
@@ -291,9 +370,45 @@ class MulSeqGenerator:
         return op1, op2
 
 
+class LongMulSeqGenerator:
+    def __init__(self, seed=42, lazy=False):
+        self.random = random.Random(seed)
+        self.lazy = lazy
+        self.n_digit_generator = NDigitGenerator(seed)
+
+    def generate(self, a_n_digits, b_n_digits):
+        op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
+        long_mul_tm = LongMultiplicationTM(op1, op2)
+        seq = transitions(long_mul_tm, self.lazy)
+        return seq
+
+    def generate_with_op(self, op1, op2, only_input_output=False):
+        long_mul_tm = LongMultiplicationTM(op1, op2)
+        if only_input_output:
+            seq = long_mul_tm.get_input_output()
+        else:
+            seq = transitions(long_mul_tm, self.lazy)
+        return seq
+
+    def initial_and_halt(self, op1, op2):
+        return LongMultiplicationTM(op1, op2).get_input_output()
+
+    def generate_raw(self, a_n_digits, b_n_digits):
+        op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
+        input = f'{op1}*{op2}='
+        output = str(op1 * op2)
+        return input, output
+
+    def generate_ops(self, a_n_digits, b_n_digits):
+        op1 = self.n_digit_generator.generate(a_n_digits)
+        op2 = self.n_digit_generator.generate(b_n_digits)
+        return op1, op2
+
+
 class DivSeqGenerator:
-    def __init__(self, seed=42):
+    def __init__(self, seed=42, lazy=False):
         self.random = random.Random(seed)
+        self.lazy = lazy
         self.n_digit_generator = NDigitGenerator(seed)
         self.visited = dict()
     
@@ -305,7 +420,7 @@ class DivSeqGenerator:
     def generate(self, a_n_digits, b_n_digits):
         op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
         div_tm = DivisionTM(op1, op2)
-        seq = div_tm.get_transition_seq()
+        seq = transitions(div_tm, self.lazy)
         return seq
 
     def generate_with_op(self, op1, op2, only_input_output=False):
@@ -313,14 +428,17 @@ class DivSeqGenerator:
         if only_input_output:
             seq = div_tm.get_input_output()
         else:
-            seq = div_tm.get_transition_seq()
+            seq = transitions(div_tm, self.lazy)
         return seq
 
+    def initial_and_halt(self, op1, op2):
+        return DivisionTM(op1, op2).get_input_output()
+
     def generate_with_fixed_result(self, b_n_digits, result):
         op2 = self.n_digit_generator.generate(b_n_digits)
         op1 = result * op2 + self.random.randint(0, op2 - 1)
         div_tm = DivisionTM(op1, op2)
-        seq = div_tm.get_transition_seq()
+        seq = transitions(div_tm, self.lazy)
         return seq
     
     def generate_raw(self, a_n_digits, b_n_digits):
@@ -355,6 +473,42 @@ class DivSeqGenerator:
             break
         return op1, op2
 
+class LongDivSeqGenerator:
+    def __init__(self, seed=42, lazy=False):
+        self.random = random.Random(seed)
+        self.lazy = lazy
+        self.n_digit_generator = NDigitGenerator(seed)
+
+    def generate(self, a_n_digits, b_n_digits):
+        op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
+        long_div_tm = LongDivisionTM(op1, op2)
+        seq = transitions(long_div_tm, self.lazy)
+        return seq
+
+    def generate_with_op(self, op1, op2, only_input_output=False):
+        long_div_tm = LongDivisionTM(op1, op2)
+        if only_input_output:
+            seq = long_div_tm.get_input_output()
+        else:
+            seq = transitions(long_div_tm, self.lazy)
+        return seq
+
+    def initial_and_halt(self, op1, op2):
+        return LongDivisionTM(op1, op2).get_input_output()
+
+    def generate_raw(self, a_n_digits, b_n_digits):
+        op1, op2 = self.generate_ops(a_n_digits, b_n_digits)
+        input = f'{op1}//{op2}='
+        output = str(op1 // op2)
+        return input, output
+
+    def generate_ops(self, a_n_digits, b_n_digits):
+        op1 = self.n_digit_generator.generate(a_n_digits)
+        op2 = 0
+        while op2 == 0:
+            op2 = self.n_digit_generator.generate(b_n_digits)
+        return op1, op2
+
 class AlignerPairGenerator:
     def __init__(self, seed=42):
         self.random = random.Random(seed)
@@ -370,6 +524,9 @@ class AlignerPairGenerator:
             'less_than': LessThanSeqGenerator(seed),
             'mul': MulSeqGenerator(seed),
             'div': DivSeqGenerator(seed),
+            'long_mul': LongMulSeqGenerator(seed),
+            'long_div': LongDivSeqGenerator(seed),
+            'borrow_sub': BorrowSubSeqGenerator(seed),
         }
 
     def _check_input_ops(self, op1, op2, operator):
@@ -389,6 +546,14 @@ class AlignerPairGenerator:
         if operator == 'mul':
             if len(str(op1)) > 10 or len(str(op2)) > 5:
                 return False
+        if operator == 'long_mul':
+            if len(str(op1)) > 10 or len(str(op2)) > 10:
+                return False
+        if operator == 'long_div':
+            if op2 == 0:
+                return False
+            if len(str(op1)) > 10 or len(str(op2)) > 10:
+                return False
         if operator == 'div':
             if op2 == 0:
                 return False
@@ -408,7 +573,7 @@ class AlignerPairGenerator:
         return op1, op2
     
     def _adapt_ops_output(self, op1, op2, operator):
-        if operator == 'sub' and op1 < op2:
+        if operator in ['sub', 'borrow_sub'] and op1 < op2:
             op1, op2 = op2, op1
         if operator == 'equal':
             rand_val = self.random.randint(0, 1)
@@ -441,12 +606,7 @@ class AlignerPairGenerator:
         op1, op2 = self._adapt_ops_output(op1, op2, operator)
         if not self._check_output_ops(op1, op2, operator):
             return None
-        seq = generator.generate_with_op(op1, op2)
-        splits = seq[-1][1].split('\n')
-        if len(splits) == 2:
-            state, cmd = splits[0], splits[1]
-        else:
-            state, cmd = seq[-1][0], seq[-1][1]  
-            
+        _, halt = generator.initial_and_halt(op1, op2)
+        state, cmd = halt.split('\n')
         output = aligner.tm_to_output(state, op1, op2, operator)
         return state + '\n' + cmd, output
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+import torch
+from transformers import AutoTokenizer
+
+from turing_machine.tm_path import PathProvider
+
+r""" Pre-tokenized datasets, memory-mapped token ids instead of re-tokenizing the text.
+
+A dataset (JSON arrays of `instruction`/`input`/`output`, or JSONL of `prompt`/`response`)
+is tokenized once per tokenizer version and stored next to it:
+
+<dataset>.tok/<tokenizer fingerprint>/
+    prompt_ids.npy        int32, the token ids of all prompts, concatenated
+    prompt_offsets.npy    int64, sample i is prompt_ids[offsets[i]:offsets[i + 1]]
+    response_ids.npy      int32, the same for the responses
+    response_offsets.npy  int64
+    meta.json             the tokenizer, the number of samples and the digest of the dataset
+
+Prompts are tokenized as `tokenizer(prompt)` does, special tokens included, so they are
+the rows the executor would have built. Responses are tokenized without special tokens.
+
+The arrays are opened with `np.load(mmap_mode='r')`: a sample is a slice of the mapped file,
+nothing is read before it is used and nothing is copied until a batch is padded.
+The fingerprint covers the vocabulary and the special tokens added to a text, a new tokenizer version
+gets its own directory, and a dataset changed after its export is not loaded.
+
+Example:
+python -m data.pretokenize --model 3.1 --task_paths datasets/test/execute_add_5_5_executor.jsonl
+"""
+
+ARRAYS = ['prompt_ids', 'prompt_offsets', 'response_ids', 'response_offsets']
+
+def tokenizer_fingerprint(tokenizer):
+    digest = hashlib.sha256()
+    digest.update(type(tokenizer).__name__.encode())
+    digest.update(json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False).encode())
+    # the padding token is set by the loaders, it does not change the ids of a text
+    digest.update(json.dumps([tokenizer.bos_token, tokenizer.eos_token, tokenizer('0')['input_ids']]).encode())
+    return digest.hexdigest()[:16]
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def pretokenized_dir(task_path, tokenizer):
+    return os.path.join(task_path + '.tok', tokenizer_fingerprint(tokenizer))
+
+def read_samples(task_path):
+    # (prompt, response) pairs, the aligner generator may append several JSON arrays to a file
+    with open(task_path, 'r') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        decoder = json.JSONDecoder()
+        samples = []
+        pos = 0
+        while True:
+            while pos < len(text) and text[pos].isspace():
+                pos += 1
+            if pos == len(text):
+                break
+            items, pos = decoder.raw_decode(text, pos)
+            samples.extend((item['instruction'] + item['input'], item['output']) for item in items)
+        return samples
+    samples = []
+    for line in text.splitlines():
+        if line.strip():
+            sample = json.loads(line)
+            samples.append((sample['prompt'], sample['response']))
+    return samples
+
+def _tokenize(tokenizer, texts, add_special_tokens, batch_size):
+    rows = []
+    for i in range(0, len(texts), batch_size):
+        rows.extend(tokenizer(texts[i:i + batch_size], add_special_tokens=add_special_tokens)['input_ids'])
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=offsets[1:])
+    ids = np.fromiter((token for row in rows for token in row), dtype=np.int32, count=int(offsets[-1]))
+    return ids, offsets
+
+def export(task_path, tokenizer, batch_size=1024):
+    samples = read_samples(task_path)
+    target = pretokenized_dir(task_path, tokenizer)
+    os.makedirs(target, exist_ok=True)
+    prompt_ids, prompt_offsets = _tokenize(tokenizer, [prompt for prompt, _ in samples], True, batch_size)
+    response_ids, response_offsets = _tokenize(tokenizer, [response for _, response in samples], False, batch_size)
+    arrays = dict(prompt_ids=prompt_ids, prompt_offsets=prompt_offsets,
+                  response_ids=response_ids, response_offsets=response_offsets)
+    for name in ARRAYS:
+        # write aside and rename, a reader never maps a partial file
+        tmp = os.path.join(target, f'{name}.tmp.npy')
+        np.save(tmp, arrays[name])
+        os.replace(tmp, os.path.join(target, f'{name}.npy'))
+    meta = dict(
+        tokenizer=tokenizer.name_or_path,
+        fingerprint=tokenizer_fingerprint(tokenizer),
+        num_samples=len(samples),
+        source=os.path.abspath(task_path),
+        source_digest=file_digest(task_path),
+    )
+    with open(os.path.join(target, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=4)
+    return target
+
+
+class PretokenizedDataset:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.prompt_offsets) - 1
+
+    def prompt(self, i):
+        return self.prompt_ids[self.prompt_offsets[i]:self.prompt_offsets[i + 1]]
+
+    def response(self, i):
+        return self.response_ids[self.response_offsets[i]:self.response_offsets[i + 1]]
+
+    def prompt_lengths(self):
+        return np.diff(self.prompt_offsets)
+
+    def response_lengths(self):
+        return np.diff(self.response_offsets)
+
+    def batch_inputs(self, indices, pad_token_id):
+        # left padded like `tokenizer(batch, return_tensors='pt', padding=True)`
+        rows = [self.prompt(i) for i in indices]
+        width = max(len(row) for row in rows)
+        input_ids = np.full((len(rows), width), pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros((len(rows), width), dtype=np.int64)
+        for j, row in enumerate(rows):
+            input_ids[j, width - len(row):] = row
+            attention_mask[j, width - len(row):] = 1
+        return dict(input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask))
+
+
+def load_pretokenized(task_path, tokenizer):
+    # the dataset exported for this tokenizer, or None if there is none or the dataset changed since
+    path = pretokenized_dir(task_path, tokenizer)
+    if not os.path.exists(os.path.join(path, 'meta.json')):
+        print(f'No pre-tokenized dataset at {path}')
+        return None
+    dataset = PretokenizedDataset(path)
+    if dataset.meta['source_digest'] != file_digest(task_path):
+        print(f'Pre-tokenized dataset {path} is stale, export it again')
+        return None
+    return dataset
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--model', type=str, choices=['3', '3.1'], required=False)
+    argparser.add_argument('--tokenizer', default='', type=str, required=False)
+    argparser.add_argument('--task_paths', type=str, nargs='+', required=True)
+    argparser.add_argument('--batch_size', default=1024, type=int, required=False)
+    args = argparser.parse_args()
+
+    if args.tokenizer:
+        tokenizer_path = args.tokenizer
+    elif args.model:
+        tokenizer_path = PathProvider(args.model).get_base_model_path()
+    else:
+        raise ValueError('Invalid arguments: --model or --tokenizer is required')
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+    for task_path in args.task_paths:
+        target = export(task_path, tokenizer, args.batch_size)
+        print(f'{task_path} -> {target}')
@@ -21,6 +21,9 @@ class Proportioner:
             less_than=self._get_num_less_than,
             mul=self._get_num_mul,
             div=self._get_num_div,
+            long_mul=self._get_num_long_mul,
+            long_div=self._get_num_long_div,
+            borrow_sub=self._get_num_sub,
             align=self._get_num_align,
         )
 
@@ -128,6 +131,30 @@ class Proportioner:
                 num = num // 2
             return num
         
+    def _get_num_long_mul(self, **kwargs):
+        a_n_digits = kwargs['a_n_digits']
+        b_n_digits = kwargs['b_n_digits']
+        if self.option == 'default':
+            return self.num
+        if self.option == 'balance':
+            num = self.num
+            if a_n_digits <= 5 and b_n_digits <= 5:
+                num *= 2
+            return num
+        
+    def _get_num_long_div(self, **kwargs):
+        a_n_digits = kwargs['a_n_digits']
+        b_n_digits = kwargs['b_n_digits']
+        if self.option == 'default':
+            return self.num
+        if self.option == 'balance':
+            if a_n_digits < b_n_digits:
+                return 5
+            num = self.num
+            if a_n_digits <= 5:
+                num *= 2
+            return num
+        
     def _get_num_align(self, **kwargs):
         a_n_digits = kwargs['a_n_digits']
         b_n_digits = kwargs['b_n_digits']
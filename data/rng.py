@@ -0,0 +1,112 @@
+import os
+import heapq
+import pickle
+import random
+import hashlib
+import tempfile
+import multiprocessing
+
+r""" Counter-based random streams for the dataset generators.
+
+By default (`--rng sequential`) the generators draw from `random.Random(seed)` instances
+and from the global `random` seeded once by `generate.py`, so every sample depends on all
+the samples generated before it.
+
+With `--rng counter`, every cell of a generation loop, e.g. the operand lengths
+(a_n_digits, b_n_digits) of a task, draws from streams seeded by a hash of
+(seed, split, task, cell): entering a cell reseeds the `random.Random` instances of the
+generator and the global `random` (used by `seq_2_samples`), and the final shuffle is
+seeded the same way. A cell is regenerated alone with the same bytes, so:
+- `--num_procs N` splits the cells round-robin between N processes and concatenates
+  their samples in the order of the cells, the output is the same as with one process
+  (every process spills its samples to a temporary file, merged back cell by cell, so
+  `--shard_size` still bounds the memory);
+- an interrupted run can be redone for the missing cells only.
+
+The loops of `train_samples` and `test_samples` call `cells.enter(generator, *cell)` for every cell and skip
+it when it returns False (the cell belongs to another process).
+"""
+
+def counter_seed(*key):
+    # 64-bit seed of a key, stable across processes and Python versions (unlike `hash`)
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def _randoms(generator):
+    # the random.Random instances of a generator, its digit generator and its operator generators
+    yield 'random', generator.random
+    if hasattr(generator, 'n_digit_generator'):
+        yield 'n_digit', generator.n_digit_generator.random
+    for operator, sub_generator in getattr(generator, 'operator_gen_dict', {}).items():
+        for name, rng in _randoms(sub_generator):
+            yield f'{operator}.{name}', rng
+
+
+class CellRNG:
+    def __init__(self, seed=42, key=(), counter=False, worker=0, num_workers=1):
+        self.seed = seed
+        self.key = key
+        self.counter = counter
+        self.worker = worker
+        self.num_workers = num_workers
+        # ordinal of the cell entered last, every process visits all cells in the same order
+        self.ordinal = -1
+
+    def enter(self, generator, *cell):
+        self.ordinal += 1
+        if self.ordinal % self.num_workers != self.worker:
+            return False
+        if self.counter:
+            seed = counter_seed(self.seed, *self.key, *cell)
+            random.seed(counter_seed(seed, 'global'))
+            for name, rng in _randoms(generator):
+                rng.seed(counter_seed(seed, name))
+        return True
+
+    def seed_shuffle(self):
+        if self.counter:
+            random.seed(counter_seed(self.seed, *self.key, 'shuffle'))
+
+
+def cell_rng(args):
+    # the streams of a generation loop, sequential unless `generate_cells` set them up
+    cells = getattr(args, 'cells', None)
+    return cells if cells is not None else CellRNG()
+
+def _make_cells(args, worker=0, num_workers=1):
+    return CellRNG(args.seed, (args.split, args.task), args.rng == 'counter', worker, num_workers)
+
+def _generate_worker(train_samples, args, worker, num_workers, path):
+    args.cells = _make_cells(args, worker, num_workers)
+    with open(path, 'wb') as part:
+        for sample in train_samples(args):
+            pickle.dump((args.cells.ordinal, sample), part)
+
+def _read_part(path):
+    with open(path, 'rb') as part:
+        while True:
+            try:
+                yield pickle.load(part)
+            except EOFError:
+                return
+
+def generate_cells(train_samples, args):
+    # the samples of `train_samples(args)`, generated by `--num_procs` processes with counter-based streams
+    num_procs = getattr(args, 'num_procs', 1)
+    if getattr(args, 'rng', 'sequential') != 'counter':
+        if num_procs > 1:
+            raise ValueError('Invalid arguments: --num_procs requires --rng counter')
+        yield from train_samples(args)
+        return
+    if num_procs <= 1:
+        args.cells = _make_cells(args)
+        yield from train_samples(args)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, f'part_{worker}.pkl') for worker in range(num_procs)]
+            with multiprocessing.get_context('fork').Pool(num_procs) as pool:
+                pool.starmap(_generate_worker, [(train_samples, args, worker, num_procs, path) for worker, path in enumerate(paths)])
+            # back to the order of the cells, a cell belongs to one process which wrote its samples in order
+            for _, sample in heapq.merge(*map(_read_part, paths), key=lambda item: item[0]):
+                yield sample
+    _make_cells(args).seed_shuffle()
@@ -0,0 +1,126 @@
+import os
+import json
+import random
+import shutil
+import tempfile
+from typing import Literal
+
+r""" Streaming sample buffer with an external-memory shuffle for the dataset generators.
+
+`generate_train` / `generate_test` collect their samples with `append`/`extend`, then
+`write_json_samples` / `write_jsonl_samples` shuffle and write them. With `--shard_size N`
+the samples go to a `ShuffledSamples` instead of a list:
+- every N samples, the buffer is shuffled and spilled to a shard file (JSONL, or zstd
+  compressed JSONL with `--compress zstd`) in a temporary directory under `--spill_dir`;
+- iterating over it merges the shards: the next sample is read from a shard drawn with
+  a probability proportional to the samples it has left, which, as every shard is shuffled,
+  yields a uniformly shuffled stream. The shards are removed once the stream is consumed.
+
+At most N samples and one line per shard are held in memory. The spilled shards are
+kept if generation dies. The samples are the same as with a list, the shuffle uses its
+own random generator so that spilling does not change the operands generated afterwards,
+only the order of the written samples differs.
+
+Example:
+python generate.py --task mul --min 1 --max 100 --num 20 --split train --setting execute --shard_size 100000 --compress zstd
+"""
+
+def _open(path, mode, compression):
+    if compression == 'zstd':
+        # optional dependency, only needed to compress the shards
+        import zstandard
+        return zstandard.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class ShuffledSamples:
+    def __init__(self, shard_size, spill_dir=None, compression: Literal['none', 'zstd'] = 'none', seed=42):
+        if shard_size <= 0:
+            raise ValueError(f'Invalid shard size: {shard_size}')
+        if compression not in ['none', 'zstd']:
+            raise ValueError(f'Invalid compression: {compression}')
+        self.shard_size = shard_size
+        self.spill_dir = spill_dir
+        self.compression = compression
+        self.random = random.Random(seed)
+        self.buffer = []
+        # (path, number of samples) of the spilled shards
+        self.shards = []
+        self.tmp_dir = None
+        self.size = 0
+        self.consumed = False
+
+    def __len__(self):
+        return self.size
+
+    def append(self, sample):
+        self.buffer.append(sample)
+        self.size += 1
+        if len(self.buffer) >= self.shard_size:
+            self._spill()
+
+    def extend(self, samples):
+        for sample in samples:
+            self.append(sample)
+
+    def _spill(self):
+        if not self.buffer:
+            return
+        if self.tmp_dir is None:
+            if self.spill_dir:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            self.tmp_dir = tempfile.mkdtemp(prefix='shards_', dir=self.spill_dir or None)
+        suffix = '.jsonl.zst' if self.compression == 'zstd' else '.jsonl'
+        path = os.path.join(self.tmp_dir, f'shard_{len(self.shards):05d}{suffix}')
+        self.random.shuffle(self.buffer)
+        with _open(path, 'w', self.compression) as f:
+            for prompt, response in self.buffer:
+                f.write(json.dumps([prompt, response], ensure_ascii=False) + '\n')
+        self.shards.append((path, len(self.buffer)))
+        self.buffer = []
+
+    def __iter__(self):
+        if self.consumed:
+            raise ValueError('Invalid iteration: the shuffled samples were already consumed')
+        self.consumed = True
+        if not self.shards:
+            # everything fits in one shard, shuffle in memory
+            self.random.shuffle(self.buffer)
+            yield from self.buffer
+            self.buffer = []
+            return
+        self._spill()
+        readers = [_open(path, 'r', self.compression) for path, _ in self.shards]
+        remaining = [count for _, count in self.shards]
+        total = sum(remaining)
+        try:
+            # k-way merge, draw a shard in proportion to the samples it has left
+            while total > 0:
+                r = self.random.randrange(total)
+                i = 0
+                while r >= remaining[i]:
+                    r -= remaining[i]
+                    i += 1
+                prompt, response = json.loads(readers[i].readline())
+                remaining[i] -= 1
+                total -= 1
+                yield prompt, response
+        finally:
+            for reader in readers:
+                reader.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.shards = []
+
+
+def sample_buffer(args):
+    # a plain list unless spilling is enabled
+    if args.shard_size > 0:
+        return ShuffledSamples(args.shard_size, args.spill_dir, args.compress)
+    return []
+
+def shuffled(samples):
+    # lists are shuffled in place with the seeded global generator, as before
+    if isinstance(samples, ShuffledSamples):
+        return samples
+    random.shuffle(samples)
+    return samples
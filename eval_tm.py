@@ -6,21 +6,77 @@ import json
 import torch
 
 from eval.evaluation import extract_answer, do_eval_one_step, do_eval_iter
-from arithmetic.llm_arithmetic_batch import llm_execute_batch
+from arithmetic.llm_arithmetic_batch import llm_execute_batch, configure_executor, executor_config, executor_stats, token_usage_totals, record_token_usage, tokenize_batch
 from turing_machine.tm_path import PathProvider
-from utils import get_model_and_tokenizer, get_task_path, load_datasets
+from turing_machine.alignment.cost import predict_steps
+from arithmetic.cache import ResultCache, adapter_fingerprint
+from arithmetic.prefix_cache import PrefixCache
+from arithmetic.profiler import enable_profiler
+from utils import get_model_and_tokenizer, get_task_path, load_datasets, load_pretokenized
+from registry import legal_tasks
 
 torch.manual_seed(42)
 torch.cuda.random.manual_seed(42)
 
-legal_tasks = ['add', 'reflection', 'left_mask', 'sub', 'equal', 'greater_than', 'less_than', 'mul', 'div']
+def prompt_lengths(lines, tokenizer, pretokenized=None):
+    # the lengths of a pre-tokenized dataset are read from its offsets
+    if pretokenized is not None:
+        return pretokenized.prompt_lengths()[:len(lines)].tolist()
+    return [len(tokenizer(json.loads(line)['prompt'])['input_ids']) for line in lines]
 
-def eval_one_step(model, tokenizer, batch_size, task_path, task, aligner):
+def bucket_lines(lines, tokenizer, pretokenized=None):
+    # sort samples by tokenized prompt length so that each batch pads to a similar length
+    lengths = prompt_lengths(lines, tokenizer, pretokenized)
+    order = sorted(range(len(lines)), key=lambda i: lengths[i])
+    return [lines[i] for i in order], order
+
+def sjf_lines(lines, tokenizer, task, pretokenized=None):
+    # shortest expected job first: sort samples by the predicted executor steps, then by prompt length,
+    # so that the rows of a batch halt at about the same step instead of idling behind the longest one,
+    # with operand reordering the steps are those of the order the executor runs
+    lengths = prompt_lengths(lines, tokenizer, pretokenized)
+    keys = []
+    for line, length in zip(lines, lengths):
+        keys.append((predict_steps(task, json.loads(line)['prompt'], executor_config['reorder']), length))
+    order = sorted(range(len(lines)), key=lambda i: keys[i])
+    return [lines[i] for i in order], order
+
+def restore_order(items, order):
+    restored = [None] * len(items)
+    for pos, idx in enumerate(order):
+        restored[idx] = items[pos]
+    return restored
+
+def generate_one_step(model, tokenizer, adapter, batch, gen_kwargs, pretokenized=None, indices=None):
+    # reuse the KV cache of the prompt shared by the batch if prefix caching is enabled
+    prefix_cache = executor_config['prefix_cache']
+    prefix = None
+    if prefix_cache is not None:
+        inputs, prefix = prefix_cache.build_inputs(tokenizer, adapter, batch)
+    if prefix is None:
+        if pretokenized is not None:
+            # `indices` are the rows of the batch in the dataset
+            inputs = pretokenized.batch_inputs(indices, tokenizer.pad_token_id)
+            inputs = {key: value.to(model.device) for key, value in inputs.items()}
+        else:
+            inputs = {key: value.to(model.device) for key, value in tokenize_batch(tokenizer, batch).items()}
+        outputs = model.generate(**inputs, **gen_kwargs)
+    else:
+        inputs = {key: value.to(model.device) for key, value in inputs.items()}
+        past_key_values = prefix_cache.past_key_values(model, adapter, prefix, len(batch))
+        outputs = model.generate(**inputs, **gen_kwargs, past_key_values=past_key_values)
+    # every sample is one step, aligners are accounted at step 0 like in the executor
+    step = 0 if adapter.endswith('_aligner') else 1
+    record_token_usage(adapter, step, inputs, outputs, gen_kwargs['pad_token_id'])
+    return outputs
+
+def eval_one_step(model, tokenizer, batch_size, task_path, task, aligner, bucket=False, pretokenized=None):
     prompts = []
     model_responses = []
     ground_truths = []
     cnt = 0
     batch = []
+    batch_indices = []
 
     gen_kwargs = dict(
         max_length=4096,
@@ -28,33 +84,35 @@ def eval_one_step(model, tokenizer, batch_size, task_path, task, aligner):
         do_sample=False,
     )
 
+    adapter = f'{task}_aligner' if aligner else task
     if aligner:
-        model.set_adapter(f'{task}_aligner')
+        model.set_adapter(adapter)
 
     lines = load_datasets([task_path])
+    order = list(range(len(lines)))
+    if bucket:
+        lines, order = bucket_lines(lines, tokenizer, pretokenized)
     pbar = tqdm(lines, total=len(lines))
 
     for line in pbar:
         sample = json.loads(line)
         prompt = sample['prompt']
         batch.append(prompt)
+        batch_indices.append(order[cnt])
         prompts.append(prompt)
         ground_truths.append(sample['response']) 
         cnt += 1
 
         if cnt % batch_size == 0:
             with torch.no_grad():
-                inputs = tokenizer(batch, return_tensors="pt", padding=True).to("cuda")
-                outputs = model.generate(
-                    **inputs,
-                    **gen_kwargs,
-                )
+                outputs = generate_one_step(model, tokenizer, adapter, batch, gen_kwargs, pretokenized, batch_indices)
             for i, output in enumerate(outputs):
                 model_response = extract_answer(batch[i],
                                                     tokenizer.decode(output, skip_special_tokens=True))
                 model_responses.append(model_response)
             # reset batch
             batch = []
+            batch_indices = []
 
             interval = 100
             prev = (cnt - batch_size) // interval
@@ -71,29 +129,36 @@ def eval_one_step(model, tokenizer, batch_size, task_path, task, aligner):
     # last batch
     if len(batch) > 0:
         with torch.no_grad():
-            inputs = tokenizer(batch, return_tensors="pt", padding=True).to("cuda")
-            outputs = model.generate(
-                **inputs,
-                **gen_kwargs,
-            )
+            outputs = generate_one_step(model, tokenizer, adapter, batch, gen_kwargs, pretokenized, batch_indices)
         for i, output in enumerate(outputs):
             model_response = extract_answer(batch[i],
                                                 tokenizer.decode(output, skip_special_tokens=True))                 
             model_responses.append(model_response)
 
+    # back to the order of the dataset
+    if bucket:
+        model_responses = restore_order(model_responses, order)
+        ground_truths = restore_order(ground_truths, order)
+        prompts = restore_order(prompts, order)
+
     result = {}
     print('Final result:')
     result['eval_result'] = do_eval_one_step(model_responses, ground_truths, prompts, task, aligner)
     result['num_samples'] = len(model_responses)
+    result['token_usage'] = token_usage_totals()
+    for adapter, usage in result['token_usage'].items():
+        print(f'{adapter} tokens: {usage}')
 
     with open('log/one_step_result.log', 'w') as f:
         f.write(f'task path: {task_path}\n')
         f.write(f'samples num: {result["num_samples"]}\n')
         f.write(f'accuarcy: {result["eval_result"]}\n')
+        f.write(f'token usage: {json.dumps(result["token_usage"])}\n')
+        f.write(f'token usage per step: {json.dumps(executor_stats["token_usage"])}\n')
 
     return result
 
-def eval_iter(model, tokenizer, batch_size, task_path, task, alignment):
+def eval_iter(model, tokenizer, batch_size, task_path, task, alignment, bucket=False, sjf=False, pretokenized=None):
     prompts = []
     model_responses = []
     ground_truths = []
@@ -101,6 +166,10 @@ def eval_iter(model, tokenizer, batch_size, task_path, task, alignment):
     batch = []
 
     lines = load_datasets([task_path])
+    if sjf:
+        lines, order = sjf_lines(lines, tokenizer, task, pretokenized)
+    elif bucket:
+        lines, order = bucket_lines(lines, tokenizer, pretokenized)
     pbar = tqdm(lines, total=len(lines))
 
     for line in pbar:
@@ -134,26 +203,41 @@ def eval_iter(model, tokenizer, batch_size, task_path, task, alignment):
         batch_model_responses, _ = llm_execute_batch(model, tokenizer, batch, task, alignment)
         model_responses.extend(batch_model_responses)
 
+    # back to the order of the dataset
+    if sjf or bucket:
+        model_responses = restore_order(model_responses, order)
+        ground_truths = restore_order(ground_truths, order)
+        prompts = restore_order(prompts, order)
+
     result = {}
     print('Final result:')
     result['eval_result'] = do_eval_iter(model_responses, ground_truths, prompts, task, alignment)
     result['num_samples'] = len(model_responses)
+    # tokens spent per operator, padding and finished rows are the compute wasted by batching
+    result['token_usage'] = token_usage_totals()
+    for adapter, usage in result['token_usage'].items():
+        print(f'{adapter} tokens: {usage}')
 
     with open('log/iter_result.log', 'w') as f:
         f.write(f'task path: {task_path}\n')
         f.write(f'samples num: {result["num_samples"]}\n')
         f.write(f'accuarcy: {result["eval_result"]}\n')
+        f.write(f'token usage: {json.dumps(result["token_usage"])}\n')
+        f.write(f'token usage per step: {json.dumps(executor_stats["token_usage"])}\n')
 
     return result
 
 
 def eval_model(args, model, tokenizer, path_provider):
     task_path = get_task_path(args, path_provider)
+    # falls back to tokenizing the prompts if the dataset was not exported for this tokenizer
+    pretokenized = load_pretokenized(task_path, tokenizer) if args.pretokenized else None
     if args.execute:
-        return eval_iter(model, tokenizer, args.batch_size, task_path, args.task, args.alignment)
+        return eval_iter(model, tokenizer, args.batch_size, task_path, args.task, args.alignment, args.bucket, args.sjf,
+                         pretokenized)
     else:
         aligner = args.aligner_input or args.aligner_output
-        return eval_one_step(model, tokenizer, args.batch_size, task_path, args.task, aligner)
+        return eval_one_step(model, tokenizer, args.batch_size, task_path, args.task, aligner, args.bucket, pretokenized)
 
 if __name__ == '__main__':
     argparser = argparse.ArgumentParser()
@@ -165,11 +249,48 @@ if __name__ == '__main__':
     argparser.add_argument('--alignment', action='store_true', required=False)
     argparser.add_argument('--aligner_input', action='store_true', required=False)
     argparser.add_argument('--aligner_output', action='store_true', required=False)
+    argparser.add_argument('--num_workers', default=0, type=int, required=False)
+    argparser.add_argument('--process_pool', action='store_true', required=False)
+    argparser.add_argument('--micro_batches', default=1, type=int, required=False)
+    argparser.add_argument('--bucket', action='store_true', required=False)
+    argparser.add_argument('--bucket_size', default=0, type=int, required=False)
+    argparser.add_argument('--sjf', action='store_true', required=False)
+    argparser.add_argument('--prefix_cache', action='store_true', required=False)
+    argparser.add_argument('--early_exit', action='store_true', required=False)
+    argparser.add_argument('--reorder', action='store_true', required=False)
+    argparser.add_argument('--max_steps', default=0, type=int, required=False)
+    argparser.add_argument('--max_tokens', default=0, type=int, required=False)
+    argparser.add_argument('--cache', action='store_true', required=False)
+    argparser.add_argument('--cache_size', default=100000, type=int, required=False)
+    argparser.add_argument('--cache_path', default='', type=str, required=False)
+    argparser.add_argument('--profile', default='', type=str, required=False)
+    argparser.add_argument('--pretokenized', action='store_true', required=False)
     args = argparser.parse_args()
 
+    configure_executor(num_workers=args.num_workers, process_pool=args.process_pool, micro_batches=args.micro_batches,
+                       bucket_size=args.bucket_size, early_exit=args.early_exit, reorder=args.reorder,
+                       max_steps=args.max_steps, max_tokens=args.max_tokens,
+                       prefix_cache=PrefixCache() if args.prefix_cache else None)
+
     path_provider = PathProvider(args.model)
+    if args.cache:
+        fingerprint = adapter_fingerprint(args.model, path_provider, [args.task], args.no_prompt)
+        configure_executor(cache=ResultCache(fingerprint, args.cache_size, args.cache_path or None))
     model, tokenizer = get_model_and_tokenizer(args.task, path_provider, args.no_prompt)
     model.generation_config.temperature=None
     model.generation_config.top_p=None
 
-    result = eval_model(args, model, tokenizer, path_provider)
\ No newline at end of file
+    # the trace only covers the evaluation, not the loading of the model
+    profiler = enable_profiler() if args.profile else None
+    result = eval_model(args, model, tokenizer, path_provider)
+    if profiler is not None:
+        profiler.export_chrome_trace(args.profile)
+        print(profiler.summary())
+    if args.early_exit:
+        print(f'early exits: {executor_stats["early_exits"]}')
+    if args.reorder:
+        print(f'reordered: {executor_stats["reordered"]}')
+    if args.max_steps > 0 or args.max_tokens > 0:
+        print(f'budget exceeded: {executor_stats["budget_exceeded"]}')
+    if args.cache:
+        print(f'cache hits: {executor_stats["cache_hits"]}, cache misses: {executor_stats["cache_misses"]}')
\ No newline at end of file
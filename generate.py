@@ -1,35 +1,16 @@
 import argparse
 
-from synthetic.add_generate import generate as add_gen
-from synthetic.reflection_generate import generate as ref_gen
-from synthetic.left_mask_generate import generate as lm_gen
-from synthetic.sub_generate import generate as sub_gen
-from synthetic.equal_generate import generate as eq_gen
-from synthetic.greater_than_generate import generate as gt_gen
-from synthetic.less_than_generate import generate as lt_gen
-from synthetic.mul_generate import generate as mul_gen
-from synthetic.div_generate import generate as div_gen
-from synthetic.aligner_generate import generate as alignment_gen
+from registry import legal_tasks as operator_tasks, get_entry, load
 
-
-legal_tasks = ['add', 'reflection', 'left_mask', 'sub', 'equal', 'greater_than', 'less_than', 'mul', 'div', 'alignment']
-
-task_gen_mapping = dict(
-    add=add_gen,
-    reflection=ref_gen,
-    left_mask=lm_gen,
-    sub=sub_gen,
-    equal=eq_gen,
-    greater_than=gt_gen,
-    less_than=lt_gen,
-    mul=mul_gen,
-    div=div_gen,
-    alginment=alignment_gen,
-)
+legal_tasks = operator_tasks + ['alignment']
 
 def generate(args):
     task = args.task
-    gen_func = task_gen_mapping[task]
+    # only the generation module of the task is imported
+    if task == 'alignment':
+        gen_func = load('synthetic.aligner_generate:generate')
+    else:
+        gen_func = get_entry(task, 'synthetic')
     gen_func(args)
 
 if __name__ == '__main__':
@@ -43,6 +24,14 @@ if __name__ == '__main__':
     argparser.add_argument('--init', action='store_true', required=False)
     argparser.add_argument('--append', action='store_true', required=False)
     argparser.add_argument('--setting', type=str, required=False, choices=['execute', 'raw', 'alignment', 'separate'])
+    # spill the samples to shuffled shards every `shard_size` samples instead of keeping them in memory
+    argparser.add_argument('--shard_size', default=0, type=int, required=False)
+    argparser.add_argument('--spill_dir', default='', type=str, required=False)
+    argparser.add_argument('--compress', type=str, default='none', choices=['none', 'zstd'], required=False)
+    # counter-based random streams per cell of the generation loops, see `data/rng.py`
+    argparser.add_argument('--rng', type=str, default='sequential', choices=['sequential', 'counter'], required=False)
+    argparser.add_argument('--seed', default=42, type=int, required=False)
+    argparser.add_argument('--num_procs', default=1, type=int, required=False)
     args = argparser.parse_args()
 
     generate(args)
\ No newline at end of file
@@ -0,0 +1,159 @@
+import importlib
+
+r""" Registry of the arithmetic operators.
+
+Every operator is registered once, with the entries the CLIs look up:
+- machine: the Turing machine prototype, `turing_machine/*/*_tm.py`;
+- checker: the checker of the executor outputs;
+- seq_generator: the transition sequence generator, `data/generator.py`;
+- synthetic: the dataset generation entry of `generate.py`, `synthetic/*_generate.py`;
+- train_samples: the generator of its training samples, used by `generate.py` and `data/dataset.py`;
+- executor: the batched LLM executor, `arithmetic/llm_arithmetic_batch.py`;
+- requirements: the operators it calls, their adapters are loaded with its own.
+
+Entries are 'module:attribute' strings imported on first use, so a run only
+imports the modules of the operators it touches.
+
+Example:
+checker_cls = get_entry('add', 'checker')
+"""
+
+operators = dict(
+    add=dict(
+        machine='turing_machine.addition.addition_tm:AdditionTM',
+        checker='turing_machine.addition.addition_tm:AdditionTMChecker',
+        seq_generator='data.generator:AddSeqGenerator',
+        synthetic='synthetic.add_generate:generate',
+        train_samples='synthetic.add_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_add_batch',
+        requirements=None,
+    ),
+    reflection=dict(
+        machine='turing_machine.reflection.reflection_tm:ReflectionTM',
+        checker='turing_machine.reflection.reflection_tm:ReflectionTMChecker',
+        seq_generator='data.generator:ReflectionSeqGenerator',
+        synthetic='synthetic.reflection_generate:generate',
+        train_samples='synthetic.reflection_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_reflection_batch',
+        requirements=None,
+    ),
+    left_mask=dict(
+        machine='turing_machine.left_mask.left_mask_tm:LeftMaskTM',
+        checker='turing_machine.left_mask.left_mask_tm:LeftMaskTMChecker',
+        seq_generator='data.generator:LeftMaskSeqGenerator',
+        synthetic='synthetic.left_mask_generate:generate',
+        train_samples='synthetic.left_mask_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_left_mask_batch',
+        requirements=None,
+    ),
+    sub=dict(
+        machine='turing_machine.subtraction.sub_tm:SubtractionTM',
+        checker='turing_machine.subtraction.sub_tm:SubtractionTMChecker',
+        seq_generator='data.generator:SubSeqGenerator',
+        synthetic='synthetic.sub_generate:generate',
+        train_samples='synthetic.sub_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_sub_batch',
+        requirements=['add', 'reflection', 'left_mask'],
+    ),
+    equal=dict(
+        machine='turing_machine.equal.equal_tm:EqualTM',
+        checker='turing_machine.equal.equal_tm:EqualTMChecker',
+        seq_generator='data.generator:EqualSeqGenerator',
+        synthetic='synthetic.equal_generate:generate',
+        train_samples='synthetic.equal_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_equal_batch',
+        requirements=None,
+    ),
+    greater_than=dict(
+        machine='turing_machine.greater_than.greater_than_tm:GreaterThanTM',
+        checker='turing_machine.greater_than.greater_than_tm:GreaterThanTMChecker',
+        seq_generator='data.generator:GreaterThanSeqGenerator',
+        synthetic='synthetic.greater_than_generate:generate',
+        train_samples='synthetic.greater_than_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_greater_than_batch',
+        requirements=None,
+    ),
+    less_than=dict(
+        machine='turing_machine.less_than.less_than_tm:LessThanTM',
+        checker='turing_machine.less_than.less_than_tm:LessThanTMChecker',
+        seq_generator='data.generator:LessThanSeqGenerator',
+        synthetic='synthetic.less_than_generate:generate',
+        train_samples='synthetic.less_than_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_less_than_batch',
+        requirements=None,
+    ),
+    mul=dict(
+        machine='turing_machine.multiplication.mul_tm:MultiplicationTM',
+        checker='turing_machine.multiplication.mul_tm:MultiplicationTMChecker',
+        seq_generator='data.generator:MulSeqGenerator',
+        synthetic='synthetic.mul_generate:generate',
+        train_samples='synthetic.mul_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_mul_batch',
+        requirements=['add', 'less_than'],
+    ),
+    div=dict(
+        machine='turing_machine.division.div_tm:DivisionTM',
+        checker='turing_machine.division.div_tm:DivisionTMChecker',
+        seq_generator='data.generator:DivSeqGenerator',
+        synthetic='synthetic.div_generate:generate',
+        train_samples='synthetic.div_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_div_batch',
+        requirements=['add', 'greater_than'],
+    ),
+    long_mul=dict(
+        machine='turing_machine.long_multiplication.long_mul_tm:LongMultiplicationTM',
+        checker='turing_machine.long_multiplication.long_mul_tm:LongMultiplicationTMChecker',
+        seq_generator='data.generator:LongMulSeqGenerator',
+        synthetic='synthetic.long_mul_generate:generate',
+        train_samples='synthetic.long_mul_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_long_mul_batch',
+        requirements=['mul', 'add'],
+    ),
+    long_div=dict(
+        machine='turing_machine.long_division.long_div_tm:LongDivisionTM',
+        checker='turing_machine.long_division.long_div_tm:LongDivisionTMChecker',
+        seq_generator='data.generator:LongDivSeqGenerator',
+        synthetic='synthetic.long_div_generate:generate',
+        train_samples='synthetic.long_div_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_long_div_batch',
+        requirements=['sub', 'greater_than'],
+    ),
+    borrow_sub=dict(
+        machine='turing_machine.borrow_subtraction.borrow_sub_tm:BorrowSubtractionTM',
+        checker='turing_machine.borrow_subtraction.borrow_sub_tm:BorrowSubtractionTMChecker',
+        seq_generator='data.generator:BorrowSubSeqGenerator',
+        synthetic='synthetic.borrow_sub_generate:generate',
+        train_samples='synthetic.borrow_sub_generate:train_samples',
+        executor='arithmetic.llm_arithmetic_batch:llm_borrow_sub_batch',
+        requirements=None,
+    ),
+)
+
+legal_tasks = list(operators.keys())
+
+_loaded = {}
+
+def load(target):
+    # 'module:attribute' -> attribute, the module is imported once
+    if target not in _loaded:
+        module, attribute = target.split(':')
+        _loaded[target] = getattr(importlib.import_module(module), attribute)
+    return _loaded[target]
+
+def get_entry(task, kind):
+    if task not in operators:
+        raise ValueError(f'Invalid task: {task}')
+    if kind not in operators[task] or kind == 'requirements':
+        raise ValueError(f'Invalid registry entry: {kind}')
+    return load(operators[task][kind])
+
+def get_requirements(task):
+    if task not in operators:
+        raise ValueError(f'Invalid task: {task}')
+    return operators[task]['requirements']
+
+def lazy_entry(task, kind):
+    # a stand-in for a class of the registry that imports it when it is first called
+    def create(*args, **kwargs):
+        return get_entry(task, kind)(*args, **kwargs)
+    return create
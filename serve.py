@@ -0,0 +1,302 @@
+import os
+os.environ['CUDA_VISIBLE_DEVICES'] = '0,1'
+import argparse
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+import torch
+
+from arithmetic.llm_arithmetic_batch import llm_execute_batch, configure_executor
+from turing_machine.tm_path import PathProvider
+from turing_machine.alignment.aligner import TMAligner
+from arithmetic.cache import ResultCache, adapter_fingerprint
+from arithmetic.scheduler import CostScheduler, REJECT, DEFER
+from utils import get_model_and_tokenizer
+from registry import legal_tasks
+
+torch.manual_seed(42)
+torch.cuda.random.manual_seed(42)
+
+r""" Local arithmetic service.
+
+The model and the adapters of the served tasks are loaded once and stay resident.
+Concurrent requests are queued per task and coalesced into batches for `llm_execute_batch`:
+a batch runs when it holds `max_batch_size` expressions, or when its oldest expression
+has waited `max_wait_ms`. The model runs on a single worker thread.
+
+The cost of every expression is estimated before it is queued (see `arithmetic/scheduler.py`):
+expressions above `max_cost` are rejected, expressions above `defer_cost` go to a deferred queue,
+run in batches of `deferred_batch_size` only when no cheap expression is waiting.
+
+Protocol:
+- POST /execute
+  body: {"expressions": ["44814*5=", "78-9="], "task": "mul"}
+  `task` is optional, by default it is chosen from the operator of each expression.
+  response: one JSON line per expression, streamed as soon as its batch halts (all the rows
+  of a batch are returned together), in completion order:
+    {"index": 0, "expression": "44814*5=", "cost": 41, "output": "44814*5=224070", "correct": true}
+    {"index": 1, "expression": "78-9=", "error": "Task not served: sub"}
+- GET /health
+  response: {"tasks": [...], "pending": 0}
+
+Example:
+python serve.py --model 3.1 --tasks add sub mul --no_prompt --port 8000
+curl -N -d '{"expressions": ["44814*5="]}' http://127.0.0.1:8000/execute
+"""
+
+
+EXPRESSION_PATTERN = r'^\s*(\d+)\s*(\+|-|\*|//|>|<|==)\s*(\d+)\s*=\s*$'
+
+class BatchQueue:
+    def __init__(self, model, tokenizer, max_batch_size, max_wait, deferred_batch_size=1):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.deferred_batch_size = deferred_batch_size
+        # (task, deferred) -> list of (arrival time, expression, future), in arrival order
+        self.pending = {}
+        self.cond = threading.Condition()
+        self.running = False
+        self.worker = None
+
+    def start(self):
+        self.running = True
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.worker.join()
+        # fail the expressions that never ran
+        for items in self.pending.values():
+            for _, _, future in items:
+                future.set_exception(RuntimeError('Server stopped'))
+        self.pending = {}
+
+    def size(self):
+        with self.cond:
+            return sum(len(items) for items in self.pending.values())
+
+    def submit(self, expression, task, deferred=False):
+        future = Future()
+        with self.cond:
+            self.pending.setdefault((task, deferred), []).append((time.monotonic(), expression, future))
+            self.cond.notify_all()
+        return future
+
+    def _batch_size(self, key):
+        _, deferred = key
+        return self.deferred_batch_size if deferred else self.max_batch_size
+
+    def _take_batch(self):
+        # block until a task has a full batch or an expression waited long enough
+        with self.cond:
+            while self.running:
+                keys = [key for key, items in self.pending.items() if items]
+                if not keys:
+                    self.cond.wait()
+                    continue
+                # deferred expressions only run when no cheap expression is waiting
+                cheap = [key for key in keys if not key[1]]
+                keys = cheap if cheap else keys
+                # serve the task holding the oldest expression first
+                key = min(keys, key=lambda k: self.pending[k][0][0])
+                items = self.pending[key]
+                deadline = items[0][0] + self.max_wait
+                now = time.monotonic()
+                full = [k for k in keys if len(self.pending[k]) >= self._batch_size(k)]
+                if full:
+                    key = full[0]
+                    items = self.pending[key]
+                elif now < deadline:
+                    self.cond.wait(deadline - now)
+                    continue
+                size = self._batch_size(key)
+                batch = items[:size]
+                self.pending[key] = items[size:]
+                return key[0], batch
+            return None, None
+
+    def _run(self):
+        while True:
+            task, batch = self._take_batch()
+            if task is None:
+                return
+            self._execute(task, batch)
+
+    def _execute(self, task, batch):
+        # results are delivered when the whole batch returns from `llm_execute_batch`
+        expressions = [expression for _, expression, _ in batch]
+        try:
+            responses, corrects = llm_execute_batch(self.model, self.tokenizer, expressions, task, True)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            # run the rows one by one, only the rows raising again fail
+            for item in batch:
+                self._execute(task, [item])
+            return
+        for (_, _, future), response, correct in zip(batch, responses, corrects):
+            future.set_result((response, correct))
+
+
+class ArithmeticHandler(BaseHTTPRequestHandler):
+    # HTTP/1.0 closes the connection after the response, so lines can be streamed without a length
+    protocol_version = 'HTTP/1.0'
+
+    def address_string(self):
+        # the client address of a Unix socket is empty
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return 'unix'
+
+    def _send_json(self, code, obj):
+        body = (json.dumps(obj) + '\n').encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_line(self, obj):
+        self.wfile.write((json.dumps(obj) + '\n').encode())
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, dict(error=f'Invalid path: {self.path}'))
+            return
+        self._send_json(200, dict(tasks=self.server.tasks, pending=self.server.batch_queue.size()))
+
+    def do_POST(self):
+        if self.path != '/execute':
+            self._send_json(404, dict(error=f'Invalid path: {self.path}'))
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length))
+            expressions = request['expressions']
+            task = request.get('task')
+            if not isinstance(expressions, list):
+                raise ValueError('Invalid expressions: a list is expected')
+        except Exception as e:
+            self._send_json(400, dict(error=f'Invalid request: {e}'))
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+
+        futures = {}
+        costs = {}
+        for i, expression in enumerate(expressions):
+            try:
+                expression_task, op1, op2, normalized = self._parse(expression, task)
+                decision, costs[i] = self.server.scheduler.admit(expression_task, op1, op2)
+                if decision == REJECT:
+                    raise ValueError(f'Estimated cost {costs[i]} exceeds the limit {self.server.scheduler.max_cost}')
+            except ValueError as e:
+                self._write_line(dict(index=i, expression=expression, error=str(e)))
+                continue
+            futures[self.server.batch_queue.submit(normalized, expression_task, decision == DEFER)] = i
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                output, correct = future.result()
+                self._write_line(dict(index=i, expression=expressions[i], cost=costs[i], output=output, correct=correct))
+            except Exception as e:
+                self._write_line(dict(index=i, expression=expressions[i], error=str(e)))
+
+    def _parse(self, expression, task):
+        match = re.match(EXPRESSION_PATTERN, str(expression))
+        if not match:
+            raise ValueError(f'Invalid expression: {expression}')
+        op1, operator, op2 = match.groups()
+        aligner = TMAligner()
+        if task is None:
+            task = aligner.op_2_task[operator]
+        elif aligner.task_2_op.get(task) != operator:
+            raise ValueError(f'Invalid operator for task {task}: {operator}')
+        if task not in self.server.tasks:
+            raise ValueError(f'Task not served: {task}')
+        if operator == '//' and int(op2) == 0:
+            raise ValueError(f'Invalid expression: {expression}')
+        # the executor expects the expression without whitespace
+        return task, op1, op2, f'{op1}{operator}{op2}='
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def build_server(args, batch_queue, scheduler):
+    if args.unix_socket:
+        if os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+        server = UnixHTTPServer(args.unix_socket, ArithmeticHandler)
+        address = args.unix_socket
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ArithmeticHandler)
+        address = f'http://{args.host}:{args.port}'
+    server.tasks = args.tasks
+    server.batch_queue = batch_queue
+    server.scheduler = scheduler
+    return server, address
+
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--model', type=str, required=True, choices=['3', '3.1'])
+    argparser.add_argument('--tasks', type=str, nargs='+', choices=legal_tasks, required=True)
+    argparser.add_argument('--no_prompt', action='store_true', required=False)
+    argparser.add_argument('--host', default='127.0.0.1', type=str, required=False)
+    argparser.add_argument('--port', default=8000, type=int, required=False)
+    argparser.add_argument('--unix_socket', default='', type=str, required=False)
+    argparser.add_argument('--max_batch_size', default=32, type=int, required=False)
+    argparser.add_argument('--max_wait_ms', default=20, type=int, required=False)
+    argparser.add_argument('--max_cost', default=0, type=int, required=False)
+    argparser.add_argument('--defer_cost', default=0, type=int, required=False)
+    argparser.add_argument('--deferred_batch_size', default=1, type=int, required=False)
+    argparser.add_argument('--num_workers', default=0, type=int, required=False)
+    argparser.add_argument('--bucket_size', default=0, type=int, required=False)
+    argparser.add_argument('--early_exit', action='store_true', required=False)
+    argparser.add_argument('--reorder', action='store_true', required=False)
+    argparser.add_argument('--max_steps', default=0, type=int, required=False)
+    argparser.add_argument('--max_tokens', default=0, type=int, required=False)
+    argparser.add_argument('--cache', action='store_true', required=False)
+    argparser.add_argument('--cache_size', default=100000, type=int, required=False)
+    argparser.add_argument('--cache_path', default='', type=str, required=False)
+    args = argparser.parse_args()
+
+    configure_executor(num_workers=args.num_workers, bucket_size=args.bucket_size,
+                       early_exit=args.early_exit, reorder=args.reorder,
+                       max_steps=args.max_steps, max_tokens=args.max_tokens)
+
+    path_provider = PathProvider(args.model)
+    if args.cache:
+        fingerprint = adapter_fingerprint(args.model, path_provider, args.tasks, args.no_prompt)
+        configure_executor(cache=ResultCache(fingerprint, args.cache_size, args.cache_path or None))
+    model, tokenizer = get_model_and_tokenizer(args.tasks, path_provider, args.no_prompt)
+    model.generation_config.temperature=None
+    model.generation_config.top_p=None
+
+    scheduler = CostScheduler(args.max_cost, args.defer_cost, args.reorder)
+    batch_queue = BatchQueue(model, tokenizer, args.max_batch_size, args.max_wait_ms / 1000, args.deferred_batch_size)
+    batch_queue.start()
+    server, address = build_server(args, batch_queue, scheduler)
+    print(f'Serving {", ".join(args.tasks)} on {address}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batch_queue.stop()
@@ -4,6 +4,8 @@ import os
 
 from data.generator import AlignerPairGenerator
 from data.proportion import Proportioner
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
 
 train_target_file_template = 'datasets/train/alignment{suffix}.json'
 test_target_file_template = 'datasets/test/alignment_{min}_{max}{suffix}.jsonl'
@@ -83,7 +85,7 @@ def get_extra_pairs(a_n_digits, b_n_digits, num, generator, args):
 
 def write_json_samples(samples, target_file, append):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'a') if append else open(target_file, 'w')
     target.write('[\n')
     cnt = 0
@@ -100,14 +102,15 @@ def write_json_samples(samples, target_file, append):
 
 def write_jsonl_samples(samples, target_file, append):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'a') if append else open(target_file, 'w')
     for sample in samples:
         prompt, response = sample
         target.write(json.dumps({"prompt": prompt, "response": response}) + '\n')
     target.close()
 
-def generate_train(args):
+def train_samples(args):
+    # the samples of the training set, in the order they are generated
     generator = AlignerPairGenerator()
     porportioner = Proportioner(
         minimal=args.min,
@@ -116,9 +119,11 @@ def generate_train(args):
         task='align',
         option='balance'
     )
-    samples = []
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min,  args.max + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
             for i in range(num):
                 if i % 2 == 0:
@@ -126,13 +131,18 @@ def generate_train(args):
                 else:
                     pair = generator.generate_output_pair(a_n_digits, b_n_digits)
                 if pair:
-                    samples.append(align_pair(pair, args))
+                    yield align_pair(pair, args)
             pairs = get_extra_pairs(a_n_digits, b_n_digits, num, generator, args)
-            samples.extend(pairs)
+            yield from pairs
+
+def generate_train(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
     train_target_file = train_target_file_template.format(suffix='_no_prompt' if args.no_prompt else '')
     write_json_samples(samples, train_target_file, args.append)
 
-def generate_test(args):
+def test_samples(args):
+    # the samples of the test set, in the order they are generated
     generator = AlignerPairGenerator()
     porportioner = Proportioner(
         minimal=args.min,
@@ -141,10 +151,12 @@ def generate_test(args):
         task='align',
         option='balance'
     )
-    samples = []
 
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min, args.max + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
             for i in range(num):
                 if i % 2 == 0:
@@ -152,9 +164,13 @@ def generate_test(args):
                 else:
                     pair = generator.generate_output_pair(a_n_digits, b_n_digits)
                 if pair:
-                    samples.append(align_pair(pair, args))
+                    yield align_pair(pair, args)
             pairs = get_extra_pairs(a_n_digits, b_n_digits, num, generator, args)
-            samples.extend(pairs)
+            yield from pairs
+
+def generate_test(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(test_samples, args))
 
     suffix = ''
     if args.no_prompt:
@@ -0,0 +1,266 @@
+import json
+import random
+import re
+import os
+
+from data.generator import BorrowSubSeqGenerator
+from data.proportion import Proportioner
+from turing_machine.alignment.aligner import TMAligner
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
+
+train_target_file_template = 'datasets/train/{prefix}borrow_sub{suffix}.json'
+test_target_file_template = 'datasets/test/{prefix}borrow_sub_{min}_{max}{suffix}.jsonl'
+raw_train_target_file = 'datasets/raw/borrow_subtraction/train.jsonl'
+raw_test_target_file_template = 'datasets/raw/borrow_subtraction/test_{min}_{max}.jsonl'
+
+BORROW_SUBTRACTION_PROMPT = """The following is a state paired with a command to be executed of a Turing Machine that performs subtraction.
+
+The state includes the current operator, the current state of the machine, the current tape contents, and the current head positions.
+- There are four states in the machine: q0, q1, q2 and qH. The machine starts in state q0 and halts when it reaches state qH. q1 is the state where the machine does the subtraction and calculates the borrow. q2 is the state where the machine erases the leading zeros of the output.
+- The head positions are represented by [HEAD1] and [HEAD2], which indicate the positions of the heads on the two operands. 
+- The borrow is represented by [B].
+- The output position is represented by [OUTPUT].
+
+The command includes a series of actions to be executed by the machine and they are separated by commas.
+- [OUTPUT] <number>: Write the number to the output position.
+- [OUTPUT] <direction>: Move the output head to the direction.
+- [OUTPUT] ERASE: Erase the number at the output position.
+- [B] <number>: Write the number to the borrow register.
+- [HEAD1] <direction>: Move the head on the first operand to the direction.
+- [HEAD2] <direction>: Move the head on the second operand to the direction.
+- <state>: Move the machine to the state.
+
+The machine performs subtraction by reading the digits from the two operands and writing the difference to the output tape. 
+
+Based the current state and the command, predict the next state of the machine and next command to be executed.
+
+"""
+
+ALIGNMENT_PROMPT = """The following is an input to a Turing Machine or an output of a Turing Machine. 
+
+The task is doing an alignment:
+- If it is an input, adapt the original input to the format that the Turing Machine can understand.
+- If it is an output, adapt the original output to the format that represents the final result.
+
+Input example:
+```
+- input: 
+4531-1504=
+- output:
+BORROW_SUB, q0, [HEAD1] |1|3|5|4[HEAD2] |4|0|5|1 [B] [OUTPUT]
+CMD: [B] 0, [HEAD1] RIGHT, [HEAD2] RIGHT, q1
+```
+
+Output example:
+```
+- input:
+BORROW_SUB, qH,  |1|3|5|4[HEAD1] |4|0|5|1[HEAD2] [B]0 |7|2|0|3
+No command to execute. Halt state.
+- output:
+4531-1504=3027
+```
+
+There are two lines that represent the Turing Machine:
+- The first line is the current state of the machine.
+- The second line is the command to be executed.
+And this format is fit to both input and output as the examples shown above.
+
+For the current state (the first line): 
+- There are at least 2 states in the machine: q0 and qH. The machine starts in state q0 and halts when it reaches state qH.
+- The head positions are represented by [HEAD1] and [HEAD2], which followed by two operands. 
+- [B] represents the borrow register and [OUTPUT] represents the output position. And these two are empty at the beginning.
+
+The command (the second line) includes a series of actions to be executed by the machine and they are separated by commas.
+- [HEAD] <direction>: Move the head to the direction.
+- [B] <number>: Write the number to the borrow register.
+- <state>: Move the machine to the state.
+
+Note that the number is represented in reverse order in machine, which is beneficial to the machine to perform the subtraction operation.
+
+Based on the input, determine it is an input or an output, and adapt it to the format correspondingly.
+
+"""
+
+def seq_2_samples(seq, args):
+    # only the steps kept are read, a lazy `seq` renders nothing else
+    def sample(i):
+        input = '' if args.no_prompt else BORROW_SUBTRACTION_PROMPT
+        input += seq[i][0] + '\n' + seq[i][1] + '\n'
+        output = seq[i + 1][0] + '\n' + seq[i + 1][1] + '\n'
+        return (input, output)
+    num_samples = len(seq) - 1
+    if num_samples <= 5:
+        return [sample(i) for i in range(num_samples)]
+    else:
+        trancated_samples = [sample(0), sample(num_samples - 1), sample(num_samples - 2)]
+        for i in range(1, 5):
+            trancated_samples.append(sample(random.randint(1, num_samples - 3)))
+        return trancated_samples
+
+
+def write_json_samples(samples, target_file):
+    os.makedirs(os.path.dirname(target_file), exist_ok=True)
+    samples = shuffled(samples)
+    target = open(target_file, 'w')
+    target.write('[\n')
+    cnt = 0
+    for sample in samples:
+        if cnt != 0:
+            target.write(",\n")
+        cnt += 1
+        prompt, response = sample
+        json.dump({"instruction": prompt, "input": "", "output": response}, target, ensure_ascii=False, indent=4)
+
+    target.write('\n]\n')
+    target.close()
+
+def write_jsonl_samples(samples, target_file):
+    os.makedirs(os.path.dirname(target_file), exist_ok=True)
+    samples = shuffled(samples)
+    target = open(target_file, 'w')
+    for sample in samples:
+        prompt, response = sample
+        target.write(json.dumps({"prompt": prompt, "response": response}) + '\n')
+    target.close()
+
+def generate_sample(generator, aligner, a_n_digits, b_n_digits, args):
+    if args.setting == 'execute':
+        seq = generator.generate(a_n_digits, b_n_digits)
+        return seq_2_samples(seq, args)
+    elif args.setting == 'alignment':
+        op1, op2 = generator.generate_ops(a_n_digits, b_n_digits)
+        raw_input = f'{op1}-{op2}='
+        raw_output = raw_input + str(op1 - op2)
+        input = aligner.input_to_tm(raw_input, 'borrow_sub')
+        _, output = generator.initial_and_halt(op1, op2)
+        output += '\n'
+        if not args.no_prompt:
+            raw_input = ALIGNMENT_PROMPT + raw_input
+            output = ALIGNMENT_PROMPT + output
+        return [(raw_input, input), (output, raw_output)]
+    elif args.setting == 'raw':
+        input, output = generator.generate_raw(a_n_digits, b_n_digits)
+        return [(input, output)]
+    else:
+        raise NotImplementedError
+
+def train_samples(args):
+    # the samples of the training set, in the order they are generated
+    generator = BorrowSubSeqGenerator(lazy=True)
+    porportioner = Proportioner(
+        minimal=args.min,
+        maximal=args.max,
+        num=args.num,
+        task='borrow_sub',
+        option='balance'
+    )
+    aligner = TMAligner()
+    cells = cell_rng(args)
+    for a_n_digits in range(args.min, args.max + 1):
+        for b_n_digits in range(args.min, a_n_digits + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
+            num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
+            for _ in range(num):
+                sample = generate_sample(generator, aligner, a_n_digits, b_n_digits, args)
+                yield from sample
+
+def generate_train(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
+
+    if args.setting == 'execute':
+        prefix = 'execute_'
+        suffix = '_no_prompt' if args.no_prompt else ''
+    elif args.setting == 'alignment':
+        prefix = ''
+        suffix = '_alignment'
+        suffix += '_no_prompt' if args.no_prompt else ''
+    elif args.setting == 'raw':
+        prefix = suffix = ''
+    else:
+        raise NotImplementedError
+    
+    if args.setting == 'raw':
+        train_target_file = raw_train_target_file
+        write_jsonl_samples(samples, train_target_file)
+    else:
+        train_target_file = train_target_file_template.format(prefix=prefix, suffix=suffix)
+        write_json_samples(samples, train_target_file)
+
+def raw_to_tm():
+    n_digits = [5, 10, 50 ,100]
+    pattern = r'(\d+)\-(\d+)='
+    aligner = TMAligner()
+    generator = BorrowSubSeqGenerator(lazy=True)
+    for n_digit in n_digits:
+        raw_f = raw_test_target_file_template.format(min=n_digit, max=n_digit)
+        executor_samples = []
+        aligner_input_samples = []
+        aligner_output_samples = []
+        with open(raw_f, 'r') as f:
+            for line in f:
+                sample = json.loads(line)
+                raw_input = sample['prompt']
+                match = re.search(pattern, raw_input)
+                if match:
+                    op1, op2 = match.groups()
+                    op1, op2 = int(op1), int(op2)
+                    tm_input = aligner.input_to_tm(raw_input, 'borrow_sub')
+                    raw_output = raw_input + str(op1 - op2)
+                    _, tm_output = generator.initial_and_halt(op1, op2)
+                    tm_output += '\n'
+                    executor_samples.append((tm_input, tm_output))
+                    aligner_input_samples.append((raw_input, tm_input))
+                    aligner_output_samples.append((tm_output, raw_output))
+                else:
+                    raise ValueError(f'Invalid input: {raw_input}')
+        write_jsonl_samples(executor_samples, test_target_file_template.format(min=n_digit, max=n_digit, prefix='execute_', suffix='_executor'))
+        write_jsonl_samples(aligner_input_samples, test_target_file_template.format(min=n_digit, max=n_digit, prefix='execute_', suffix='_aligner_input'))
+        write_jsonl_samples(aligner_output_samples, test_target_file_template.format(min=n_digit, max=n_digit, prefix='execute_', suffix='_aligner_output'))
+                
+
+def test_samples(args):
+    # the samples of the test set, in the order they are generated
+    generator = BorrowSubSeqGenerator(lazy=True)
+    aligner = TMAligner()
+    cells = cell_rng(args)
+    for a_n_digits in range(args.min, args.max + 1):
+        for b_n_digits in range(args.min, a_n_digits + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
+            for _ in range(args.num):
+                sample = generate_sample(generator, aligner, a_n_digits, b_n_digits, args)
+                yield from sample
+
+def generate_test(args):
+    if args.setting == 'separate':
+        raw_to_tm()
+        return
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(test_samples, args))
+
+    if args.setting == 'execute':
+        prefix = 'execute_'
+        suffix = '_no_prompt' if args.no_prompt else ''
+    elif args.setting == 'alignment':
+        prefix = ''
+        suffix = '_alignment'
+    elif args.setting == 'raw':
+        prefix = suffix = ''
+
+    if args.setting == 'raw':
+        test_target_file = raw_test_target_file_template.format(min=args.min, max=args.max)
+    else:
+        test_target_file = test_target_file_template.format(
+            min=args.min, max=args.max, prefix=prefix, suffix=suffix)
+    write_jsonl_samples(samples, test_target_file)
+
+def generate(args):
+    if args.split == 'train':
+        random.seed(42)
+        generate_train(args)
+    elif args.split == 'test':
+        random.seed(43)
+        generate_test(args)
@@ -3,6 +3,8 @@ import random
 import os
 
 from data.generator import LeftMaskSeqGenerator
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
 
 train_target_file_template = 'datasets/train/left_mask{suffix}.json'
 test_target_file_template = 'datasets/test/left_mask_{min}_{max}{suffix}.jsonl'
@@ -29,23 +31,24 @@ Based the current state and the command, predict the next state of the machine a
 """
 
 def seq_2_samples(seq, args):
-    samples = []
-    for i in range(len(seq) - 1):
+    # only the steps kept are read, a lazy `seq` renders nothing else
+    def sample(i):
         input = '' if args.no_prompt else LEFT_MASK_PROMPT
         input += seq[i][0] + '\n' + seq[i][1] + '\n'
         output = seq[i + 1][0] + '\n' + seq[i + 1][1] + '\n'
-        samples.append((input, output))
-    if len(samples) <= 5:
-        return samples
+        return (input, output)
+    num_samples = len(seq) - 1
+    if num_samples <= 5:
+        return [sample(i) for i in range(num_samples)]
     else:
-        trancated_samples = [samples[0], samples[-1]]
+        trancated_samples = [sample(0), sample(num_samples - 1)]
         for i in range(1, 4):
-            trancated_samples.append(samples[random.randint(1, len(samples) - 2)])
+            trancated_samples.append(sample(random.randint(1, num_samples - 2)))
         return trancated_samples
 
 def write_json_samples(samples, target_file):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'w')
     target.write('[\n')
     cnt = 0
@@ -61,35 +64,49 @@ def write_json_samples(samples, target_file):
 
 def write_jsonl_samples(samples, target_file):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'w')
     for sample in samples:
         prompt, response = sample
         target.write(json.dumps({"prompt": prompt, "response": response}) + '\n')
     target.close()
 
-def generate_train(args):
-    generator = LeftMaskSeqGenerator()
-    samples = []
+def train_samples(args):
+    # the samples of the training set, in the order they are generated
+    generator = LeftMaskSeqGenerator(lazy=True)
+    cells = cell_rng(args)
     for n_digits in range(args.min, args.max + 1):
+        if not cells.enter(generator, n_digits):
+            continue
         for _ in range(args.num // 2):
             seq = generator.generate(n_digits)
-            samples.extend(seq_2_samples(seq, args))
+            yield from seq_2_samples(seq, args)
             seq = generator.generate(n_digits, leading_zero=True)
-            samples.extend(seq_2_samples(seq, args))
+            yield from seq_2_samples(seq, args)
+
+def generate_train(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
 
     train_target_file = train_target_file_template.format(suffix='_no_prompt' if args.no_prompt else '')
     write_json_samples(samples, train_target_file)
 
-def generate_test(args):
-    generator = LeftMaskSeqGenerator()
-    samples = []
+def test_samples(args):
+    # the samples of the test set, in the order they are generated
+    generator = LeftMaskSeqGenerator(lazy=True)
+    cells = cell_rng(args)
     for n_digits in range(args.min, args.max + 1):
+        if not cells.enter(generator, n_digits):
+            continue
         for _ in range(args.num // 2):
             seq = generator.generate(n_digits)
-            samples.extend(seq_2_samples(seq, args))
+            yield from seq_2_samples(seq, args)
             seq = generator.generate(n_digits, leading_zero=True)
-            samples.extend(seq_2_samples(seq, args))
+            yield from seq_2_samples(seq, args)
+
+def generate_test(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(test_samples, args))
 
     test_target_file = test_target_file_template.format(
         min=args.min, max=args.max, suffix='_no_prompt' if args.no_prompt else '')
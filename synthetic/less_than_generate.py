@@ -6,6 +6,8 @@ import os
 from data.generator import LessThanSeqGenerator
 from data.proportion import Proportioner
 from turing_machine.alignment.aligner import TMAligner
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
 
 train_target_file_template = 'datasets/train/{prefix}less_than{suffix}.json'
 test_target_file_template = 'datasets/test/{prefix}less_than_{min}_{max}{suffix}.jsonl'
@@ -76,28 +78,28 @@ Based on the input, determine it is an input or an output, and adapt it to the f
 """
 
 def seq_2_samples(seq, args):
-    samples = []
+    # only the steps kept are read, a lazy `seq` renders nothing else
     if args.init: # only the first state needed
         input = seq[0][0] + '\n' + seq[0][1] + '\n'
         output = seq[-1][0] + '\n' + seq[-1][1] + '\n'
-        samples.append((input, output))
-        return samples
-    for i in range(len(seq) - 1):
+        return [(input, output)]
+    def sample(i):
         input = '' if args.no_prompt else LESS_THAN_PROMPT
         input += seq[i][0] + '\n' + seq[i][1] + '\n'
         output = seq[i + 1][0] + '\n' + seq[i + 1][1] + '\n'
-        samples.append((input, output))
-    if len(samples) <= 5:
-        return samples
+        return (input, output)
+    num_samples = len(seq) - 1
+    if num_samples <= 5:
+        return [sample(i) for i in range(num_samples)]
     else:
-        trancated_samples = [samples[0], samples[-1], samples[-2]]
+        trancated_samples = [sample(0), sample(num_samples - 1), sample(num_samples - 2)]
         for i in range(1, 5):
-            trancated_samples.append(samples[random.randint(1, len(samples) - 3)])
+            trancated_samples.append(sample(random.randint(1, num_samples - 3)))
         return trancated_samples
 
 def write_json_samples(samples, target_file):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'w')
     target.write('[\n')
     cnt = 0
@@ -113,7 +115,7 @@ def write_json_samples(samples, target_file):
 
 def write_jsonl_samples(samples, target_file):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'w')
     for sample in samples:
         prompt, response = sample
@@ -129,8 +131,8 @@ def generate_sample(generator, aligner, a_n_digits, b_n_digits, option, args):
         raw_input = f'{op1}<{op2}='
         raw_output = raw_input + str(op1 < op2)
         input = aligner.input_to_tm(raw_input)
-        seq = generator.generate_with_op(op1, op2)
-        output = seq[-1][0] + '\n' + seq[-1][1] + '\n'
+        _, output = generator.initial_and_halt(op1, op2)
+        output += '\n'
         if not args.no_prompt:
             raw_input = ALIGNMENT_PROMPT + raw_input
             output = ALIGNMENT_PROMPT + output
@@ -141,8 +143,9 @@ def generate_sample(generator, aligner, a_n_digits, b_n_digits, option, args):
     else:
         raise NotImplementedError
 
-def generate_train(args):
-    generator = LessThanSeqGenerator()
+def train_samples(args):
+    # the samples of the training set, in the order they are generated
+    generator = LessThanSeqGenerator(lazy=True)
     porportioner = Proportioner(
         minimal=args.min,
         maximal=args.max,
@@ -150,17 +153,23 @@ def generate_train(args):
         task='less_than',
         option='balance'
     )
-    samples = []
     aligner = TMAligner()
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min, args.max + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
             for i in range(num):
                 option = None
                 if a_n_digits == b_n_digits and i % 2 == 0:
                     option = 'equal'
                 sample = generate_sample(generator, aligner, a_n_digits, b_n_digits, option, args)
-                samples.extend(sample)
+                yield from sample
+
+def generate_train(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
     if args.setting == 'execute':
         prefix = 'execute_'
         suffix = '_no_prompt' if args.no_prompt else ''
@@ -185,7 +194,7 @@ def raw_to_tm():
     n_digits = [5, 10, 50 ,100]
     pattern = r'(\d+)<(\d+)='
     aligner = TMAligner()
-    generator = LessThanSeqGenerator()
+    generator = LessThanSeqGenerator(lazy=True)
     for n_digit in n_digits:
         raw_f = raw_test_target_file_template.format(min=n_digit, max=n_digit)
         executor_samples = []
@@ -201,8 +210,8 @@ def raw_to_tm():
                     op1, op2 = int(op1), int(op2)
                     tm_input = aligner.input_to_tm(raw_input)
                     raw_output = raw_input + str(op1 < op2)
-                    seq = generator.generate_with_op(op1, op2)
-                    tm_output = seq[-1][0] + '\n' + seq[-1][1] + '\n'
+                    _, tm_output = generator.initial_and_halt(op1, op2)
+                    tm_output += '\n'
                     executor_samples.append((tm_input, tm_output))
                     aligner_input_samples.append((raw_input, tm_input))
                     aligner_output_samples.append((tm_output, raw_output))
@@ -212,12 +221,9 @@ def raw_to_tm():
         write_jsonl_samples(aligner_input_samples, test_target_file_template.format(min=n_digit, max=n_digit, prefix='execute_', suffix='_aligner_input'))
         write_jsonl_samples(aligner_output_samples, test_target_file_template.format(min=n_digit, max=n_digit, prefix='execute_', suffix='_aligner_output'))
 
-def generate_test(args):
-    if args.setting == 'separate':
-        raw_to_tm()
-        return
-    
-    generator = LessThanSeqGenerator()
+def test_samples(args):
+    # the samples of the test set, in the order they are generated
+    generator = LessThanSeqGenerator(lazy=True)
     porportioner = Proportioner(
         minimal=args.min,
         maximal=args.max,
@@ -225,17 +231,26 @@ def generate_test(args):
         task='less_than',
         option='balance'
     )
-    samples = []
     aligner = TMAligner()
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min, args.max + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
             for i in range(num):
                 option = None
                 if a_n_digits == b_n_digits and i % 2 == 0:
                     option = 'equal'
                 sample = generate_sample(generator, aligner, a_n_digits, b_n_digits, option, args)
-                samples.extend(sample)
+                yield from sample
+
+def generate_test(args):
+    if args.setting == 'separate':
+        raw_to_tm()
+        return
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(test_samples, args))
 
     if args.setting == 'execute':
         prefix = 'execute_'
@@ -0,0 +1,264 @@
+import json
+import random
+import re
+import os
+
+from data.generator import LongMulSeqGenerator
+from data.proportion import Proportioner
+from turing_machine.alignment.aligner import TMAligner
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
+
+train_target_file_template = 'datasets/train/{prefix}long_mul{suffix}.json'
+test_target_file_template = 'datasets/test/{prefix}long_mul_{min}_{max}{suffix}.jsonl'
+raw_train_target_file = 'datasets/raw/long_mul/train.jsonl'
+raw_test_target_file_template = 'datasets/raw/long_mul/test_{min}_{max}.jsonl'
+
+LONG_MULTIPLICATION_PROMPT = """The following is a input to be executed of a Turing Machine that performs long multiplication.
+
+To solve a multiplication problem by the machine, the machine is required to provide the initial state and command for other machines, including multiplication and addition machines. 
+
+For example, for 4513 * 203 = 916139, the machine will perform the following algorithm on the digits of 203 from right to left:
+- step 1: sum = 0
+- step 2: read the digit 3, call multiplication, product = 4513 * 3 = 13539
+- step 3: call addition, sum = sum + 13539 = 13539
+- step 4: read the digit 0, skip it
+- step 5: read the digit 2, call multiplication, product = 4513 * 2 = 9026
+- step 6: call addition, sum = sum + 902600 = 916139, the product is shifted by the position of the digit
+- step 7: all digits are read, current machine halts
+
+The input includes at least two lines and may have two more lines.
+- The first line is the current state of the machine.
+- The second line is the command to be executed.
+When there are two more lines:
+- The third line and the fourth line are halt state of another machine which is called by the long multiplication machine at previous step.
+
+For the current state (the first line): 
+- There are four states in the machine: q0, q1, q2 and qH. The machine starts in state q0 and halts when it reaches state qH. q1 and q2 are used to perform the loop structure.
+- The head positions are represented by [HEAD1] and [HEAD2], which followed by two operands. 
+- The partial product is followed by [PRODUCT] and the sum is followed by [OUTPUT].
+
+The command (the second line) includes a series of actions to be executed by the machine and they are separated by commas.
+- [OUTPUT] <number>: Write the number to the output position.
+- [HEAD2] <direction>: Move the head on the second operand to the direction.
+- [CALL] <operation>: Call another machine to perform the operation.
+- <state>: Move the machine to the state.
+
+When the commands include [CALL], another extra two lines are needed to specify the initial state and the first command of the machine to be called.
+As for initial state, it should include the operation, q0 state, operands and the head positions.
+As for the first command:
+- [OUTPUT] <number>: Write the number to the output position.
+- [COUNT] <number>: Write the number to the count register.
+- [HEAD1] <direction>: Move the head on the first operand to the direction.
+- [HEAD2] <direction>: Move the head on the second operand to the direction.
+- <state>: Move the machine to the state.
+
+The machine performs long multiplication by reading the digits from the second operand and calling other machines to complete the multiplication operation. 
+
+Based on the current input, predict the output which includes next state, next command and the initial state and the first command of the machine to be called.
+
+"""
+
+ALIGNMENT_PROMPT = """The following is an input to a Turing Machine or an output of a Turing Machine. 
+
+The task is doing an alignment:
+- If it is an input, adapt the original input to the format that the Turing Machine can understand.
+- If it is an output, adapt the original output to the format that represents the final result.
+
+Input example:
+```
+- input: 
+4513*203=
+- output:
+LONG_MUL, q0, [HEAD1]|3|1|5|4 [HEAD2]|3|0|2 [PRODUCT] [OUTPUT]
+CMD [OUTPUT] 0, q1
+```
+
+Output example:
+```
+- input:
+LONG_MUL, qH, [HEAD1]|3|1|5|4 |3|0|2[HEAD2] [PRODUCT] |9|3|1|6|1|9
+No command to execute. Halt state.
+- output:
+4513*203=916139
+```
+
+There are two lines that represent the Turing Machine:
+- The first line is the current state of the machine.
+- The second line is the command to be executed.
+And this format is fit to both input and output as the examples shown above.
+
+For the current state (the first line): 
+- There are at least 2 states in the machine: q0 and qH. The machine starts in state q0 and halts when it reaches state qH.
+- The head positions are represented by [HEAD1] and [HEAD2], which followed by two operands. 
+
+The command (the second line) includes a series of actions to be executed by the machine and they are separated by commas.
+- [OUTPUT] <number>: Write the number to the output position.
+- <state>: Move the machine to the state.
+
+Based on the input, determine it is an input or an output, and adapt it to the format correspondingly.
+
+"""
+
+def seq_2_samples(seq, args):
+    # only the steps kept are read, a lazy `seq` renders nothing else
+    def sample(i):
+        input = '' if args.no_prompt else LONG_MULTIPLICATION_PROMPT
+        input += seq[i][0]
+        output = seq[i][1]
+        return (input, output)
+    num_samples = len(seq)
+    if args.init:
+        input = sample(0)[0]
+        output = sample(num_samples - 1)[1]
+        return [(input, output)]
+    # the number of steps grows with the digits of operand2, keep all of them
+    return [sample(i) for i in range(num_samples)]
+
+def write_json_samples(samples, target_file, append=False):
+    os.makedirs(os.path.dirname(target_file), exist_ok=True)
+    samples = shuffled(samples)
+    target = open(target_file, 'a') if append else open(target_file, 'w')
+    target.write('[\n')
+    cnt = 0
+    for sample in samples:
+        if cnt != 0:
+            target.write(",\n")
+        cnt += 1
+        prompt, response = sample
+        json.dump({"instruction": prompt, "input": "", "output": response}, target, ensure_ascii=False, indent=4)
+
+    target.write('\n]\n')
+    target.close()
+
+def write_jsonl_samples(samples, target_file, append=False):
+    os.makedirs(os.path.dirname(target_file), exist_ok=True)
+    samples = shuffled(samples)
+    target = open(target_file, 'a') if append else open(target_file, 'w')
+    for sample in samples:
+        prompt, response = sample
+        target.write(json.dumps({"prompt": prompt, "response": response}) + '\n')
+    target.close()
+
+def generate_sample(generator, aligner, a_n_digits, b_n_digits, args):
+    if args.setting == 'execute':
+        seq = generator.generate(a_n_digits, b_n_digits)
+        return seq_2_samples(seq, args)
+    elif args.setting == 'alignment':
+        op1, op2 = generator.generate_ops(a_n_digits, b_n_digits)
+        raw_input = f'{op1}*{op2}='
+        raw_output = raw_input + str(op1 * op2)
+        input = aligner.input_to_tm(raw_input, 'long_mul')
+        _, output = generator.initial_and_halt(op1, op2)
+        if not args.no_prompt:
+            raw_input = ALIGNMENT_PROMPT + raw_input
+            output = ALIGNMENT_PROMPT + output
+        return [(raw_input, input), (output, raw_output)]
+    elif args.setting == 'raw':
+        input, output = generator.generate_raw(a_n_digits, b_n_digits)
+        return [(input, output)]
+    else:
+        raise NotImplementedError
+
+def get_prefix_suffix(args):
+    if args.setting == 'execute':
+        prefix = 'execute_'
+        suffix = '_no_prompt' if args.no_prompt else ''
+    elif args.setting == 'alignment':
+        prefix = ''
+        suffix = '_alignment'
+        suffix += '_no_prompt' if args.no_prompt else ''
+    elif args.setting == 'raw':
+        prefix = suffix = ''
+    else:
+        raise NotImplementedError
+    return prefix, suffix
+
+def train_samples(args):
+    # the samples of the set, in the order they are generated
+    generator = LongMulSeqGenerator(lazy=True)
+    porportioner = Proportioner(
+        minimal=args.min,
+        maximal=args.max,
+        num=args.num,
+        task='long_mul',
+        option='balance'
+    )
+    aligner = TMAligner()
+    cells = cell_rng(args)
+    for a_n_digits in range(args.min, args.max + 1):
+        for b_n_digits in range(args.min, args.max + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
+            num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
+            for _ in range(num):
+                sample = generate_sample(generator, aligner, a_n_digits, b_n_digits, args)
+                if sample:
+                    yield from sample
+
+def generate_samples(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
+    return samples
+
+def generate_train(args):
+    samples = generate_samples(args)
+    prefix, suffix = get_prefix_suffix(args)
+    if args.setting == 'raw':
+        train_target_file = raw_train_target_file
+        write_jsonl_samples(samples, train_target_file)
+    else:
+        train_target_file = train_target_file_template.format(prefix=prefix, suffix=suffix)
+        write_json_samples(samples, train_target_file)
+
+def raw_to_tm():
+    executor_samples = []
+    aligner_input_samples = []
+    aligner_output_samples = []
+    pattern = r'(\d+)\*(\d+)='
+    aligner = TMAligner()
+    generator = LongMulSeqGenerator(lazy=True)
+    min_n_digit = 1
+    max_n_digit = 10
+    raw_f = raw_test_target_file_template.format(min=min_n_digit, max=max_n_digit)
+    with open(raw_f, 'r') as f:
+        for line in f:
+            sample = json.loads(line)
+            raw_input = sample['prompt']
+            match = re.search(pattern, raw_input)
+            if match:
+                op1, op2 = match.groups()
+                op1, op2 = int(op1), int(op2)
+                tm_input = aligner.input_to_tm(raw_input, 'long_mul')
+                raw_output = raw_input + str(op1 * op2)
+                _, tm_output = generator.initial_and_halt(op1, op2)
+                executor_samples.append((tm_input, tm_output))
+                aligner_input_samples.append((raw_input, tm_input))
+                aligner_output_samples.append((tm_output, raw_output))
+            else:
+                raise ValueError(f'Invalid input: {raw_input}')
+    write_jsonl_samples(executor_samples, test_target_file_template.format(min=min_n_digit, max=max_n_digit, prefix='execute_', suffix='_executor'))
+    write_jsonl_samples(aligner_input_samples, test_target_file_template.format(min=min_n_digit, max=max_n_digit, prefix='execute_', suffix='_aligner_input'))
+    write_jsonl_samples(aligner_output_samples, test_target_file_template.format(min=min_n_digit, max=max_n_digit, prefix='execute_', suffix='_aligner_output'))
+
+def generate_test(args):
+    if args.setting == 'separate':
+        raw_to_tm()
+        return
+
+    samples = generate_samples(args)
+    prefix, suffix = get_prefix_suffix(args)
+    if args.setting == 'raw':
+        test_target_file = raw_test_target_file_template.format(min=args.min, max=args.max)
+    else:
+        test_target_file = test_target_file_template.format(
+            min=args.min, max=args.max, prefix=prefix, suffix=suffix)
+    write_jsonl_samples(samples, test_target_file)
+
+def generate(args):
+    if args.split == 'train':
+        random.seed(42)
+        generate_train(args)
+    elif args.split == 'test':
+        random.seed(43)
+        generate_test(args)
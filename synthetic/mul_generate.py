@@ -6,6 +6,8 @@ import os
 from data.generator import MulSeqGenerator
 from data.proportion import Proportioner
 from turing_machine.alignment.aligner import TMAligner
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
 
 train_target_file_template = 'datasets/train/{prefix}mul{suffix}.json'
 test_target_file_template = 'datasets/test/{prefix}mul_{min}_{max}{suffix}.jsonl'
@@ -98,27 +100,28 @@ Based on the input, determine it is an input or an output, and adapt it to the f
 """
 
 def seq_2_samples(seq, args):
-    samples = []
-    for i in range(len(seq)):
+    # only the steps kept are read, a lazy `seq` renders nothing else
+    def sample(i):
         input = '' if args.no_prompt else MULTIPLICATION_PROMPT
         input += seq[i][0]
         output = seq[i][1]
-        samples.append((input, output))
+        return (input, output)
+    num_samples = len(seq)
     if args.init:
-        input = samples[0][0]
-        output = samples[-1][1]
+        input = sample(0)[0]
+        output = sample(num_samples - 1)[1]
         return [(input, output)]
-    if len(samples) <= 10:
-        return samples
+    if num_samples <= 10:
+        return [sample(i) for i in range(num_samples)]
     else:
-        trancated_samples = [samples[0], samples[-1]]
+        trancated_samples = [sample(0), sample(num_samples - 1)]
         for i in range(1, 4):
-            trancated_samples.append(samples[random.randint(1, len(samples) - 2)])
+            trancated_samples.append(sample(random.randint(1, num_samples - 2)))
         return trancated_samples
 
 def write_json_samples(samples, target_file, append=False):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'a') if append else open(target_file, 'w')
     target.write('[\n')
     cnt = 0
@@ -134,7 +137,7 @@ def write_json_samples(samples, target_file, append=False):
 
 def write_jsonl_samples(samples, target_file, append=False):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'a') if append else open(target_file, 'w')
     for sample in samples:
         prompt, response = sample
@@ -150,8 +153,7 @@ def generate_sample_train(generator, aligner, a_n_digits, b_n_digits, args):
         raw_input = f'{op1}*{op2}='
         raw_output = raw_input + str(op1 * op2)
         input = aligner.input_to_tm(raw_input)
-        seq = generator.generate_with_op(op1, op2, only_input_output=True)
-        output = seq[-1]
+        _, output = generator.initial_and_halt(op1, op2)
         if not args.no_prompt:
             raw_input = ALIGNMENT_PROMPT + raw_input
             output = ALIGNMENT_PROMPT + output
@@ -162,8 +164,9 @@ def generate_sample_train(generator, aligner, a_n_digits, b_n_digits, args):
     else:
         raise NotImplementedError
 
-def generate_train(args):
-    generator = MulSeqGenerator()
+def train_samples(args):
+    # the samples of the training set, in the order they are generated
+    generator = MulSeqGenerator(lazy=True)
     porportioner = Proportioner(
         minimal=args.min,
         maximal=args.max,
@@ -171,15 +174,21 @@ def generate_train(args):
         task='mul',
         option='balance'
     )
-    samples = []
     aligner = TMAligner()
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min,  args.max + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
             for _ in range(num):
                 sample = generate_sample_train(generator, aligner, a_n_digits, b_n_digits, args)
                 if sample:
-                    samples.extend(sample)
+                    yield from sample
+
+def generate_train(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
 
     if args.setting == 'execute':
         prefix = 'execute_'
@@ -209,8 +218,7 @@ def generate_sample_test(generator, aligner, a_n_digits, b_n_digits, args):
         raw_input = f'{op1}*{op2}='
         raw_output = raw_input + str(op1 * op2)
         input = aligner.input_to_tm(raw_input)
-        seq = generator.generate_with_op(op1, op2)
-        output = seq[-1][1]
+        _, output = generator.initial_and_halt(op1, op2)
         if not args.no_prompt:
             raw_input = ALIGNMENT_PROMPT + raw_input
             output = ALIGNMENT_PROMPT + output
@@ -227,7 +235,7 @@ def raw_to_tm():
     aligner_output_samples = []
     pattern = r'(\d+)\*(\d+)='
     aligner = TMAligner()
-    generator = MulSeqGenerator()
+    generator = MulSeqGenerator(lazy=True)
     min_n_digit = 1
     max_n_digit = 10
     raw_f = raw_test_target_file_template.format(min=min_n_digit, max=max_n_digit)
@@ -241,8 +249,7 @@ def raw_to_tm():
                 op1, op2 = int(op1), int(op2)
                 tm_input = aligner.input_to_tm(raw_input)
                 raw_output = raw_input + str(op1 * op2)
-                seq = generator.generate_with_op(op1, op2, only_input_output=True)
-                tm_output  = seq[-1]
+                _, tm_output = generator.initial_and_halt(op1, op2)
                 executor_samples.append((tm_input, tm_output))
                 aligner_input_samples.append((raw_input, tm_input))
                 aligner_output_samples.append((tm_output, raw_output))
@@ -252,12 +259,9 @@ def raw_to_tm():
     write_jsonl_samples(aligner_input_samples, test_target_file_template.format(min=min_n_digit, max=max_n_digit, prefix='execute_', suffix='_aligner_input'))
     write_jsonl_samples(aligner_output_samples, test_target_file_template.format(min=min_n_digit, max=max_n_digit, prefix='execute_', suffix='_aligner_output'))
 
-def generate_test(args):
-    if args.setting == 'separate':
-        raw_to_tm()
-        return
-    
-    generator = MulSeqGenerator()
+def test_samples(args):
+    # the samples of the test set, in the order they are generated
+    generator = MulSeqGenerator(lazy=True)
     porportioner = Proportioner(
         minimal=args.min,
         maximal=args.max,
@@ -265,23 +269,34 @@ def generate_test(args):
         task='mul',
         option='balance'
     )
-    samples = []
     aligner = TMAligner()
 
+    cells = cell_rng(args)
     if args.setting == 'raw':
         for a_n_digits in range(args.min, args.max + 1):
+            if not cells.enter(generator, a_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=1)
             for i in range(num):
                 pair = generator.generate_raw_with_fixed_op2(a_n_digits)
-                samples.append(pair)
+                yield pair
     else:
         for a_n_digits in range(args.min, args.max + 1):
             for b_n_digits in range(args.min, args.max + 1):
+                if not cells.enter(generator, a_n_digits, b_n_digits):
+                    continue
                 num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
                 for _ in range(num):
                     sample = generate_sample_test(generator, aligner, a_n_digits, b_n_digits, args)
                     if sample:
-                        samples.extend(sample)
+                        yield from sample
+
+def generate_test(args):
+    if args.setting == 'separate':
+        raw_to_tm()
+        return
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(test_samples, args))
 
     if args.setting == 'execute':
         prefix = 'execute_'
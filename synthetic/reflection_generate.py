@@ -3,6 +3,8 @@ import random
 import os
 
 from data.generator import ReflectionSeqGenerator
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
 
 
 train_target_file_template = 'datasets/train/tm_reflection{suffix}.json'
@@ -29,32 +31,33 @@ Based on the current state and the command, predict the next state of the machin
 """
 
 def seq_2_samples(seq, args):
-    samples = []
-    for i in range(len(seq) - 1):
+    # only the steps kept are read, a lazy `seq` renders nothing else
+    def sample(i):
         input = '' if args.no_prompt else REFLECTION_PROMPT
         input += seq[i][0] + '\n' + seq[i][1] + '\n'
         output = seq[i + 1][0] + '\n' + seq[i + 1][1] + '\n'
-        samples.append((input, output))
-    if len(samples) <= 10:
-        return samples
+        return (input, output)
+    num_samples = len(seq) - 1
+    if num_samples <= 10:
+        return [sample(i) for i in range(num_samples)]
     else:
-        trancated_samples = [samples[0], samples[-1]]
-        for i in range(len(samples)):
-            if 'CMD q2' in samples[i][1]:
+        trancated_samples = [sample(0), sample(num_samples - 1)]
+        for i in range(num_samples):
+            if 'CMD q2' in sample(i)[1]:
                 idx = i
                 break
-        trancated_samples.append(samples[idx]) # q1 -> q2
-        trancated_samples.append(samples[idx + 1]) # q2 -> q2/qH
+        trancated_samples.append(sample(idx)) # q1 -> q2
+        trancated_samples.append(sample(idx + 1)) # q2 -> q2/qH
         for i in range(1, 5):
-            trancated_samples.append(samples[random.randint(1, idx - 1)])
-        if idx + 2 != len(samples) - 1:
+            trancated_samples.append(sample(random.randint(1, idx - 1)))
+        if idx + 2 != num_samples - 1:
             for _ in range(1, 4):
-                trancated_samples.append(samples[random.randint(idx + 2, len(samples) - 2)])
+                trancated_samples.append(sample(random.randint(idx + 2, num_samples - 2)))
         return trancated_samples
 
 def write_json_samples(samples, target_file):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'w')
     target.write('[\n')
     cnt = 0
@@ -70,36 +73,51 @@ def write_json_samples(samples, target_file):
 
 def write_jsonl_samples(samples, target_file):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'w')
     for sample in samples:
         prompt, response = sample
         target.write(json.dumps({"prompt": prompt, "response": response}) + '\n')
     target.close()
 
-def generate_train(args):
-    generator = ReflectionSeqGenerator()
-    samples = []
+def train_samples(args):
+    # the samples of the training set, in the order they are generated
+    generator = ReflectionSeqGenerator(lazy=True)
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min, a_n_digits + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = args.num * 2 if a_n_digits == b_n_digits else args.num
             for i in range(num):
                 seq = generator.generate(a_n_digits, b_n_digits)
-                samples.extend(seq_2_samples(seq, args))
+                yield from seq_2_samples(seq, args)
                 if a_n_digits == b_n_digits and i % 2 == 0:
                     seq = generator.generate_leading_zero(a_n_digits, b_n_digits)
-                    samples.extend(seq_2_samples(seq, args))
+                    yield from seq_2_samples(seq, args)
+
+def generate_train(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
     train_target_file = train_target_file_template.format(suffix='_no_prompt' if args.no_prompt else '')
     write_json_samples(samples, train_target_file)
 
-def generate_test(args):
-    generator = ReflectionSeqGenerator()
-    samples = []
+def test_samples(args):
+    # the samples of the test set, in the order they are generated
+    generator = ReflectionSeqGenerator(lazy=True)
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min, a_n_digits + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             for _ in range(args.num):
                 seq = generator.generate(a_n_digits, b_n_digits)
-                samples.extend(seq_2_samples(seq, args))
+                yield from seq_2_samples(seq, args)
+
+def generate_test(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(test_samples, args))
+
     test_target_file = test_target_file_template.format(
         min=args.min, max=args.max, suffix='_no_prompt' if args.no_prompt else '')
     write_jsonl_samples(samples, test_target_file)
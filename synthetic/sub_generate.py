@@ -6,6 +6,8 @@ import os
 from data.generator import SubSeqGenerator
 from data.proportion import Proportioner
 from turing_machine.alignment.aligner import TMAligner
+from data.writer import sample_buffer, shuffled
+from data.rng import cell_rng, generate_cells
 
 train_target_file_template = 'datasets/train/{prefix}sub{suffix}.json'
 test_target_file_template = 'datasets/test/{prefix}sub_{min}_{max}{suffix}.jsonl'
@@ -97,19 +99,20 @@ Based on the input, determine it is an input or an output, and adapt it to the f
 """
 
 def seq_2_samples(seq, args):
-    samples = []
-    for i in range(len(seq)):
+    # only the steps kept are read, a lazy `seq` renders nothing else
+    def sample(i):
         input = '' if args.no_prompt else SUBTRACTION_PROMPT
         input += seq[i][0]
         output = seq[i][1]
-        samples.append((input, output))
-        if args.init: # only the first state needed
-            break
-    return samples
+        return (input, output)
+    num_samples = len(seq)
+    if args.init: # only the first state needed
+        return [sample(0)]
+    return [sample(i) for i in range(num_samples)]
 
 def write_json_samples(samples, target_file, append=False):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'a') if append else open(target_file, 'w')
     target.write('[\n')
     cnt = 0
@@ -125,7 +128,7 @@ def write_json_samples(samples, target_file, append=False):
 
 def write_jsonl_samples(samples, target_file, append=False):
     os.makedirs(os.path.dirname(target_file), exist_ok=True)
-    random.shuffle(samples)
+    samples = shuffled(samples)
     target = open(target_file, 'a') if append else open(target_file, 'w')
     for sample in samples:
         prompt, response = sample
@@ -141,8 +144,7 @@ def generate_sample(generator, aligner, a_n_digits, b_n_digits, args):
         raw_input = f'{op1}-{op2}='
         raw_output = raw_input + str(op1 - op2)
         input = aligner.input_to_tm(raw_input)
-        seq = generator.generate_with_op(op1, op2)
-        output = seq[-1][1]
+        _, output = generator.initial_and_halt(op1, op2)
         if not args.no_prompt:
             raw_input = ALIGNMENT_PROMPT + raw_input
             output = ALIGNMENT_PROMPT + output
@@ -153,9 +155,9 @@ def generate_sample(generator, aligner, a_n_digits, b_n_digits, args):
     else:
         raise NotImplementedError
 
-def generate_train(args):
-    generator = SubSeqGenerator()
-    samples = []
+def train_samples(args):
+    # the samples of the training set, in the order they are generated
+    generator = SubSeqGenerator(lazy=True)
     porportioner = Proportioner(
         minimal=args.min,
         maximal=args.max,
@@ -164,12 +166,19 @@ def generate_train(args):
         option='balance'
     )
     aligner = TMAligner()
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min, a_n_digits + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
             for _ in range(num):
                 sample = generate_sample(generator, aligner, a_n_digits, b_n_digits, args)
-                samples.extend(sample)
+                yield from sample
+
+def generate_train(args):
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(train_samples, args))
 
     if args.setting == 'execute':
         prefix = 'execute_'
@@ -194,7 +203,7 @@ def raw_to_tm():
     n_digits = [5]
     pattern = r'(\d+)\-(\d+)='
     aligner = TMAligner()
-    generator = SubSeqGenerator()
+    generator = SubSeqGenerator(lazy=True)
     for n_digit in n_digits:
         raw_f = raw_test_target_file_template.format(min=n_digit, max=n_digit)
         executor_samples = []
@@ -210,8 +219,7 @@ def raw_to_tm():
                     op1, op2 = int(op1), int(op2)
                     tm_input = aligner.input_to_tm(raw_input)
                     raw_output = raw_input + str(op1 - op2)
-                    seq = generator.generate_with_op(op1, op2)
-                    tm_output = seq[-1][1]
+                    _, tm_output = generator.initial_and_halt(op1, op2)
                     executor_samples.append((tm_input, tm_output))
                     aligner_input_samples.append((raw_input, tm_input))
                     aligner_output_samples.append((tm_output, raw_output))
@@ -221,12 +229,9 @@ def raw_to_tm():
         write_jsonl_samples(aligner_input_samples, test_target_file_template.format(min=n_digit, max=n_digit, prefix='execute_', suffix='_aligner_input'))
         write_jsonl_samples(aligner_output_samples, test_target_file_template.format(min=n_digit, max=n_digit, prefix='execute_', suffix='_aligner_output'))
 
-def generate_test(args):
-    if args.setting == 'separate':
-        raw_to_tm()
-        return
-    
-    generator = SubSeqGenerator()
+def test_samples(args):
+    # the samples of the test set, in the order they are generated
+    generator = SubSeqGenerator(lazy=True)
     porportioner = Proportioner(
         minimal=args.min,
         maximal=args.max,
@@ -234,15 +239,23 @@ def generate_test(args):
         task='sub',
         option='balance'
     )
-    samples = []
     aligner = TMAligner()
+    cells = cell_rng(args)
     for a_n_digits in range(args.min, args.max + 1):
         for b_n_digits in range(args.min, a_n_digits + 1):
+            if not cells.enter(generator, a_n_digits, b_n_digits):
+                continue
             num = porportioner.get_num(a_n_digits=a_n_digits, b_n_digits=b_n_digits)
             for _ in range(num):
                 sample = generate_sample(generator, aligner, a_n_digits, b_n_digits, args)
-                samples.extend(sample)
+                yield from sample
 
+def generate_test(args):
+    if args.setting == 'separate':
+        raw_to_tm()
+        return
+    samples = sample_buffer(args)
+    samples.extend(generate_cells(test_samples, args))
 
     if args.setting == 'execute':
         prefix = 'execute_'
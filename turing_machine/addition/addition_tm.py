@@ -2,6 +2,7 @@ import re
 
 from .state import TMStateGenerator
 from .command import TMCommandGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
@@ -43,7 +44,7 @@ Standard Pattern:
 
 """
 
-class AdditionTM():
+class AdditionTM(TransitionSteps):
     def __init__(self, op1, op2):
         assert op1 >= 0 and op2 >= 0, "Both operands must be non-negative integers."
         self.state_generator = TMStateGenerator()
@@ -153,6 +154,25 @@ class AdditionTM():
         seq.append((self.get_state(), self.get_cmd()))
         return seq
 
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this AdditionTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        n_digits = max(len(self.op1), len(self.op2))
+        result = int(self.op1[::-1]) + int(self.op2[::-1])
+        self.head1_pos = self.head2_pos = n_digits
+        self.carry_out = str(result // 10 ** n_digits)
+        # every position is written, the final carry only if it is not 0
+        self.output = str(result % 10 ** n_digits).zfill(n_digits)[::-1]
+        if result >= 10 ** n_digits:
+            self.output += '1'
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
     def self_check(self):
         if self.current_state != QH:
             print('❌ Self check failed. Turing machine is not in halt state.')
@@ -193,7 +213,13 @@ class AdditionTMChecker():
             return
         self.tm.one_step()
 
+    def expected_output(self):
+        return self.tm.get_state() + '\n' + self.tm.get_cmd()
+
     def check(self, model_output):
         splits = model_output.strip().split('\n')
-        state, cmd = splits[0], splits[1]
-        return self.tm.get_state() == state and self.tm.get_cmd() == cmd
+        try:
+            state, cmd = splits[0], splits[1]
+            return self.tm.get_state() == state and self.tm.get_cmd() == cmd
+        except:
+            return False
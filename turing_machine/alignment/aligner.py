@@ -1,6 +1,8 @@
 import re
 
 from .templates import templates
+from .cost import should_swap, COMMUTATIVE_TASKS
+from registry import legal_tasks
 
 Q0 = 'q0'
 Q1 = 'q1'
@@ -10,7 +12,7 @@ QH = 'qH'
 
 class TMAligner:
     def __init__(self):
-        self.legal_tasks = ['add', 'reflection', 'left_mask', 'sub', 'equal', 'greater_than', 'less_than', 'mul', 'div']
+        self.legal_tasks = list(legal_tasks)
         self.legal_operators = ['+', '-', '*', '//', '>', '<', '==']
         self.op_2_task = {
             '+': 'add',
@@ -29,7 +31,12 @@ class TMAligner:
             'greater_than': '>',
             'less_than': '<',
             'equal': '==',
+            'long_mul': '*',
+            'long_div': '//',
+            'borrow_sub': '-',
         }
+        # tasks whose machines compute the same result for both operand orders
+        self.commutative_tasks = list(COMMUTATIVE_TASKS)
         self.op1 = None
         self.op2 = None
         self.operator = None
@@ -42,8 +49,11 @@ class TMAligner:
             h1_token = '[HEAD1]',
             h2_token = '[HEAD2]',
             c_token = '[C]',
+            b_token = '[B]',
             output_token = '[OUTPUT]',
             count_token = '[COUNT]',
+            product_token = '[PRODUCT]',
+            remainder_token = '[REMAINDER]',
             # command
             q1_token = Q1,
             cmd_token = 'CMD',
@@ -54,18 +64,30 @@ class TMAligner:
             false_token = 'False',
         )
 
-    def input_to_tm(self, input):
+    def _match_expression(self, input):
         ops_pattern = '|'.join(re.escape(op) for op in self.legal_operators)
         pattern = rf'(\d+)\s*({ops_pattern})\s*(\d+)\s*='
         match = re.match(pattern, input)
         if not match:
             raise ValueError(f'Invalid input: {input}')
+        return match
+
+    def input_to_tm(self, input, task=None, reorder=False):
+        # `task` selects the machine when several machines share an operator, e.g. mul and long_mul
+        # `reorder` swaps the operands of a commutative machine when the swapped order runs fewer steps
+        match = self._match_expression(input)
         try:
             op1, operator, op2 = match.groups()
         except:
             raise ValueError('Invalid input')
         
         operator_name = self.op_2_task[operator]
+        if task and task in self.task_2_op:
+            if self.task_2_op[task] != operator:
+                raise ValueError(f'Invalid operator for task {task}: {operator}')
+            operator_name = task
+        if reorder and operator_name in self.commutative_tasks and should_swap(operator_name, op1, op2):
+            op1, op2 = op2, op1
         template = templates[operator_name]
         q0_state_template = template['q0_state_template']
         q0_cmd_template = template['q0_cmd_template']
@@ -79,7 +101,7 @@ class TMAligner:
 
         token_dict = self.token_dict
         token_dict.update(
-            operator = self.op_2_task[operator].upper(),
+            operator = operator_name.upper(),
             op1 = op1,
             op2 = op2,
             count = 0 if operator == '//' else 1,
@@ -100,6 +122,16 @@ class TMAligner:
 
         return q0_state + '\n' + q0_cmd + '\n'
 
+    def restore_expression(self, input, output):
+        # The executor may run a reordered expression, keep its result
+        # but write the expression back as the user gave it.
+        output = output.strip()
+        idx = output.rfind('=')
+        if idx == -1:
+            return output
+        match = self._match_expression(input)
+        return match.group(0) + output[idx+1:]
+
     def tm_to_output(self, output, op1, op2, operator):
         # This function only translate output to text expression,
         # but not check whether the expression is correct.
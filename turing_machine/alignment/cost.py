@@ -0,0 +1,238 @@
+import re
+import argparse
+import itertools
+
+r""" Step cost estimation for the TM executor.
+
+The cost of an expression is the number of transitions the executor runs for it,
+the transitions of called machines included. Every transition is one generation
+step of the model, so the cost is what the executor pays for the expression.
+
+The estimates follow the loops of the machines:
+- ADD: one transition per digit of the longer operand, plus the initial and halt transitions.
+- REFLECTION, LEFT_MASK, BORROW_SUB: one transition per digit, plus the erased zeros.
+- LESS_THAN, GREATER_THAN: one transition per digit of the shorter operand.
+- EQUAL: one transition per matching digit, from the lowest one, it stops at the first different digit.
+- SUB: calls REFLECTION, ADD, ADD and LEFT_MASK once.
+- MUL: `op2` iterations of the 'while' loop, each iteration calls LESS_THAN, ADD and ADD.
+- DIV: `op1 // op2` iterations of the 'while' loop, each iteration calls GREATER_THAN, ADD and ADD.
+- LONG_MUL: one MUL and one ADD call per non-zero digit of `op2`.
+- LONG_DIV: per digit of `op1`, one GREATER_THAN call per quotient digit value plus one, and one SUB call per value,
+  on the remainder left by the previous SUB.
+
+They are exact, except for MUL and DIV (and LONG_MUL calling MUL), whose called machines are
+bounded by their last and longest calls: good enough to compare the two orders of an expression
+and to tell cheap expressions from expensive ones before they are executed.
+
+`executed_steps` counts the steps of the real machines, `python -m turing_machine.alignment.cost`
+checks the estimates against it over a grid of operands.
+"""
+
+EXPRESSION_PATTERN = r'(\d+)\s*(?:\+|-|\*|//|>|<|==)\s*(\d+)\s*='
+STATE_PATTERN = r'^[A-Z_]+, q\w+, (.*)$'
+# tasks whose machines compute the same result for both operand orders
+COMMUTATIVE_TASKS = ('add', 'mul', 'long_mul')
+
+def _n_digits(x):
+    return len(str(x))
+
+def add_steps(op1, op2):
+    return max(_n_digits(op1), _n_digits(op2)) + 2
+
+def reflection_steps(op1, op2):
+    # the leading zeros of the output are erased one by one, all of them if it is 0
+    n = _n_digits(op1)
+    output = op1 - op2
+    return 2 * n + 3 - (_n_digits(output) if output > 0 else 0)
+
+def left_mask_steps(op):
+    # the leading digit and the zeros following it are masked one by one
+    digits = str(op)
+    return len(digits) + 3 + len(digits[1:]) - len(digits[1:].lstrip('0'))
+
+def borrow_sub_steps(op1, op2):
+    # the leading zeros of the output are erased one by one
+    return 2 * _n_digits(op1) + 2 - _n_digits(max(op1 - op2, 0))
+
+def less_than_steps(op1, op2):
+    # the heads stop at the end of the shorter operand
+    return min(_n_digits(op1), _n_digits(op2)) + 2
+
+def greater_than_steps(op1, op2):
+    return less_than_steps(op1, op2)
+
+def equal_steps(op1, op2):
+    if op1 == op2:
+        return _n_digits(op1) + 2
+    # the digits are compared from the lowest one, up to the first difference
+    digits1, digits2 = str(op1)[::-1], str(op2)[::-1]
+    matched = 0
+    while matched < min(len(digits1), len(digits2)) and digits1[matched] == digits2[matched]:
+        matched += 1
+    return matched + 2
+
+def sub_steps(op1, op2):
+    n = _n_digits(op1)
+    # 99..9 - op2, op1 + reflection, + 1, then mask the carry and the leading zeros
+    reflection = 10 ** n - 1 - op2
+    total = op1 + reflection + 1
+    steps = 5
+    steps += reflection_steps(10 ** n - 1, op2)
+    steps += add_steps(op1, reflection) + add_steps(total - 1, 1)
+    steps += left_mask_steps(total)
+    return steps
+
+def mul_steps(op1, op2):
+    # q0, then `n` times q1, and `n - 1` times q2 and q3
+    n = max(op2, 1)
+    steps = 3 * n - 1
+    # LESS_THAN(cnt, op2) in q1, bounded by the comparison of equal lengths
+    steps += n * less_than_steps(op2, op2)
+    # ADD(op1, output) in q2 and ADD(cnt, 1) in q3, bounded by the final output and count
+    steps += (n - 1) * (add_steps(op1 * op2, op1) + add_steps(op2, 1))
+    return steps
+
+def div_steps(op1, op2):
+    # q0, then `q + 1` times q1, and `q` times q2 and q3
+    q = op1 // op2
+    steps = 3 * q + 2
+    # GREATER_THAN(cnt, op1) in q1, ADD(output, 1) in q2 and ADD(cnt, op2) in q3
+    steps += (q + 1) * greater_than_steps(op1, op1)
+    steps += q * (add_steps(q, 1) + add_steps(op1 + op2, op2))
+    return steps
+
+def long_mul_steps(op1, op2):
+    # q0 and the halt transition of q1
+    steps = 2
+    for i, d in enumerate(str(op2)[::-1]):
+        d = int(d)
+        if d == 0:
+            # q1 skips the digit
+            steps += 1
+            continue
+        # q1 calls MUL(op1, d), q2 calls ADD(output, product)
+        steps += 2 + mul_steps(op1, d) + add_steps(op1 * (op2 % 10 ** (i + 1)), op1 * d * 10 ** i)
+    return steps
+
+def long_div_steps(op1, op2):
+    # q0 and the halt transition of q1
+    steps = 2
+    r = 0
+    for d in str(op1):
+        r = r * 10 + int(d)
+        q = r // op2
+        # q1 brings down the digit, then `q + 1` times q2 and q3
+        steps += 1 + 2 * (q + 1)
+        # GREATER_THAN(op2, r) in q2, SUB(r, op2) in q3, on the remainder left by the previous SUB
+        for j in range(q + 1):
+            steps += greater_than_steps(op2, r - j * op2)
+        for j in range(q):
+            steps += sub_steps(r - j * op2, op2)
+        r = r % op2
+    return steps
+
+step_cost_mapping = dict(
+    add=add_steps,
+    reflection=reflection_steps,
+    left_mask=left_mask_steps,
+    sub=sub_steps,
+    equal=equal_steps,
+    greater_than=greater_than_steps,
+    less_than=less_than_steps,
+    mul=mul_steps,
+    div=div_steps,
+    long_mul=long_mul_steps,
+    long_div=long_div_steps,
+    borrow_sub=borrow_sub_steps,
+)
+
+def estimate_steps(task, op1, op2=None):
+    if task not in step_cost_mapping:
+        raise ValueError(f'Invalid task for cost estimation: {task}')
+    if op2 is None:
+        return step_cost_mapping[task](int(op1))
+    return step_cost_mapping[task](int(op1), int(op2))
+
+def expected_steps(task, op1, op2, reorder=False):
+    # with operand reordering, the executor runs the cheaper order of a commutative task
+    cost = estimate_steps(task, op1, op2)
+    if reorder and task in COMMUTATIVE_TASKS:
+        cost = min(cost, estimate_steps(task, op2, op1))
+    return cost
+
+def parse_operands(text):
+    # a raw expression 'a op b=', or a machine state whose operands are written reversed
+    match = re.search(EXPRESSION_PATTERN, text)
+    if match:
+        return [int(op) for op in match.groups()]
+    match = re.search(STATE_PATTERN, text, re.MULTILINE)
+    if not match:
+        raise ValueError(f'Invalid input: {text}')
+    registers = re.sub(r'\[\w+\]', ' ', match.group(1)).replace('|', '')
+    return [int(op[::-1]) for op in re.findall(r'\d+', registers)]
+
+def predict_steps(task, text, reorder=False):
+    # the operands of the initial state are the first registers, e.g. op1 and op2, or op of LEFT_MASK
+    operands = parse_operands(text)
+    if task == 'left_mask':
+        return estimate_steps(task, operands[0])
+    return expected_steps(task, operands[0], operands[1], reorder)
+
+def should_swap(task, op1, op2):
+    # swap only when the other order is strictly cheaper, ties keep the user's order
+    return estimate_steps(task, op2, op1) < estimate_steps(task, op1, op2)
+
+def executed_steps(task, op1, op2=None):
+    # generate steps of the executor, one per transition of the machine and of the machines it calls
+    from registry import get_entry
+    tm_cls = get_entry(task, 'machine')
+    tm = tm_cls(op1) if op2 is None else tm_cls(op1, op2)
+    if not tm.call_machine:
+        # the initial state is the prompt, every other state is generated
+        return tm.num_steps() - 1
+    steps = tm.num_steps()
+    for _, output in tm.transition_steps():
+        lines = output.split('\n')
+        match = re.search(r'CMD \[CALL\] (\w+),', lines[1])
+        if not match:
+            continue
+        # the called machine starts from the state written after the CALL
+        call_task = match.group(1).lower()
+        operands = parse_operands(lines[2])
+        steps += executed_steps(call_task, *operands[:1 if call_task == 'left_mask' else 2])
+    return steps
+
+def check_estimates(tasks, operands):
+    # (task, op1, op2, estimate, executed) of the operands the estimate does not bound
+    mismatches = []
+    for task in tasks:
+        for op1, op2 in operands:
+            if task == 'reflection':
+                # REFLECTION computes 99..9 - op2
+                op1 = 10 ** _n_digits(op1) - 1
+            if task in ['sub', 'borrow_sub', 'reflection'] and op1 < op2:
+                continue
+            if task in ['div', 'long_div'] and op2 == 0:
+                continue
+            if task == 'left_mask':
+                estimate, executed = estimate_steps(task, op1), executed_steps(task, op1)
+            else:
+                estimate, executed = estimate_steps(task, op1, op2), executed_steps(task, op1, op2)
+            # MUL and DIV, and LONG_MUL calling MUL, are estimated by upper bounds
+            exact = task not in ['mul', 'div', 'long_mul']
+            if estimate < executed or (exact and estimate != executed):
+                mismatches.append((task, op1, op2, estimate, executed))
+    return mismatches
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument('--tasks', type=str, nargs='+', default=list(step_cost_mapping), required=False)
+    argparser.add_argument('--max_value', default=120, type=int, required=False)
+    argparser.add_argument('--stride', default=7, type=int, required=False)
+    args = argparser.parse_args()
+
+    values = range(1, args.max_value + 1, args.stride)
+    mismatches = check_estimates(args.tasks, list(itertools.product(values, values)))
+    for task, op1, op2, estimate, executed in mismatches:
+        print(f'{task} {op1} {op2}: estimated {estimate}, executed {executed}')
+    print(f'{len(mismatches)} mismatches')
@@ -47,6 +47,21 @@ div = dict(
     q0_cmd_template = '{cmd_token} {count_token}{count}, {output_token} 0, {q1_token}',
 )
 
+long_mul = dict(
+    q0_state_template = '{operator}, {q0_token}, {h1_token}{op1} {h2_token}{op2} {product_token} {output_token}',
+    q0_cmd_template = '{cmd_token} {output_token} 0, {q1_token}',
+)
+
+long_div = dict(
+    q0_state_template = '{operator}, {q0_token}, {op1}{h1_token} {h2_token}{op2} {remainder_token} {count_token} {output_token}',
+    q0_cmd_template = '{cmd_token} {remainder_token} 0, {q1_token}',
+)
+
+borrow_sub = dict(
+    q0_state_template = '{operator}, {q0_token}, {h1_token} {op1}{h2_token} {op2} {b_token} {output_token}',
+    q0_cmd_template = '{cmd_token}: {b_token} 0, {h1_token} {right_token}, {h2_token} {right_token}, {q1_token}',
+)
+
 templates = {
     'add': add,
     'reflection': reflection,
@@ -57,4 +72,7 @@ templates = {
     'less_than': less_than,
     'mul': mul,
     'div': div,
+    'long_mul': long_mul,
+    'long_div': long_div,
+    'borrow_sub': borrow_sub,
 }
\ No newline at end of file
@@ -0,0 +1,227 @@
+import re
+
+from .state import TMStateGenerator
+from .command import TMCommandGenerator
+from ..steps import TransitionSteps
+
+Q0 = 'q0'
+Q1 = 'q1'
+Q2 = 'q2'
+QH = 'qH'
+
+r""" Turing Machine(TM) utils for LLM.
+
+Subtraction in one pass over the digits with a borrow register, like the carry loop of ADD.
+The result of 'a - b' needs a >= b.
+
+States:
+    - `q0`: Initial state
+    - `q1`: Reading digits and subtracting
+    - `q2`: Erasing the leading zeros of the output
+    - `qH`: Halt state
+
+Transition Rules
+1. Start at `q0`, set borrow `b` to 0 and move to `q1`.
+2. In `q1`, read digits from both numbers and borrow `b`:
+   - If reading `x` from number 1 and `y` from number 2:
+     - Write `(x-y-b)%10`, set borrow `b` to 1 if `x-y-b < 0`, else 0, and stay in `q1`.
+   - Else if reading `x` from number 1 only:
+     - Write `(x-b)%10`, set borrow `b` to 1 if `x-b < 0`, else 0, and stay in `q1`.
+3. When all digits are processed, move to `q2` if the output has leading zeros, else move to `qH`.
+4. In `q2`, erase one leading zero, repeat until there is no leading zero and move to `qH`.
+
+Example:
+105 - 99 = 6
+    - BORROW_SUB, q0, [HEAD1] |5|0|1[HEAD2] |9|9 [B] [OUTPUT]
+      CMD: [B] 0, [HEAD1] RIGHT, [HEAD2] RIGHT, q1
+    - BORROW_SUB, q1,  [HEAD1]|5|0|1 [HEAD2]|9|9 [B]0 [OUTPUT]
+      CMD: [B] 1, [OUTPUT] 6, [OUTPUT] RIGHT, [HEAD1] RIGHT, [HEAD2] RIGHT, q1
+    - BORROW_SUB, q1,  |5[HEAD1]|0|1 |9[HEAD2]|9 [B]1 |6[OUTPUT]
+      CMD: [B] 1, [OUTPUT] 0, [OUTPUT] RIGHT, [HEAD1] RIGHT, [HEAD2] RIGHT, q1
+    - BORROW_SUB, q1,  |5|0[HEAD1]|1 |9|9[HEAD2] [B]1 |6|0[OUTPUT]
+      CMD: [B] 0, [OUTPUT] 0, [OUTPUT] RIGHT, [HEAD1] RIGHT, q1
+    - BORROW_SUB, q1,  |5|0|1[HEAD1] |9|9[HEAD2] [B]0 |6|0|0[OUTPUT]
+      CMD: [OUTPUT], [B], q2
+    - BORROW_SUB, q2,  |5|0|1[HEAD1] |9|9[HEAD2] [B]0 |6|0|0[OUTPUT]
+      CMD: [OUTPUT] LEFT, [OUTPUT] ERASE, q2
+    - BORROW_SUB, q2,  |5|0|1[HEAD1] |9|9[HEAD2] [B]0 |6|0[OUTPUT]
+      CMD: [OUTPUT] LEFT, [OUTPUT] ERASE, qH
+    - BORROW_SUB, qH,  |5|0|1[HEAD1] |9|9[HEAD2] [B]0 |6
+      No command to execute. Halt state.
+
+"""
+
+class BorrowSubtractionTM(TransitionSteps):
+    def __init__(self, op1, op2):
+        assert op1 >= op2 and op2 >= 0, "op1 must be greater than op2 and both operands must be non-negative integers."
+        self.state_generator = TMStateGenerator()
+        self.cmd_generator = TMCommandGenerator()
+
+        self.op1 = str(op1)[::-1]
+        self.op2 = str(op2)[::-1]
+
+        self.current_state = Q0
+        self.head1_pos = -1
+        self.head2_pos = -1
+        self.borrow = 0
+        self.output = ''
+
+        self.operator = 'BORROW_SUB'
+
+    def get_current_state(self):
+        return self.current_state
+
+    def _has_leading_zero(self, output):
+        # the output is reversed, the leading zeros are at the end
+        return len(output) > 1 and output[-1] == '0'
+
+    def get_next_state(self):
+        if self.current_state == Q0:
+            return Q1
+        elif self.current_state == Q1:
+            if self.head1_pos >= len(self.op1):
+                return Q2 if self._has_leading_zero(self.output) else QH
+            else:
+                return Q1
+        elif self.current_state == Q2:
+            return Q2 if self._has_leading_zero(self.output[:-1]) else QH
+        elif self.current_state == QH:
+            return QH
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def get_state(self):
+        if self.current_state == Q0:
+            return self.state_generator.get_q0_state(self.operator, self.op1, self.op2)
+        elif self.current_state == Q1:
+            return self.state_generator.get_q1_state(self.operator, self.op1, self.op2, self.head1_pos, self.head2_pos, self.borrow, self.output)
+        elif self.current_state == Q2:
+            return self.state_generator.get_q2_state(self.operator, self.op1, self.op2, self.borrow, self.output)
+        elif self.current_state == QH:
+            return self.state_generator.get_qH_state(self.operator, self.op1, self.op2, self.borrow, self.output)
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def _compute(self):
+        a = int(self.op1[self.head1_pos]) if self.head1_pos < len(self.op1) else 0
+        b = int(self.op2[self.head2_pos]) if self.head2_pos < len(self.op2) else 0
+        d = a - b - int(self.borrow)
+        borrow = 1 if d < 0 else 0
+        return str(d % 10), str(borrow)
+
+    def get_cmd(self):
+        if self.current_state == Q0:
+            return self.cmd_generator.get_q0_cmd()
+        elif self.current_state == Q1:
+            output, borrow = self._compute()
+            h1_r = self.head1_pos < len(self.op1)
+            h2_r = self.head2_pos < len(self.op2)
+            next_state = self.get_next_state()
+            return self.cmd_generator.get_q1_cmd(output, next_state, borrow, h1_r, h2_r)
+        elif self.current_state == Q2:
+            return self.cmd_generator.get_q2_cmd(self.get_next_state())
+        elif self.current_state == QH:
+            return 'No command to execute. Halt state.'
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def one_step(self):
+        if self.current_state == Q0:
+            self._one_step_q0()
+        elif self.current_state == Q1:
+            self._one_step_q1()
+        elif self.current_state == Q2:
+            self._one_step_q2()
+        elif self.current_state == QH:
+            self._one_step_qH()
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def _one_step_q0(self):
+        self.head1_pos += 1
+        self.head2_pos += 1
+        self.borrow = 0
+        self.current_state = Q1
+
+    def _one_step_q1(self):
+        next_state = self.get_next_state()
+        if next_state == Q1:
+            output, borrow = self._compute()
+            self.output += output
+            self.borrow = borrow
+            self.head1_pos += 1
+            if self.head2_pos < len(self.op2):
+                self.head2_pos += 1
+        self.current_state = next_state
+
+    def _one_step_q2(self):
+        next_state = self.get_next_state()
+        # erase one leading zero
+        self.output = self.output[:-1]
+        self.current_state = next_state
+
+    def _one_step_qH(self):
+        self.current_state = QH
+        print('Halt')
+
+    def get_transition_seq(self):
+        seq = []
+        while self.current_state != QH:
+            seq.append((self.get_state(), self.get_cmd()))
+            self.one_step()
+        seq.append((self.get_state(), self.get_cmd()))
+        return seq
+
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this BorrowSubtractionTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        self.head1_pos = len(self.op1)
+        self.head2_pos = len(self.op2)
+        # a >= b, there is no borrow after the last digit
+        self.borrow = 0
+        self.output = str(int(self.op1[::-1]) - int(self.op2[::-1]))[::-1]
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
+
+class BorrowSubtractionTMChecker():
+    def __init__(self, input):
+        sg = TMStateGenerator()
+        splits = input.strip().split('\n')
+        state = splits[0]
+        STATE_PATTERN = r'BORROW_SUB, (.+),'
+        state_match = re.search(STATE_PATTERN, state)
+        if not state_match:
+            raise ValueError('Invalid input format.')
+        try:
+            idx = state.find(sg.b_token)
+            s = state[:idx]
+            s = s.replace(state_match[0], '').replace(sg.h1_token, '').replace(sg.h2_token, '').replace(sg.separator, '').strip()
+            idx = s.find(' ')
+            op1 = int((s[:idx].strip())[::-1])
+            op2 = int((s[idx+1:].strip())[::-1])
+            self.tm = BorrowSubtractionTM(op1, op2)
+            self.tm.one_step()
+        except:
+            raise ValueError('Invalid input format.')
+
+    def one_step(self):
+        if self.tm.get_current_state() == QH:
+            return
+        self.tm.one_step()
+
+    def expected_output(self):
+        return self.tm.get_state() + '\n' + self.tm.get_cmd()
+
+    def check(self, model_output):
+        splits = model_output.strip().split('\n')
+        try:
+            state, cmd = splits[0], splits[1]
+            return self.tm.get_state() == state and self.tm.get_cmd() == cmd
+        except:
+            return False
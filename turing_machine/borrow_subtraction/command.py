@@ -0,0 +1,72 @@
+r""" Turing Machine(TM) utils for LLM.
+
+Standard Pattern:
+1. The second line describes the command to execute according to the current state. Examples like:
+    - CMD: [B] 0, [HEAD1] RIGHT, [HEAD2] RIGHT, q1
+    - CMD: [B] 1, [OUTPUT] 6, [OUTPUT] RIGHT, [HEAD1] RIGHT, [HEAD2] RIGHT, q1
+    - CMD: [B] 0, [OUTPUT] 0, [OUTPUT] RIGHT, [HEAD1] RIGHT, q1
+    - CMD: [OUTPUT], [B], q2
+    - CMD: [OUTPUT] LEFT, [OUTPUT] ERASE, qH
+
+"""
+
+class TMCommandGenerator():
+    def __init__(self):
+        self.q0_token = 'q0'
+        self.q1_token = 'q1'
+        self.q2_token = 'q2'
+        self.qH_token = 'qH'
+
+        self.h1_token = '[HEAD1]'
+        self.h2_token = '[HEAD2]'
+        self.b_token = '[B]'
+        self.output_token = '[OUTPUT]'
+        self.cmd_token = 'CMD'
+
+        self.right_token = 'RIGHT'
+        self.left_token = 'LEFT'
+        self.erase_token = 'ERASE'
+
+        self.q0_cmd_template = '{cmd_token}: {b_token} 0, {h1_token} {right_token}, {h2_token} {right_token}, {q1_token}'
+        self.q1_2_q1_cmd_template = '{cmd_token}: {b_token} {borrow}, {output_token} {output}, {output_token} {right_token}, {h1_act}{h2_act}{q1_token}'
+        self.q1_2_end_cmd_template = '{cmd_token}: {output_token}, {b_token}, {next_state}'
+        self.q2_cmd_template = '{cmd_token}: {output_token} {left_token}, {output_token} {erase_token}, {next_state}'
+
+    def get_q0_cmd(self):
+        return self.q0_cmd_template.format(cmd_token=self.cmd_token,
+                                           b_token=self.b_token,
+                                           h1_token=self.h1_token,
+                                           right_token=self.right_token,
+                                           h2_token=self.h2_token,
+                                           q1_token=self.q1_token)
+
+    def get_q1_cmd(self, output, next_state, borrow, h1_r, h2_r):
+        if next_state == 'q1':
+            h1_act = h2_act = ''
+            if h1_r:
+                h1_act = f'{self.h1_token} {self.right_token}, '
+            if h2_r:
+                h2_act = f'{self.h2_token} {self.right_token}, '
+            return self.q1_2_q1_cmd_template.format(cmd_token=self.cmd_token,
+                                                    b_token=self.b_token,
+                                                    borrow=borrow,
+                                                    output_token=self.output_token,
+                                                    output=output,
+                                                    right_token=self.right_token,
+                                                    h1_act=h1_act,
+                                                    h2_act=h2_act,
+                                                    q1_token=self.q1_token)
+        elif next_state in ['q2', 'qH']:
+            return self.q1_2_end_cmd_template.format(cmd_token=self.cmd_token,
+                                                     output_token=self.output_token,
+                                                     b_token=self.b_token,
+                                                     next_state=next_state)
+        else:
+            raise ValueError(f'Invalid next state: {next_state}')
+
+    def get_q2_cmd(self, next_state):
+        return self.q2_cmd_template.format(cmd_token=self.cmd_token,
+                                           output_token=self.output_token,
+                                           left_token=self.left_token,
+                                           erase_token=self.erase_token,
+                                           next_state=next_state)
@@ -0,0 +1,122 @@
+r""" Turing Machine(TM) utils for LLM.
+
+Standard Pattern:
+1. The first line describes the current TM stape state. Examples like:
+    - BORROW_SUB, q0, [HEAD1] |5|0|1[HEAD2] |9|9 [B] [OUTPUT]
+    - BORROW_SUB, q1,  [HEAD1]|5|0|1 [HEAD2]|9|9 [B]0 [OUTPUT]
+    - BORROW_SUB, q1,  |5|0[HEAD1]|1 |9|9[HEAD2] [B]1 |6|0[OUTPUT]
+    - BORROW_SUB, q2,  |5|0|1[HEAD1] |9|9[HEAD2] [B]0 |6|0|0[OUTPUT]
+    - BORROW_SUB, qH,  |5|0|1[HEAD1] |9|9[HEAD2] [B]0 |6
+
+"""
+
+class TMStateGenerator():
+    def __init__(self):
+        self.q0_token = 'q0'
+        self.q1_token = 'q1'
+        self.q2_token = 'q2'
+        self.qH_token = 'qH'
+
+        self.h1_token = '[HEAD1]'
+        self.h2_token = '[HEAD2]'
+        self.b_token = '[B]'
+        self.output_token = '[OUTPUT]'
+        self.separator = '|'
+
+        self.q0_tape_state_template = '{operator}, {q0_token}, {h1_token} {op1}{h2_token} {op2} {b_token} {output_token}'
+        self.q1_tape_state_template = '{operator}, {q1_token},  {l_op1}{h1_token}{r_op1} {l_op2}{h2_token}{r_op2} {b_token}{borrow} {output}{output_token}'
+        self.q2_tape_state_template = '{operator}, {q2_token},  {op1}{h1_token} {op2}{h2_token} {b_token}{borrow} {output}{output_token}'
+        self.qH_tape_state_template = '{operator}, {qH_token},  {op1}{h1_token} {op2}{h2_token} {b_token}{borrow} {output}'
+
+    def get_q0_state(self, operator, operand1, operand2):
+        operand1 = str(operand1)
+        operand2 = str(operand2)
+        separator = self.separator
+        if len(separator) > 0:
+            operand1 = separator + separator.join(operand1)
+            operand2 = separator + separator.join(operand2)
+        return self.q0_tape_state_template.format(operator=operator,
+                                            h1_token=self.h1_token,
+                                            h2_token=self.h2_token,
+                                            b_token=self.b_token,
+                                            output_token=self.output_token,
+                                            op1=operand1,
+                                            op2=operand2,
+                                            q0_token=self.q0_token)
+
+    def get_q1_state(self, operator, operand1, operand2, head1_pos, head2_pos, borrow, output):
+        operand1 = str(operand1)
+        operand2 = str(operand2)
+        borrow = str(borrow)
+        output = str(output)
+
+        l_op1 = operand1[:head1_pos]
+        r_op1 = operand1[head1_pos:]
+        l_op2 = operand2[:head2_pos]
+        r_op2 = operand2[head2_pos:]
+
+        separator = self.separator
+        if len(separator) > 0:
+            l_op1 = separator + separator.join(l_op1) if len(l_op1) > 0 else ''
+            r_op1 = separator + separator.join(r_op1) if len(r_op1) > 0 else ''
+            l_op2 = separator + separator.join(l_op2) if len(l_op2) > 0 else ''
+            r_op2 = separator + separator.join(r_op2) if len(r_op2) > 0 else ''
+            output = separator + separator.join(output) if len(output) > 0 else ''
+
+        return self.q1_tape_state_template.format(operator=operator,
+                                                    h1_token=self.h1_token,
+                                                    h2_token=self.h2_token,
+                                                    b_token=self.b_token,
+                                                    output_token=self.output_token,
+                                                    l_op1=l_op1,
+                                                    r_op1=r_op1,
+                                                    l_op2=l_op2,
+                                                    r_op2=r_op2,
+                                                    borrow=borrow,
+                                                    output=output,
+                                                    q1_token=self.q1_token)
+
+    def get_q2_state(self, operator, operand1, operand2, borrow, output):
+        operand1 = str(operand1)
+        operand2 = str(operand2)
+        borrow = str(borrow)
+        output = str(output)
+
+        separator = self.separator
+        if len(separator) > 0:
+            operand1 = separator + separator.join(operand1)
+            operand2 = separator + separator.join(operand2)
+            output = separator + separator.join(output)
+
+        return self.q2_tape_state_template.format(operator=operator,
+                                                  h1_token=self.h1_token,
+                                                  h2_token=self.h2_token,
+                                                  b_token=self.b_token,
+                                                  output_token=self.output_token,
+                                                  op1=operand1,
+                                                  op2=operand2,
+                                                  borrow=borrow,
+                                                  output=output,
+                                                  q2_token=self.q2_token)
+
+    def get_qH_state(self, operator, operand1, operand2, borrow, output):
+        operand1 = str(operand1)
+        operand2 = str(operand2)
+        borrow = str(borrow)
+        output = str(output)
+
+        separator = self.separator
+        if len(separator) > 0:
+            operand1 = separator + separator.join(operand1)
+            operand2 = separator + separator.join(operand2)
+            output = separator + separator.join(output)
+
+        return self.qH_tape_state_template.format(operator=operator,
+                                                  h1_token=self.h1_token,
+                                                  h2_token=self.h2_token,
+                                                  b_token=self.b_token,
+                                                  op1=operand1,
+                                                  op2=operand2,
+                                                  borrow=borrow,
+                                                  output=output,
+                                                  qH_token=self.qH_token)
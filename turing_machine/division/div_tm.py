@@ -3,6 +3,7 @@ import re
 from .call_state import TMCallStateGenerator
 from .call_command import TMCallCommandGenerator
 from .input import TMInputGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
@@ -100,7 +101,9 @@ MUL, qH, [HEAD1]|3|1|5|4 [HEAD2]|4|0|5|1 [COUNT]|6|1|0|6 |3           # final st
 No command to execute. Halt state.                                    # end message
 """
 
-class DivisionTM:
+class DivisionTM(TransitionSteps):
+    call_machine = True
+
     def __init__(self, op1, op2):
         self.call_state_generator = TMCallStateGenerator()
         self.call_cmd_generator = TMCallCommandGenerator()
@@ -405,6 +408,11 @@ class DivisionTMChecker:
             return
         self.step += 1
 
+    def expected_output(self):
+        if self.step >= len(self.transition_seq):
+            return None
+        return self.transition_seq[self.step][1].strip()
+
     def check(self, model_output):
         model_output = model_output.strip()
         if self.step >= len(self.transition_seq):
@@ -2,12 +2,13 @@ import re
 
 from .state import EqualTMStateGenerator
 from .command import EqualTMCommandGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
 QH = 'qH'
 
-class EqualTM:
+class EqualTM(TransitionSteps):
     def __init__(self, op1, op2):
         self.state_generator = EqualTMStateGenerator()
         self.cmd_generator = EqualTMCommandGenerator()
@@ -124,6 +125,23 @@ class EqualTM:
         seq.append((self.get_state(), self.get_cmd()))
         return seq
     
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this EqualTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        # heads stop at the first different digit or at the end of the shorter operand
+        pos = 0
+        while pos < min(len(self.op1), len(self.op2)) and self.op1[pos] == self.op2[pos]:
+            pos += 1
+        self.head1_pos = self.head2_pos = pos
+        self.output = 'True' if self.op1 == self.op2 else 'False'
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
 class EqualTMChecker:
     def __init__(self, input):
         sg = EqualTMStateGenerator()
@@ -148,6 +166,9 @@ class EqualTMChecker:
             return
         self.tm.one_step()
 
+    def expected_output(self):
+        return self.tm.get_state() + '\n' + self.tm.get_cmd()
+
     def check(self, model_output):
         splits = model_output.strip().split('\n')
         try:
@@ -2,12 +2,13 @@ import re
 
 from .state import GreaterThanTMStateGenerator
 from .command import GreaterThanTMCommandGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
 QH = 'qH'
 
-class GreaterThanTM:
+class GreaterThanTM(TransitionSteps):
     def __init__(self, op1, op2):
         self.state_generator = GreaterThanTMStateGenerator()
         self.cmd_generator = GreaterThanTMCommandGenerator()
@@ -128,6 +129,20 @@ class GreaterThanTM:
         seq.append((self.get_state(), self.get_cmd()))
         return seq
     
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this GreaterThanTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        # heads stop at the end of the shorter operand
+        self.head1_pos = self.head2_pos = min(len(self.op1), len(self.op2))
+        self.output = str(int(self.op1[::-1]) > int(self.op2[::-1]))
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
 class GreaterThanTMChecker:
     def __init__(self, input):
         sg = GreaterThanTMStateGenerator()
@@ -152,7 +167,13 @@ class GreaterThanTMChecker:
             return
         self.tm.one_step()
 
+    def expected_output(self):
+        return self.tm.get_state() + '\n' + self.tm.get_cmd()
+
     def check(self, model_output):
         splits = model_output.strip().split('\n')
-        state, cmd = splits[0], splits[1]
-        return self.tm.get_state() == state and self.tm.get_cmd() == cmd
\ No newline at end of file
+        try:
+            state, cmd = splits[0], splits[1]
+            return self.tm.get_state() == state and self.tm.get_cmd() == cmd
+        except:
+            return False
\ No newline at end of file
@@ -2,6 +2,7 @@ import re
 
 from .state import TMStateGenerator
 from .command import TMCommandGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
@@ -22,7 +23,7 @@ Standard Pattern:
     - CMD [OUTPUT] LEFT, [OUTPUT] 0, qH
 """
 
-class LeftMaskTM:
+class LeftMaskTM(TransitionSteps):
     def __init__(self, op):
         self.state_generator = TMStateGenerator()
         self.cmd_generator = TMCommandGenerator()
@@ -137,6 +138,21 @@ class LeftMaskTM:
         seq.append((self.get_state(), self.get_cmd()))
         return seq
     
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this LeftMaskTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        self.head_pos = len(self.op)
+        # the highest digit is masked and the leading zeros are removed in q2
+        self.output = self.op[:-1].rstrip('0')
+        self.output_pos = len(self.output) - 1
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
 class LeftMaskTMChecker():
     def __init__(self, input):
         sg = TMStateGenerator()
@@ -159,7 +175,13 @@ class LeftMaskTMChecker():
             return
         self.tm.one_step()
 
+    def expected_output(self):
+        return self.tm.get_state() + '\n' + self.tm.get_cmd()
+
     def check(self, model_output):
         splits = model_output.strip().split('\n')
-        state, cmd = splits[0], splits[1]
-        return self.tm.get_state() == state and self.tm.get_cmd() == cmd
\ No newline at end of file
+        try:
+            state, cmd = splits[0], splits[1]
+            return self.tm.get_state() == state and self.tm.get_cmd() == cmd
+        except:
+            return False
\ No newline at end of file
@@ -2,12 +2,13 @@ import re
 
 from .state import LessThanTMStateGenerator
 from .command import LessThanTMCommandGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
 QH = 'qH'
 
-class LessThanTM:
+class LessThanTM(TransitionSteps):
     def __init__(self, op1, op2):
         self.state_generator = LessThanTMStateGenerator()
         self.cmd_generator = LessThanTMCommandGenerator()
@@ -128,6 +129,20 @@ class LessThanTM:
         seq.append((self.get_state(), self.get_cmd()))
         return seq
     
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this LessThanTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        # heads stop at the end of the shorter operand
+        self.head1_pos = self.head2_pos = min(len(self.op1), len(self.op2))
+        self.output = str(int(self.op1[::-1]) < int(self.op2[::-1]))
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
 class LessThanTMChecker:
     def __init__(self, input):
         sg = LessThanTMStateGenerator()
@@ -152,6 +167,9 @@ class LessThanTMChecker:
             return
         self.tm.one_step()
 
+    def expected_output(self):
+        return self.tm.get_state() + '\n' + self.tm.get_cmd()
+
     def check(self, model_output):
         splits = model_output.strip().split('\n')
         try:
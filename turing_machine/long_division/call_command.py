@@ -0,0 +1,30 @@
+class TMCallCommandGenerator:
+    def __init__(self):
+        self.q0_token = 'q0'
+        self.q1_token = 'q1'
+        self.qH_token = 'qH'
+
+        self.h1_token = '[HEAD1]'
+        self.h2_token = '[HEAD2]'
+        self.output_token = '[OUTPUT]'
+        self.cmd_token = 'CMD'
+
+        self.right_token = 'RIGHT'
+
+        self.false_token = 'False'
+
+        self.greater_than_q0_template = '{cmd_token} {h1_token} {right_token}, {h2_token} {right_token}, {output_token} {false_token}, {q1_token}'
+        self.sub_q0_template = '{cmd_token} {q1_token}'
+
+    def get_q2_cmd(self):
+        return self.greater_than_q0_template.format(cmd_token=self.cmd_token,
+                                             h1_token=self.h1_token,
+                                             h2_token=self.h2_token,
+                                             right_token=self.right_token,
+                                             output_token=self.output_token,
+                                             false_token=self.false_token,
+                                             q1_token=self.q1_token)
+
+    def get_q3_cmd(self):
+        return self.sub_q0_template.format(cmd_token=self.cmd_token,
+                                            q1_token=self.q1_token)
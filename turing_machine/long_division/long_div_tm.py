@@ -0,0 +1,444 @@
+import re
+
+from .call_state import TMCallStateGenerator
+from .call_command import TMCallCommandGenerator
+from .input import TMInputGenerator
+from ..steps import TransitionSteps
+
+Q0 = 'q0'
+Q1 = 'q1'
+Q2 = 'q2'
+Q3 = 'q3'
+QH = 'qH'
+
+r""" Turing Machine(TM) utils for LLM long division.
+
+For 'a // b = c', algorithm (schoolbook division over the digits of a):
+r = 0, c = 0
+for d in digits of a (from the most significant one):
+    r = r * 10 + d          # bring down the next digit
+    cnt = 0
+    while not b > r:
+        r -= b
+        cnt += 1
+    c = c * 10 + cnt        # shift the quotient and write the digit
+output: c
+
+Each digit of c is at most 9, so the number of steps is O(9 * digits(a)) instead of O(c) in DIV.
+
+States:
+- q0: Initial state.
+- q1: bring down the digit under [HEAD1] to the remainder, or halt if all digits are read.
+- q2: 'while' loop: call GREATER_THAN to compare b and r.
+- q3: 'while' loop: call SUB for r -= b, cnt += 1; or write cnt to the quotient when b > r.
+- qH: Halt state.
+
+Example:
+457 // 15 = 30
+---
+iteration 1:
+- input
+LONG_DIV, q0, |7|5|4[HEAD1] [HEAD2]|5|1 [REMAINDER] [COUNT] [OUTPUT]                         # state
+CMD [REMAINDER] 0, q1                                                                          # command
+- output
+LONG_DIV, q1, |7|5|4[HEAD1] [HEAD2]|5|1 [REMAINDER]|0 [COUNT] [OUTPUT]                       # state
+CMD [HEAD1] LEFT, [REMAINDER] 4, [COUNT] 0, q2                                                 # command, bring down
+
+---
+iteration 2:
+- input
+LONG_DIV, q1, |7|5|4[HEAD1] [HEAD2]|5|1 [REMAINDER]|0 [COUNT] [OUTPUT]                       # copied from last output
+CMD [HEAD1] LEFT, [REMAINDER] 4, [COUNT] 0, q2                                                 # copied from last output
+- output
+LONG_DIV, q2, |7|5[HEAD1]|4 [HEAD2]|5|1 [REMAINDER]|4 [COUNT]|0 [OUTPUT]                     # state
+CMD [CALL] GREATER_THAN, q3                                                                    # command
+GREATER_THAN, q0, [HEAD1] |5|1[HEAD2] |4 [OUTPUT]                                              # state for call
+CMD [HEAD1] RIGHT, [HEAD2] RIGHT, [OUTPUT] False, q1                                           # command for call
+
+---
+iteration 3:
+- input
+LONG_DIV, q2, |7|5[HEAD1]|4 [HEAD2]|5|1 [REMAINDER]|4 [COUNT]|0 [OUTPUT]                     # copied from last output
+CMD [CALL] GREATER_THAN, q3                                                                    # copied from last output
+GREATER_THAN, qH,  |5[HEAD1]|1 |4[HEAD2] True                                                  # final state after call
+No command to execute. Halt state.                                                             # message after call
+- output
+LONG_DIV, q3, |7|5[HEAD1]|4 [HEAD2]|5|1 [REMAINDER]|4 [COUNT]|0 [OUTPUT]                     # state
+CMD [OUTPUT] 0, q1                                                                             # command, b > r
+
+...
+---
+iteration 6:
+- input
+LONG_DIV, q2, |7[HEAD1]|5|4 [HEAD2]|5|1 [REMAINDER]|5|4 [COUNT]|0 [OUTPUT]|0                 # copied from last output
+CMD [CALL] GREATER_THAN, q3                                                                    # copied from last output
+GREATER_THAN, qH,  |5|1[HEAD1] |5|4[HEAD2] False                                               # final state after call
+No command to execute. Halt state.                                                             # message after call
+- output
+LONG_DIV, q3, |7[HEAD1]|5|4 [HEAD2]|5|1 [REMAINDER]|5|4 [COUNT]|0 [OUTPUT]|0                 # state
+CMD [CALL] SUB, q2                                                                             # command
+SUB, q0, [HEAD1]|5|4 [HEAD2]|5|1                                                               # state for call
+CMD q1                                                                                         # command for call
+
+---
+iteration 7:
+- input
+LONG_DIV, q3, |7[HEAD1]|5|4 [HEAD2]|5|1 [REMAINDER]|5|4 [COUNT]|0 [OUTPUT]|0                 # copied from last output
+CMD [CALL] SUB, q2                                                                             # copied from last output
+SUB, qH, [HEAD1]|5|4 [HEAD2]|5|1 |0|3                                                          # final state after call
+No command to execute. Halt state.                                                             # message after call
+- output
+LONG_DIV, q2, |7[HEAD1]|5|4 [HEAD2]|5|1 [REMAINDER]|0|3 [COUNT]|1 [OUTPUT]|0                 # state
+CMD [CALL] GREATER_THAN, q3                                                                    # command
+GREATER_THAN, q0, [HEAD1] |5|1[HEAD2] |0|3 [OUTPUT]                                            # state for call
+CMD [HEAD1] RIGHT, [HEAD2] RIGHT, [OUTPUT] False, q1                                           # command for call
+
+...
+---
+iteration 17:
+- input
+LONG_DIV, q1, [HEAD1]|7|5|4 [HEAD2]|5|1 [REMAINDER]|7 [COUNT]|0 [OUTPUT]|0|3                 # state
+CMD [OUTPUT], qH                                                                               # command
+- output
+LONG_DIV, qH, [HEAD1]|7|5|4 [HEAD2]|5|1 [REMAINDER]|7 [COUNT]|0 |0|3                         # final state
+No command to execute. Halt state.                                                             # end message
+"""
+
+class LongDivisionTM(TransitionSteps):
+    call_machine = True
+
+    def __init__(self, op1, op2):
+        assert op1 >= 0 and op2 > 0, "Operand1 must be non-negative and operand2 must be positive."
+        self.call_state_generator = TMCallStateGenerator()
+        self.call_cmd_generator = TMCallCommandGenerator()
+        self.input_generator = TMInputGenerator()
+
+        self.op1 = str(op1)[::-1]
+        self.op2 = str(op2)[::-1]
+        # [HEAD1] moves from the most significant digit to the least significant one
+        self.head1_pos = len(self.op1)
+        self.remainder = ''
+        self.cnt = -1
+        self.output = ''
+
+        self.current_state = Q0
+        self.operator = 'LONG_DIV'
+        self.h1_token = '[HEAD1]'
+        self.h2_token = '[HEAD2]'
+        self.cmd_token = 'CMD'
+        self.call_token = '[CALL]'
+        self.output_token = '[OUTPUT]'
+        self.remainder_token = '[REMAINDER]'
+        self.count_token = '[COUNT]'
+        self.left_token = 'LEFT'
+        self.greater_than_token = 'GREATER_THAN'
+        self.sub_token = 'SUB'
+        self.separator = '|'
+
+    def get_cuurent_state(self):
+        return self.current_state
+
+    def _get_digit(self):
+        return int(self.op1[self.head1_pos - 1])
+
+    def _is_greater(self):
+        return int(self.op2[::-1]) > int(self.remainder[::-1])
+
+    def get_next_state(self):
+        if self.current_state == Q0:
+            return Q1
+        elif self.current_state == Q1:
+            if self.head1_pos == 0:
+                return QH
+            return Q2
+        elif self.current_state == Q2:
+            return Q3
+        elif self.current_state == Q3:
+            if self._is_greater():
+                return Q1
+            return Q2
+        elif self.current_state == QH:
+            return QH
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def get_state(self):
+        state_template = '{operator}, {state}, {l_op1}{h1_token}{r_op1} {h2_token}{op2} {remainder_token}{remainder} {count_token}{count} {output_token}{output}'
+        l_op1 = self.op1[:self.head1_pos]
+        r_op1 = self.op1[self.head1_pos:]
+        op2 = self.op2
+        remainder = self.remainder
+        count = str(self.cnt) if self.cnt >= 0 else ''
+        output = self.output
+
+        sep = self.separator
+        if len(sep) > 0:
+            l_op1 = sep + sep.join(l_op1) if len(l_op1) > 0 else ''
+            r_op1 = sep + sep.join(r_op1) if len(r_op1) > 0 else ''
+            op2 = sep + sep.join(op2)
+            remainder = sep + sep.join(remainder) if len(remainder) > 0 else ''
+            count = sep + sep.join(count) if len(count) > 0 else ''
+            output = sep + sep.join(output) if len(output) > 0 else ''
+
+        output_token = self.output_token if self.current_state != QH else ''
+        return state_template.format(
+            operator=self.operator,
+            state=self.current_state,
+            h1_token=self.h1_token,
+            h2_token=self.h2_token,
+            remainder_token=self.remainder_token,
+            count_token=self.count_token,
+            output_token=output_token,
+            l_op1=l_op1,
+            r_op1=r_op1,
+            op2=op2,
+            remainder=remainder,
+            count=count,
+            output=output
+        )
+
+    def get_cmd(self):
+        if self.current_state == Q0:
+            return self._get_q0_cmd()
+        elif self.current_state == Q1:
+            return self._get_q1_cmd()
+        elif self.current_state == Q2:
+            return self._get_q2_cmd()
+        elif self.current_state == Q3:
+            return self._get_q3_cmd()
+        elif self.current_state == QH:
+            return 'No command to execute. Halt state.'
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def _get_q0_cmd(self):
+        q0_cmd_template = '{cmd_token} {remainder_token} 0, {next_state}'
+        return q0_cmd_template.format(
+            cmd_token=self.cmd_token,
+            remainder_token=self.remainder_token,
+            next_state=Q1
+        )
+
+    def _get_q1_cmd(self):
+        next_state = self.get_next_state()
+        if next_state == QH:
+            halt_template = '{cmd_token} {output_token}, {next_state}'
+            return halt_template.format(
+                cmd_token=self.cmd_token,
+                output_token=self.output_token,
+                next_state=next_state
+            )
+        bring_down_template = '{cmd_token} {h1_token} {left_token}, {remainder_token} {digit}, {count_token} 0, {next_state}'
+        return bring_down_template.format(
+            cmd_token=self.cmd_token,
+            h1_token=self.h1_token,
+            left_token=self.left_token,
+            remainder_token=self.remainder_token,
+            digit=self._get_digit(),
+            count_token=self.count_token,
+            next_state=next_state
+        )
+
+    def _get_q2_cmd(self):
+        call_template = '{cmd_token} {call_token} {call_cmd}, {next_state}'
+        return call_template.format(
+            cmd_token=self.cmd_token,
+            call_token=self.call_token,
+            call_cmd=self.greater_than_token,
+            next_state=self.get_next_state()
+        )
+
+    def _get_q3_cmd(self):
+        next_state = self.get_next_state()
+        if next_state == Q1:
+            write_template = '{cmd_token} {output_token} {count}, {next_state}'
+            return write_template.format(
+                cmd_token=self.cmd_token,
+                output_token=self.output_token,
+                count=self.cnt,
+                next_state=next_state
+            )
+        call_template = '{cmd_token} {call_token} {call_cmd}, {next_state}'
+        return call_template.format(
+            cmd_token=self.cmd_token,
+            call_token=self.call_token,
+            call_cmd=self.sub_token,
+            next_state=next_state
+        )
+
+    def _has_call(self):
+        if self.current_state == Q2:
+            return True
+        if self.current_state == Q3:
+            return not self._is_greater()
+        return False
+
+    def get_call_state(self, choice):
+        assert choice in ['input', 'output'], 'Invalid choice, should be either "input" or "output".'
+        if choice == 'input':
+            return self._get_call_state_input()
+        elif choice == 'output':
+            return self._get_call_state_output()
+
+    def _get_call_state_input(self):
+        if not self._has_call():
+            return ''
+        if self.current_state == Q2:
+            # GREATER_THAN result
+            return self.input_generator.get_q2_input(self.op2, self.remainder, self._is_greater())
+        else:
+            # SUB result
+            output = str(int(self.remainder[::-1]) - int(self.op2[::-1]))[::-1]
+            return self.input_generator.get_q3_input(self.remainder, self.op2, output)
+
+    def _get_call_state_output(self):
+        if not self._has_call():
+            return ''
+        if self.current_state == Q2:
+            return self.call_state_generator.get_q2_output(self.op2, self.remainder)
+        else:
+            return self.call_state_generator.get_q3_output(self.remainder, self.op2)
+
+    def get_call_cmd(self, choice):
+        assert choice in ['input', 'output'], 'Invalid choice, should be either "input" or "output".'
+        if not self._has_call():
+            return ''
+        if choice == 'output':
+            if self.current_state == Q2:
+                return self.call_cmd_generator.get_q2_cmd()
+            else:
+                return self.call_cmd_generator.get_q3_cmd()
+        else:
+            return 'No command to execute. Halt state.'
+
+    def one_step(self):
+        if self.current_state == Q0:
+            self._one_step_q0()
+        elif self.current_state == Q1:
+            self._one_step_q1()
+        elif self.current_state == Q2:
+            self._one_step_q2()
+        elif self.current_state == Q3:
+            self._one_step_q3()
+        elif self.current_state == QH:
+            self._one_step_qH()
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def _one_step_q0(self):
+        self.remainder = '0'
+        self.current_state = Q1
+
+    def _one_step_q1(self):
+        next_state = self.get_next_state()
+        if next_state == QH:
+            self.current_state = QH
+            return
+        # bring down: r = r * 10 + d
+        r = int(self.remainder[::-1]) * 10 + self._get_digit()
+        self.remainder = str(r)[::-1]
+        self.head1_pos -= 1
+        self.cnt = 0
+        self.current_state = Q2
+
+    def _one_step_q2(self):
+        self.current_state = Q3
+
+    def _one_step_q3(self):
+        next_state = self.get_next_state()
+        if next_state == Q1:
+            # shift: c = c * 10 + cnt
+            c = int(self.output[::-1]) * 10 + self.cnt if self.output else self.cnt
+            self.output = str(c)[::-1]
+        else:
+            # compute r -= b, cnt += 1
+            r = int(self.remainder[::-1]) - int(self.op2[::-1])
+            self.remainder = str(r)[::-1]
+            self.cnt += 1
+        self.current_state = next_state
+
+    def _one_step_qH(self):
+        self.current_state = QH
+        print('Halt')
+
+    def get_transition_seq(self):
+        seq = []
+        entry_template = '{}\n{}\n{}\n{}\n'
+        while self.current_state != QH:
+            input_state = self.get_state()
+            input_cmd = self.get_cmd()
+            input_call_state = self.get_call_state('input')
+            input_call_cmd = self.get_call_cmd('input')
+
+            self.one_step()
+
+            output_state = self.get_state()
+            output_cmd = self.get_cmd()
+            output_call_state = self.get_call_state('output')
+            output_call_cmd = self.get_call_cmd('output')
+
+            input = entry_template.format(input_state, input_cmd, input_call_state, input_call_cmd).strip() + '\n'
+            output = entry_template.format(output_state, output_cmd, output_call_state, output_call_cmd).strip()
+            seq.append((input, output))
+
+        return seq
+
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this LongDivisionTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        op1 = int(self.op1[::-1])
+        op2 = int(self.op2[::-1])
+        self.current_state = QH
+        self.head1_pos = 0
+        self.remainder = str(op1 % op2)[::-1]
+        # the last quotient digit is left in [COUNT]
+        self.cnt = (op1 // op2) % 10
+        self.output = str(op1 // op2)[::-1]
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
+class LongDivisionTMChecker:
+    def __init__(self, input):
+        splits = input.strip().split('\n')
+        state = splits[0]
+        STATE_PATTERN = r'LONG_DIV, (.+?),'
+        state_match = re.search(STATE_PATTERN, state)
+        if not state_match:
+            raise ValueError('Invalid input format.')
+        try:
+            h1_token = '[HEAD1]'
+            h2_token = '[HEAD2]'
+            remainder_token = '[REMAINDER]'
+            count_token = '[COUNT]'
+            output_token = '[OUTPUT]'
+            separator = '|'
+            s = state.replace(state_match[0], '').replace(h1_token, '').replace(h2_token, '').replace(remainder_token, '').replace(count_token, '').replace(output_token, '').replace(separator, '').strip()
+            ops = s.split()
+            op1 = int(ops[0][::-1])
+            op2 = int(ops[1][::-1])
+            self.tm = LongDivisionTM(op1, op2)
+        except:
+            raise ValueError('Invalid input format.')
+        self.step = 0
+        self.transition_seq = self.tm.get_transition_seq()
+
+    def one_step(self):
+        if self.step > len(self.transition_seq):
+            return
+        self.step += 1
+
+    def expected_output(self):
+        if self.step >= len(self.transition_seq):
+            return None
+        return self.transition_seq[self.step][1].strip()
+
+    def check(self, model_output):
+        model_output = model_output.strip()
+        if self.step >= len(self.transition_seq):
+            return False
+        ground_truth = self.transition_seq[self.step][1].strip()
+        return model_output == ground_truth
@@ -0,0 +1,38 @@
+class TMCallCommandGenerator:
+    def __init__(self):
+        self.q0_token = 'q0'
+        self.q1_token = 'q1'
+        self.q2_token = 'q2'
+        self.qH_token = 'qH'
+
+        self.h1_token = '[HEAD1]'
+        self.h2_token = '[HEAD2]'
+        self.c_token = '[C]'
+        self.count_token = '[COUNT]'
+        self.output_token = '[OUTPUT]'
+        self.cmd_token = 'CMD'
+        self.separator = '|'
+
+        self.right_token = 'RIGHT'
+
+        self.mul_q0_template = '{cmd_token} {count_token} 1, {output_token}{output}, {q1_token}'
+        self.add_q0_template = '{cmd_token}: {c_token} 0, {h1_token} {right_token}, {h2_token} {right_token}, {q1_token}'
+
+    def get_q1_cmd(self, op1):
+        output = str(op1)
+        sep = self.separator
+        if len(sep) > 0:
+            output = sep + sep.join(output)
+        return self.mul_q0_template.format(cmd_token=self.cmd_token,
+                                            count_token=self.count_token,
+                                            output_token=self.output_token,
+                                            output=output,
+                                            q1_token=self.q1_token)
+
+    def get_q2_cmd(self):
+        return self.add_q0_template.format(cmd_token=self.cmd_token,
+                                            c_token=self.c_token,
+                                            h1_token=self.h1_token,
+                                            right_token=self.right_token,
+                                            h2_token=self.h2_token,
+                                            q1_token=self.q1_token)
@@ -0,0 +1,62 @@
+class TMInputGenerator:
+    def __init__(self):
+        self.q0_token = 'q0'
+        self.q1_token = 'q1'
+        self.q2_token = 'q2'
+        self.qH_token = 'qH'
+
+        self.h1_token = '[HEAD1]'
+        self.h2_token = '[HEAD2]'
+        self.c_token = '[C]'
+        self.count_token = '[COUNT]'
+        self.output_token = '[OUTPUT]'
+        self.separator = '|'
+
+        self.mul_token = 'MUL'
+        self.add_token = 'ADD'
+
+        self.mul_halt_template = '{operator}, {qH_token}, {h1_token}{op1} {h2_token}{op2} {count_token}{count} {output}'
+        self.add_halt_tempalte = '{operator}, {qH_token},  {op1}{h1_token} {op2}{h2_token} {c_token}{carry_out} {output}'
+
+    def get_q1_input(self, op1, op2, output):
+        op1 = str(op1)
+        op2 = str(op2)
+        output = str(output)
+
+        sep = self.separator
+        if len(sep) > 0:
+            op1 = sep + sep.join(op1)
+            op2 = sep + sep.join(op2)
+            output = sep + sep.join(output)
+
+        # the single digit multiplier is also the final count of the called machine
+        return self.mul_halt_template.format(operator=self.mul_token,
+                                            qH_token=self.qH_token,
+                                            h1_token=self.h1_token,
+                                            h2_token=self.h2_token,
+                                            count_token=self.count_token,
+                                            count=op2,
+                                            output=output,
+                                            op1=op1,
+                                            op2=op2)
+
+    def get_q2_input(self, op1, op2, carry_out, output):
+        op1 = str(op1)
+        op2 = str(op2)
+        output = str(output)
+
+        sep = self.separator
+        if len(sep) > 0:
+            op1 = sep + sep.join(op1)
+            op2 = sep + sep.join(op2)
+            output = sep + sep.join(output)
+
+        return self.add_halt_tempalte.format(operator=self.add_token,
+                                            qH_token=self.qH_token,
+                                            h1_token=self.h1_token,
+                                            h2_token=self.h2_token,
+                                            c_token=self.c_token,
+                                            carry_out=carry_out,
+                                            output=output,
+                                            op1=op1,
+                                            op2=op2)
@@ -0,0 +1,382 @@
+import re
+
+from .call_state import TMCallStateGenerator
+from .call_command import TMCallCommandGenerator
+from .input import TMInputGenerator
+from ..steps import TransitionSteps
+
+Q0 = 'q0'
+Q1 = 'q1'
+Q2 = 'q2'
+QH = 'qH'
+
+r""" Turing Machine(TM) utils for LLM long multiplication.
+
+For 'a * b = c', algorithm (schoolbook multiplication over the digits of b):
+c = 0
+for i, d in enumerate(reversed digits of b):
+    if d == 0:
+        continue
+    p = a * d               # single digit multiplication
+    c += p * 10 ** i        # shifted addition
+
+The number of steps is O(digits(b)) instead of O(b) in MUL, the single digit
+multiplication is done by MUL with at most 9 iterations.
+
+States:
+- q0: Initial state.
+- q1: read the digit d under [HEAD2], skip it if it is 0, otherwise call MUL for a * d.
+- q2: call ADD for c + p * 10 ** i, the partial product p is shifted by the position of [HEAD2].
+- qH: all digits of b are read, halt state.
+
+Example:
+4513 * 203 = 916139
+---
+iteration 1:
+- input
+LONG_MUL, q0, [HEAD1]|3|1|5|4 [HEAD2]|3|0|2 [PRODUCT] [OUTPUT]                  # state
+CMD [OUTPUT] 0, q1                                                               # command
+- output
+LONG_MUL, q1, [HEAD1]|3|1|5|4 [HEAD2]|3|0|2 [PRODUCT] [OUTPUT]|0                 # state
+CMD [CALL] MUL, q2                                                               # command
+MUL, q0, [HEAD1]|3|1|5|4 [HEAD2]|3 [COUNT] [OUTPUT]                              # state for call
+CMD [COUNT] 1, [OUTPUT]|3|1|5|4, q1                                              # command for call
+
+---
+iteration 2:
+- input
+LONG_MUL, q1, [HEAD1]|3|1|5|4 [HEAD2]|3|0|2 [PRODUCT] [OUTPUT]|0                 # copied from last output
+CMD [CALL] MUL, q2                                                               # copied from last output
+MUL, qH, [HEAD1]|3|1|5|4 [HEAD2]|3 [COUNT]|3 |9|3|5|3|1                          # final state after call
+No command to execute. Halt state.                                               # message after call
+- output
+LONG_MUL, q2, [HEAD1]|3|1|5|4 [HEAD2]|3|0|2 [PRODUCT]|9|3|5|3|1 [OUTPUT]|0       # state
+CMD [CALL] ADD, q1                                                               # command
+ADD, q0, [HEAD1] |0[HEAD2] |9|3|5|3|1 [C] [OUTPUT]                               # state for call
+CMD: [C] 0, [HEAD1] RIGHT, [HEAD2] RIGHT, q1                                     # command for call
+
+---
+iteration 3:
+- input
+LONG_MUL, q2, [HEAD1]|3|1|5|4 [HEAD2]|3|0|2 [PRODUCT]|9|3|5|3|1 [OUTPUT]|0       # copied from last output
+CMD [CALL] ADD, q1                                                               # copied from last output
+ADD, qH,  |0[HEAD1] |9|3|5|3|1[HEAD2] [C]0 |9|3|5|3|1                            # final state after call
+No command to execute. Halt state.                                               # message after call
+- output
+LONG_MUL, q1, [HEAD1]|3|1|5|4 |3[HEAD2]|0|2 [PRODUCT] [OUTPUT]|9|3|5|3|1         # state
+CMD [HEAD2] RIGHT, q1                                                            # command, skip digit 0
+
+...
+---
+iteration 7:
+- input
+LONG_MUL, q1, [HEAD1]|3|1|5|4 |3|0|2[HEAD2] [PRODUCT] [OUTPUT]|9|3|1|6|1|9       # state
+CMD [OUTPUT], qH                                                                 # command
+- output
+LONG_MUL, qH, [HEAD1]|3|1|5|4 |3|0|2[HEAD2] [PRODUCT] |9|3|1|6|1|9               # final state
+No command to execute. Halt state.                                               # end message
+"""
+
+class LongMultiplicationTM(TransitionSteps):
+    call_machine = True
+
+    def __init__(self, op1, op2):
+        assert op1 >= 0 and op2 >= 0, "Both operands must be non-negative integers."
+        self.call_state_generator = TMCallStateGenerator()
+        self.call_cmd_generator = TMCallCommandGenerator()
+        self.input_generator = TMInputGenerator()
+
+        self.op1 = str(op1)[::-1]
+        self.op2 = str(op2)[::-1]
+        self.head2_pos = 0
+        self.product = ''
+        self.output = ''
+
+        self.current_state = Q0
+        self.operator = 'LONG_MUL'
+        self.h1_token = '[HEAD1]'
+        self.h2_token = '[HEAD2]'
+        self.cmd_token = 'CMD'
+        self.call_token = '[CALL]'
+        self.output_token = '[OUTPUT]'
+        self.product_token = '[PRODUCT]'
+        self.right_token = 'RIGHT'
+        self.add_token = 'ADD'
+        self.mul_token = 'MUL'
+        self.separator = '|'
+
+    def get_cuurent_state(self):
+        return self.current_state
+
+    def _get_digit(self):
+        return int(self.op2[self.head2_pos])
+
+    def _get_shifted_product(self):
+        # shift the partial product to the position of [HEAD2]
+        return str(int(self.product[::-1]) * 10 ** self.head2_pos)[::-1]
+
+    def get_next_state(self):
+        if self.current_state == Q0:
+            return Q1
+        elif self.current_state == Q1:
+            if self.head2_pos >= len(self.op2):
+                return QH
+            if self._get_digit() == 0:
+                return Q1
+            return Q2
+        elif self.current_state == Q2:
+            return Q1
+        elif self.current_state == QH:
+            return QH
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def get_state(self):
+        state_template = '{operator}, {state}, {h1_token}{op1} {l_op2}{h2_token}{r_op2} {product_token}{product} {output_token}{output}'
+        op1 = self.op1
+        l_op2 = self.op2[:self.head2_pos]
+        r_op2 = self.op2[self.head2_pos:]
+        product = self.product
+        output = self.output
+
+        sep = self.separator
+        if len(sep) > 0:
+            op1 = sep + sep.join(op1)
+            l_op2 = sep + sep.join(l_op2) if len(l_op2) > 0 else ''
+            r_op2 = sep + sep.join(r_op2) if len(r_op2) > 0 else ''
+            product = sep + sep.join(product) if len(product) > 0 else ''
+            output = sep + sep.join(output) if len(output) > 0 else ''
+
+        output_token = self.output_token if self.current_state != QH else ''
+        return state_template.format(
+            operator=self.operator,
+            state=self.current_state,
+            h1_token=self.h1_token,
+            h2_token=self.h2_token,
+            product_token=self.product_token,
+            output_token=output_token,
+            op1=op1,
+            l_op2=l_op2,
+            r_op2=r_op2,
+            product=product,
+            output=output
+        )
+
+    def get_cmd(self):
+        if self.current_state == Q0:
+            return self._get_q0_cmd()
+        elif self.current_state == Q1:
+            return self._get_q1_cmd()
+        elif self.current_state == Q2:
+            return self._get_q2_cmd()
+        elif self.current_state == QH:
+            return 'No command to execute. Halt state.'
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def _get_q0_cmd(self):
+        q0_cmd_template = '{cmd_token} {output_token} 0, {next_state}'
+        return q0_cmd_template.format(
+            cmd_token=self.cmd_token,
+            output_token=self.output_token,
+            next_state=Q1
+        )
+
+    def _get_q1_cmd(self):
+        next_state = self.get_next_state()
+        if next_state == QH:
+            halt_template = '{cmd_token} {output_token}, {next_state}'
+            return halt_template.format(
+                cmd_token=self.cmd_token,
+                output_token=self.output_token,
+                next_state=next_state
+            )
+        if next_state == Q1:
+            skip_template = '{cmd_token} {h2_token} {right_token}, {next_state}'
+            return skip_template.format(
+                cmd_token=self.cmd_token,
+                h2_token=self.h2_token,
+                right_token=self.right_token,
+                next_state=next_state
+            )
+        call_template = '{cmd_token} {call_token} {call_cmd}, {next_state}'
+        return call_template.format(
+            cmd_token=self.cmd_token,
+            call_token=self.call_token,
+            call_cmd=self.mul_token,
+            next_state=next_state
+        )
+
+    def _get_q2_cmd(self):
+        call_template = '{cmd_token} {call_token} {call_cmd}, {next_state}'
+        return call_template.format(
+            cmd_token=self.cmd_token,
+            call_token=self.call_token,
+            call_cmd=self.add_token,
+            next_state=self.get_next_state()
+        )
+
+    def _has_call(self):
+        if self.current_state == Q1:
+            return self.get_next_state() == Q2
+        return self.current_state == Q2
+
+    def get_call_state(self, choice):
+        assert choice in ['input', 'output'], 'Invalid choice, should be either "input" or "output".'
+        if choice == 'input':
+            return self._get_call_state_input()
+        elif choice == 'output':
+            return self._get_call_state_output()
+
+    def _get_call_state_input(self):
+        if not self._has_call():
+            return ''
+        if self.current_state == Q1:
+            # MUL result
+            op2 = self._get_digit()
+            output = str(int(self.op1[::-1]) * op2)[::-1]
+            return self.input_generator.get_q1_input(self.op1, op2, output)
+        else:
+            # ADD result
+            op1 = self.output
+            op2 = self._get_shifted_product()
+            output = str(int(op1[::-1]) + int(op2[::-1]))[::-1]
+            carry_out = 1 if len(output) > len(op1) and len(output) > len(op2) else 0
+            return self.input_generator.get_q2_input(op1, op2, carry_out, output)
+
+    def _get_call_state_output(self):
+        if not self._has_call():
+            return ''
+        if self.current_state == Q1:
+            return self.call_state_generator.get_q1_output(self.op1, self._get_digit())
+        else:
+            return self.call_state_generator.get_q2_output(self.output, self._get_shifted_product())
+
+    def get_call_cmd(self, choice):
+        assert choice in ['input', 'output'], 'Invalid choice, should be either "input" or "output".'
+        if not self._has_call():
+            return ''
+        if choice == 'output':
+            if self.current_state == Q1:
+                return self.call_cmd_generator.get_q1_cmd(self.op1)
+            else:
+                return self.call_cmd_generator.get_q2_cmd()
+        else:
+            return 'No command to execute. Halt state.'
+
+    def one_step(self):
+        if self.current_state == Q0:
+            self._one_step_q0()
+        elif self.current_state == Q1:
+            self._one_step_q1()
+        elif self.current_state == Q2:
+            self._one_step_q2()
+        elif self.current_state == QH:
+            self._one_step_qH()
+        else:
+            raise ValueError(f'Invalid state: {self.current_state}')
+
+    def _one_step_q0(self):
+        self.output = '0'
+        self.head2_pos = 0
+        self.current_state = Q1
+
+    def _one_step_q1(self):
+        next_state = self.get_next_state()
+        if next_state == QH:
+            self.current_state = QH
+        elif next_state == Q1:
+            # skip digit 0
+            self.head2_pos += 1
+        else:
+            # compute p = a * d
+            self.product = str(int(self.op1[::-1]) * self._get_digit())[::-1]
+            self.current_state = Q2
+
+    def _one_step_q2(self):
+        # compute c += p * 10 ** i
+        c = int(self.output[::-1]) + int(self._get_shifted_product()[::-1])
+        self.output = str(c)[::-1]
+        self.product = ''
+        self.head2_pos += 1
+        self.current_state = Q1
+
+    def _one_step_qH(self):
+        self.current_state = QH
+        print('Halt')
+
+    def get_transition_seq(self):
+        seq = []
+        entry_template = '{}\n{}\n{}\n{}\n'
+        while self.current_state != QH:
+            input_state = self.get_state()
+            input_cmd = self.get_cmd()
+            input_call_state = self.get_call_state('input')
+            input_call_cmd = self.get_call_cmd('input')
+
+            self.one_step()
+
+            output_state = self.get_state()
+            output_cmd = self.get_cmd()
+            output_call_state = self.get_call_state('output')
+            output_call_cmd = self.get_call_cmd('output')
+
+            input = entry_template.format(input_state, input_cmd, input_call_state, input_call_cmd).strip() + '\n'
+            output = entry_template.format(output_state, output_cmd, output_call_state, output_call_cmd).strip()
+            seq.append((input, output))
+
+        return seq
+
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this LongMultiplicationTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        self.head2_pos = len(self.op2)
+        self.output = str(int(self.op1[::-1]) * int(self.op2[::-1]))[::-1]
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
+class LongMultiplicationTMChecker:
+    def __init__(self, input):
+        splits = input.strip().split('\n')
+        state = splits[0]
+        STATE_PATTERN = r'LONG_MUL, (.+),'
+        state_match = re.search(STATE_PATTERN, state)
+        if not state_match:
+            raise ValueError('Invalid input format.')
+        try:
+            h1_token = '[HEAD1]'
+            h2_token = '[HEAD2]'
+            product_token = '[PRODUCT]'
+            output_token = '[OUTPUT]'
+            separator = '|'
+            s = state.replace(state_match[0], '').replace(h1_token, '').replace(h2_token, '').replace(product_token, '').replace(output_token, '').replace(separator, '').strip()
+            idx = s.find(' ')
+            op1 = int((s[:idx].strip())[::-1])
+            op2 = int((s[idx+1:].strip())[::-1])
+        except:
+            raise ValueError('Invalid input format.')
+        self.tm = LongMultiplicationTM(op1, op2)
+        self.step = 0
+        self.transition_seq = self.tm.get_transition_seq()
+
+    def one_step(self):
+        if self.step > len(self.transition_seq):
+            return
+        self.step += 1
+
+    def expected_output(self):
+        if self.step >= len(self.transition_seq):
+            return None
+        return self.transition_seq[self.step][1].strip()
+
+    def check(self, model_output):
+        model_output = model_output.strip()
+        if self.step >= len(self.transition_seq):
+            return False
+        ground_truth = self.transition_seq[self.step][1].strip()
+        return model_output == ground_truth
@@ -2,6 +2,7 @@ import re
 
 from .state import ReflectionTMStateGenerator
 from .command import ReflectionTMCommandGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
@@ -22,7 +23,7 @@ Standard Pattern:
     - CMD [OUTPUT], qH
 """
 
-class ReflectionTM:
+class ReflectionTM(TransitionSteps):
     def __init__(self, op1, op2):
         assert op1 >= 0 and op2 >= 0, "Both operands must be non-negative integers."
         assert op1 >= op2, f"The first operand must be greater than or equal to the second operand. But got: op1 = {op1}, op2 = {op2}"
@@ -155,6 +156,21 @@ class ReflectionTM:
         seq.append((self.get_state(), self.get_cmd()))
         return seq
 
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this ReflectionTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        self.head1_pos = self.head2_pos = len(self.op1)
+        self.output = ''.join(str(9 - int(x)) for x in self.op2.ljust(len(self.op1), '0'))
+        # leading zeros are skipped in q2
+        self.output_pos = len(self.output.rstrip('0')) - 1
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
 class ReflectionTMChecker:
     def __init__(self, input):
         sg = ReflectionTMStateGenerator()
@@ -179,7 +195,13 @@ class ReflectionTMChecker:
             return
         self.tm.one_step()
 
+    def expected_output(self):
+        return self.tm.get_state() + '\n' + self.tm.get_cmd()
+
     def check(self, model_output):
         splits = model_output.strip().split('\n')
-        state, cmd = splits[0], splits[1]
-        return self.tm.get_state() == state and self.tm.get_cmd() == cmd
\ No newline at end of file
+        try:
+            state, cmd = splits[0], splits[1]
+            return self.tm.get_state() == state and self.tm.get_cmd() == cmd
+        except:
+            return False
\ No newline at end of file
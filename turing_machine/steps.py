@@ -0,0 +1,106 @@
+r""" Random access to the transition sequence of a Turing machine.
+
+`get_transition_seq()` renders the state and command of every step, rendering costs
+far more than stepping the machine. Training samples only keep a few steps of a run,
+so machines also expose:
+- `num_steps()`: the length of the transition sequence, the machine is run once without
+  rendering and a checkpoint of its attributes is kept every `checkpoint_interval` steps;
+- `step_at(k)`: the k-th entry of the transition sequence (negative k counts from the end),
+  replayed from the nearest checkpoint, or from the last step drawn if it is closer;
+- `transition_steps()`: a read-only sequence of the entries, rendered on access.
+
+Entries are the same as `get_transition_seq()`: (state, cmd) of every state up to the halt
+state for basic machines, (input, output) around every step for machines that CALL others.
+Both start from the state of the machine when first called, the machine itself is never stepped.
+The attributes of a machine must be immutable values (str, int) or stateless generators,
+checkpoints are shallow copies.
+"""
+
+class StepSequence:
+    def __init__(self, tm):
+        self.tm = tm
+
+    def __len__(self):
+        return self.tm.num_steps()
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self.tm.step_at(i) for i in range(*k.indices(len(self)))]
+        return self.tm.step_at(k)
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.tm.step_at(k)
+
+
+class TransitionSteps:
+    halt_state = 'qH'
+    checkpoint_interval = 64
+    # machines that CALL others emit an (input, output) entry around every step
+    call_machine = False
+
+    def _snapshot(self):
+        return {key: value for key, value in vars(self).items() if not key.startswith('_step')}
+
+    def _replay(self, snapshot):
+        replay = object.__new__(type(self))
+        replay.__dict__.update(snapshot)
+        return replay
+
+    def _step_index(self):
+        # (number of entries, checkpoints), built on first use
+        if '_step_checkpoints' not in self.__dict__:
+            replay = self._replay(self._snapshot())
+            checkpoints = []
+            transitions = 0
+            while True:
+                if transitions % self.checkpoint_interval == 0:
+                    checkpoints.append(replay._snapshot())
+                if replay.current_state == self.halt_state:
+                    break
+                replay.one_step()
+                transitions += 1
+            self._step_count = transitions if self.call_machine else transitions + 1
+            self._step_checkpoints = checkpoints
+            # (position, replay machine) of the last entry drawn
+            self._step_cursor = None
+        return self._step_count, self._step_checkpoints
+
+    def _render_entry(self, replay):
+        if not self.call_machine:
+            return (replay.get_state(), replay.get_cmd())
+        # the same entry as `get_transition_seq`, the replay moves one step forward
+        entry_template = '{}\n{}\n{}\n{}\n'
+        input = entry_template.format(replay.get_state(), replay.get_cmd(),
+                                      replay.get_call_state('input'), replay.get_call_cmd('input')).strip() + '\n'
+        replay.one_step()
+        output = entry_template.format(replay.get_state(), replay.get_cmd(),
+                                       replay.get_call_state('output'), replay.get_call_cmd('output')).strip()
+        return (input, output)
+
+    def num_steps(self):
+        return self._step_index()[0]
+
+    def step_at(self, k):
+        n, checkpoints = self._step_index()
+        if k < 0:
+            k += n
+        if not 0 <= k < n:
+            raise IndexError(f'Invalid step: {k}')
+        start = k - k % self.checkpoint_interval
+        cursor = self._step_cursor
+        if cursor is not None and start <= cursor[0] <= k:
+            position, replay = cursor
+        else:
+            position, replay = start, self._replay(checkpoints[start // self.checkpoint_interval])
+        while position < k:
+            replay.one_step()
+            position += 1
+        entry = self._render_entry(replay)
+        if self.call_machine:
+            position += 1
+        self._step_cursor = (position, replay)
+        return entry
+
+    def transition_steps(self):
+        return StepSequence(self)
@@ -3,6 +3,7 @@ import re
 from .call_state import TMCallStateGenerator
 from .call_command import TMCallCommandGenerator
 from .input import TMInputGenerator
+from ..steps import TransitionSteps
 
 Q0 = 'q0'
 Q1 = 'q1'
@@ -91,7 +92,9 @@ SUB, qH, [HEAD1]|9|1|8|7|4 [HEAD2]|5|4|3|2|1 |4|7|4|5|3
 No command to execute. Halt state.
 """
 
-class SubtractionTM:
+class SubtractionTM(TransitionSteps):
+    call_machine = True
+
     def __init__(self, op1, op2):
         self.call_state_generator = TMCallStateGenerator()
         self.call_cmd_generator = TMCallCommandGenerator()
@@ -301,6 +304,17 @@ class SubtractionTM:
             seq.append((input, output))
         return seq
     
+    def get_input_output(self):
+        # Warning: this method is only for generating the input-output pair for the model.
+        # DO NOT use this SubtractionTM instance calling other methods after calling.
+        assert self.current_state == Q0, 'Only support for initial state.'
+        input_state = self.get_state()
+        input_cmd = self.get_cmd()
+        self.current_state = QH
+        output_state = self.get_state()
+        output_cmd = self.get_cmd()
+        return [input_state + '\n' + input_cmd + '\n', output_state + '\n' + output_cmd]
+
 class SubtractionTMChecker:
     def __init__(self, input):
         splits = input.strip().split('\n')
@@ -330,6 +344,11 @@ class SubtractionTMChecker:
             return
         self.step += 1
 
+    def expected_output(self):
+        if self.step >= len(self.transition_seq):
+            return None
+        return self.transition_seq[self.step][1].strip()
+
     def check(self, model_output):
         model_output = model_output.strip()
         if self.step >= len(self.transition_seq):
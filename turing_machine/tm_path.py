@@ -1,5 +1,7 @@
 import os
 
+from registry import legal_tasks
+
 base_model_3_path = ''
 base_model_31_path = ''
 
@@ -111,6 +113,42 @@ div = dict(
     aligner_output_path = '',
 )
 
+long_mul = dict(
+    lora_path = '',
+    lora_path_no_prompt = '',
+    aligner_path = '',
+    task_path = '',
+    task_path_no_prompt = '',
+    task_path_executor = '',
+    task_path_raw = '',
+    aligner_input_path = '',
+    aligner_output_path = '',
+)
+
+long_div = dict(
+    lora_path = '',
+    lora_path_no_prompt = '',
+    aligner_path = '',
+    task_path = '',
+    task_path_no_prompt = '',
+    task_path_executor = '',
+    task_path_raw = '',
+    aligner_input_path = '',
+    aligner_output_path = '',
+)
+
+borrow_sub = dict(
+    lora_path = '',
+    lora_path_no_prompt = '',
+    aligner_path = '',
+    task_path = '',
+    task_path_no_prompt = '',
+    task_path_executor = '',
+    task_path_raw = '',
+    aligner_input_path = '',
+    aligner_output_path = '',
+)
+
 class PathArtifact:
     def __init__(self, path_dict, model_version):
         self.lora_3_dir = ''
@@ -131,17 +169,8 @@ class PathArtifact:
 
 class PathProvider:
     def __init__(self, model_version):
-        self.path_dict = dict(
-            add=PathArtifact(add, model_version),
-            reflection=PathArtifact(reflection, model_version),
-            left_mask=PathArtifact(left_mask, model_version),
-            sub=PathArtifact(sub, model_version),
-            equal=PathArtifact(equal, model_version),
-            greater_than=PathArtifact(greater_than, model_version),
-            less_than=PathArtifact(less_than, model_version),
-            mul=PathArtifact(mul, model_version),
-            div=PathArtifact(div, model_version),
-        )
+        # one path dict per operator of the registry, defined above with the operator's name
+        self.path_dict = {task: PathArtifact(globals()[task], model_version) for task in legal_tasks}
         self.base_model_path = base_model_3_path if model_version == '3' else base_model_31_path
 
     def get_legal_task(self):
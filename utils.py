@@ -2,21 +2,12 @@ from transformers import AutoTokenizer, LlamaForCausalLM
 from peft import PeftModel
 import torch
 
+from registry import get_requirements
+from data.pretokenize import load_pretokenized
+
 base_model_3_path = ''
 base_model_31_path = ''
 
-task_requirements = {
-    'add': None,
-    'reflection': None,
-    'left_mask': None,
-    'sub': ['add', 'reflection', 'left_mask'],
-    'equal': None,
-    'greater_than': None,
-    'less_than': None,
-    'mul': ['add', 'less_than'],
-    'div': ['add', 'greater_than'],
-}
-
 def load_adapters(model, tasks, path_provider, no_prompt, loaded):
     for task in tasks:
         if task in loaded:
@@ -53,7 +44,7 @@ def load_adapters(model, tasks, path_provider, no_prompt, loaded):
         print(f'Loaded adapter {task}: {operator_path}')
         loaded.add(task)
         # load requirements
-        requirements = task_requirements[task]
+        requirements = get_requirements(task)
         if requirements:
             model = load_adapters(model, requirements, path_provider, no_prompt, loaded)
 
@@ -61,6 +52,8 @@ def load_adapters(model, tasks, path_provider, no_prompt, loaded):
     
 
 def get_model_and_tokenizer(task, path_provider, no_prompt):
+    # `task` is a task or a list of tasks, the first one is the active adapter
+    tasks = task if isinstance(task, list) else [task]
     base_model_path = path_provider.get_base_model_path()
 
     tokenizer = AutoTokenizer.from_pretrained(base_model_path)
@@ -71,8 +64,8 @@ def get_model_and_tokenizer(task, path_provider, no_prompt):
                                                 torch_dtype=torch.bfloat16,
                                                 attn_implementation="flash_attention_2")
     
-    model = load_adapters(model, [task], path_provider, no_prompt, set())
-    model.set_adapter(task)
+    model = load_adapters(model, tasks, path_provider, no_prompt, set())
+    model.set_adapter(tasks[0])
 
     return model, tokenizer
 